@@ -1,14 +1,38 @@
 """API routes for the chatbot service"""
 
-from fastapi import APIRouter, HTTPException
+import json
+import math
+import asyncio
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request, Query
 from fastapi.responses import StreamingResponse
-from app.models.schemas import ChatRequest, ChatResponse
-from app.services.bedrock_service import BedrockService
+from app.models.schemas import ChatRequest, ChatResponse, SessionResponse, AppendMessagesRequest
+from app.services.bedrock_service import BedrockService, BedrockCapacityError
+from app.services.session_store import create_session_store, SessionNotFoundError
+from app.services.batch import run_batch
 from app.utils.logger import get_logger
+from config.settings import settings, prompt_cache, langfuse_clients
 
 logger = get_logger(__name__)
 router = APIRouter()
 bedrock_service = BedrockService()
+session_store = create_session_store(settings)
+
+
+async def _resolve_history(request: ChatRequest):
+    """Use the stored session history when the request names a conversation (read off the event loop)"""
+    if request.conversation_id:
+        return await asyncio.to_thread(session_store.get, request.conversation_id)
+    return request.conversation_history
+
+
+async def _record_exchange(request: ChatRequest, response: str) -> None:
+    """Append the user message and the answer to the request's session (written off the event loop)"""
+    if request.conversation_id:
+        await asyncio.to_thread(session_store.append, request.conversation_id, [
+            {"role": "user", "content": request.message},
+            {"role": "assistant", "content": response},
+        ])
 
 
 @router.post("/chat", response_model=ChatResponse)
@@ -25,18 +49,31 @@ async def chat(request: ChatRequest):
     try:
         logger.info(f"Received chat request: {request.message[:50]}...")
 
-        response = await bedrock_service.generate_response(
+        response, metadata = await bedrock_service.generate_response_with_metadata(
             message=request.message,
-            conversation_history=request.conversation_history,
+            conversation_history=await _resolve_history(request),
             system_prompt=request.system_prompt,
             model_id=request.model_id,
             temperature=request.temperature,
             max_tokens=request.max_tokens
         )
 
+        await _record_exchange(request, response)
+
         return ChatResponse(
             response=response,
-            model_id=request.model_id or bedrock_service.default_model_id
+            model_id=metadata.get("model_routing", {}).get("model_id") or request.model_id or bedrock_service.default_model_id,
+            conversation_id=request.conversation_id,
+            metadata=metadata or None
+        )
+    except SessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BedrockCapacityError as e:
+        logger.warning(f"Rejecting chat request: {str(e)}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
         )
     except Exception as e:
         logger.error(f"Error processing chat request: {str(e)}")
@@ -55,66 +92,41 @@ async def chat_stream(request: ChatRequest):
     Returns:
         StreamingResponse with text/event-stream content
     """
-    import asyncio
-
     try:
         logger.info(f"Received streaming chat request: {request.message[:50]}...")
+        stream = bedrock_service.generate_response_astream(
+            message=request.message,
+            conversation_history=await _resolve_history(request),
+            system_prompt=request.system_prompt,
+            model_id=request.model_id,
+            temperature=request.temperature,
+            max_tokens=request.max_tokens
+        )
+
+        # Wait for the first chunk before answering, so requests shed by the governor or
+        # the stream limit get a 429 with Retry-After (as on /chat) rather than an error event
+        try:
+            chunks = [await stream.__anext__()]
+        except StopAsyncIteration:
+            chunks = []
 
         async def generate():
             try:
-                # Create a queue to pass chunks from thread to async generator
-                import queue
-                import threading
-                chunk_queue = queue.Queue()
-
-                # Run the synchronous generator in a separate thread
-                def run_generator():
-                    try:
-                        for chunk in bedrock_service.generate_response_stream(
-                            message=request.message,
-                            conversation_history=request.conversation_history,
-                            system_prompt=request.system_prompt,
-                            model_id=request.model_id,
-                            temperature=request.temperature,
-                            max_tokens=request.max_tokens
-                        ):
-                            chunk_queue.put(("chunk", chunk))
-                        chunk_queue.put(("done", None))
-                    except Exception as e:
-                        chunk_queue.put(("error", str(e)))
-
-                # Start the thread
-                thread = threading.Thread(target=run_generator)
-                thread.start()
-
-                # Yield chunks from the queue
-                while True:
-                    # Check queue with timeout to allow async operations
-                    try:
-                        msg_type, data = await asyncio.get_event_loop().run_in_executor(
-                            None, lambda: chunk_queue.get(timeout=0.1)
-                        )
-
-                        if msg_type == "chunk":
-                            yield f"data: {data}\n\n"
-                        elif msg_type == "done":
-                            yield "data: [DONE]\n\n"
-                            break
-                        elif msg_type == "error":
-                            logger.error(f"Error in streaming generation: {data}")
-                            yield f"data: [ERROR: {data}]\n\n"
-                            break
-                    except:
-                        # Timeout - yield control and check again
-                        await asyncio.sleep(0.01)
-                        continue
-
-                # Wait for thread to finish
-                thread.join()
+                # Chunks are forwarded as soon as Bedrock emits them; if the client
+                # disconnects, closing the stream cancels the upstream Bedrock stream
+                for chunk in chunks:
+                    yield f"data: {chunk}\n\n"
+                async for chunk in stream:
+                    chunks.append(chunk)
+                    yield f"data: {chunk}\n\n"
+                await _record_exchange(request, "".join(chunks))
+                yield "data: [DONE]\n\n"
 
             except Exception as e:
                 logger.error(f"Error in streaming generation: {str(e)}")
                 yield f"data: [ERROR: {str(e)}]\n\n"
+            finally:
+                await stream.aclose()
 
         return StreamingResponse(
             generate(),
@@ -125,11 +137,125 @@ async def chat_stream(request: ChatRequest):
                 "X-Accel-Buffering": "no"  # Disable buffering in nginx
             }
         )
+    except SessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except BedrockCapacityError as e:
+        logger.warning(f"Rejecting streaming chat request: {str(e)}")
+        raise HTTPException(
+            status_code=429,
+            detail=str(e),
+            headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
     except Exception as e:
         logger.error(f"Error processing streaming chat request: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)}")
 
 
+@router.post("/chat/batch")
+async def chat_batch(
+    request: Request,
+    concurrency: Optional[int] = Query(default=None, ge=1, description="Maximum requests in flight")
+):
+    """
+    Batch chat endpoint for bulk question processing
+
+    The request body is JSONL: one ChatRequest object per line, optionally with an
+    "id". Results are streamed back as NDJSON in completion order, followed by a
+    {"summary": ...} line with throughput figures.
+
+    Args:
+        request: Raw request with the JSONL body
+        concurrency: Maximum concurrent requests (capped by settings)
+
+    Returns:
+        StreamingResponse with application/x-ndjson content
+    """
+    # The body is read up front; Starlette does not allow reading it while streaming the response
+    body = await request.body()
+    lines = body.decode("utf-8").splitlines()
+    concurrency = min(concurrency or settings.batch_concurrency, settings.batch_max_concurrency)
+    logger.info(f"Received batch chat request: {len(lines)} lines, concurrency {concurrency}")
+
+    async def handle(chat_request: ChatRequest):
+        response, metadata = await bedrock_service.generate_response_with_metadata(
+            message=chat_request.message,
+            conversation_history=await _resolve_history(chat_request),
+            system_prompt=chat_request.system_prompt,
+            model_id=chat_request.model_id,
+            temperature=chat_request.temperature,
+            max_tokens=chat_request.max_tokens
+        )
+        await _record_exchange(chat_request, response)
+        return response, metadata
+
+    async def generate():
+        async for record in run_batch(handle, lines, concurrency):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
+
+
+@router.post("/sessions", response_model=SessionResponse, status_code=201)
+async def create_session():
+    """
+    Start a server-side conversation session
+
+    Returns:
+        SessionResponse with the new conversation id
+    """
+    return SessionResponse(conversation_id=await asyncio.to_thread(session_store.create))
+
+
+@router.get("/sessions/{conversation_id}", response_model=SessionResponse)
+async def get_session(conversation_id: str):
+    """
+    Fetch the stored history of a session
+
+    Args:
+        conversation_id: Conversation id returned by POST /sessions
+
+    Returns:
+        SessionResponse with the stored messages
+    """
+    try:
+        messages = await asyncio.to_thread(session_store.get, conversation_id)
+        return SessionResponse(conversation_id=conversation_id, messages=messages)
+    except SessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/sessions/{conversation_id}/messages", response_model=SessionResponse)
+async def append_session_messages(conversation_id: str, request: AppendMessagesRequest):
+    """
+    Append messages to a session, e.g. to seed it with a history kept by the client
+
+    Args:
+        conversation_id: Conversation id returned by POST /sessions
+        request: Messages to append
+
+    Returns:
+        SessionResponse with the updated history
+    """
+    try:
+        messages = [message.model_dump() for message in request.messages]
+        await asyncio.to_thread(session_store.append, conversation_id, messages)
+        messages = await asyncio.to_thread(session_store.get, conversation_id)
+        return SessionResponse(conversation_id=conversation_id, messages=messages)
+    except SessionNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.delete("/sessions/{conversation_id}", status_code=204)
+async def delete_session(conversation_id: str):
+    """
+    Delete a session
+
+    Args:
+        conversation_id: Conversation id returned by POST /sessions
+    """
+    await asyncio.to_thread(session_store.delete, conversation_id)
+
+
 @router.get("/models")
 async def list_models():
     """
@@ -144,3 +270,19 @@ async def list_models():
     except Exception as e:
         logger.error(f"Error listing models: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error listing models: {str(e)}")
+
+
+@router.get("/stats")
+async def get_stats():
+    """
+    Runtime statistics for caches and other performance components
+
+    Returns:
+        Dictionary of component statistics
+    """
+    return {
+        "prompt_cache": prompt_cache.stats(),
+        "bedrock": bedrock_service.stats(),
+        "langfuse_clients": langfuse_clients.stats(),
+        "sessions": session_store.stats(),
+    }
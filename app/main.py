@@ -1,19 +1,60 @@
 """Main FastAPI application for AWS Bedrock Chatbot"""
 
+import time
+STARTED_AT = time.perf_counter()
+
+import asyncio
 from pathlib import Path
+from contextlib import asynccontextmanager, suppress
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import RedirectResponse
-from app.api.routes import router
+from fastapi.responses import RedirectResponse, Response, JSONResponse
+from app.api.routes import router, bedrock_service, session_store
+from app.services.warmup import StartupWarmup
 from app.utils.logger import get_logger
+from app.utils.metrics import registry
+from config.settings import settings, prompt_cache, langfuse_clients
 
 logger = get_logger(__name__)
 
+startup = StartupWarmup(
+    bedrock_service,
+    prompt_cache,
+    langfuse_client_factory=lambda: bedrock_service.langfuse,
+    warmup_invocation=settings.startup_warmup_invocation,
+    retry_seconds=settings.startup_retry_seconds,
+    started_at=STARTED_AT
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start the warm-up on startup; release shared clients and worker threads on shutdown"""
+    startup.record_import_time()
+    warmup_task = None
+    if settings.startup_warmup_enabled:
+        warmup_task = asyncio.create_task(startup.run())
+    else:
+        startup.mark_ready()
+
+    yield
+
+    if warmup_task is not None:
+        warmup_task.cancel()
+        with suppress(asyncio.CancelledError):
+            await warmup_task
+    logger.info("Shutting down: flushing Langfuse and stopping Bedrock workers")
+    bedrock_service.close()
+    session_store.close()
+    langfuse_clients.shutdown()
+
+
 app = FastAPI(
     title="AWS Bedrock Chatbot Service",
     description="A simple chatbot service using AWS Bedrock",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -43,10 +84,24 @@ async def root():
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness: the process is up)"""
     return {"status": "ok"}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """Readiness endpoint: 503 until startup warm-up has finished, with per-stage startup timing"""
+    status = startup.status()
+    return JSONResponse(content=status, status_code=200 if startup.ready else 503)
+
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    """Prometheus metrics: request counts, stage latency, token histograms and in-flight gauges"""
+    bedrock_service.export_gauges()
+    return Response(content=registry.render(), media_type=registry.CONTENT_TYPE)
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -1,6 +1,6 @@
 """Pydantic schemas for request/response models"""
 
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Any
 from pydantic import BaseModel, Field
 
 
@@ -13,6 +13,10 @@ class Message(BaseModel):
 class ChatRequest(BaseModel):
     """Request model for chat endpoint"""
     message: str = Field(..., description="User's message")
+    conversation_id: Optional[str] = Field(
+        default=None,
+        description="Server-side session to continue; its stored history replaces conversation_history"
+    )
     conversation_history: Optional[List[Message]] = Field(
         default=None,
         description="Previous conversation history"
@@ -43,3 +47,22 @@ class ChatResponse(BaseModel):
     """Response model for chat endpoint"""
     response: str = Field(..., description="Bot's response")
     model_id: str = Field(..., description="Model ID used for generation")
+    conversation_id: Optional[str] = Field(
+        default=None,
+        description="Session the exchange was appended to"
+    )
+    metadata: Optional[Dict[str, Any]] = Field(
+        default=None,
+        description="Processing details such as knowledge base routing decisions"
+    )
+
+
+class SessionResponse(BaseModel):
+    """Response model for session endpoints"""
+    conversation_id: str = Field(..., description="Conversation id")
+    messages: List[Message] = Field(default_factory=list, description="Stored conversation history")
+
+
+class AppendMessagesRequest(BaseModel):
+    """Request model for appending messages to a session"""
+    messages: List[Message] = Field(..., description="Messages to append, oldest first")
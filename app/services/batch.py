@@ -0,0 +1,157 @@
+"""Bounded-concurrency execution of JSONL chat batches"""
+
+import json
+import time
+import asyncio
+from typing import Optional, Dict, Any, Tuple, Iterable, AsyncIterator, Awaitable, Callable
+from pydantic import ValidationError
+from app.models.schemas import ChatRequest
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Executes one request and returns (response text, metadata)
+ChatHandler = Callable[[ChatRequest], Awaitable[Tuple[str, Dict[str, Any]]]]
+
+
+class BatchStats:
+    """Throughput counters for one batch"""
+
+    def __init__(self):
+        self.started_at = time.monotonic()
+        self.succeeded = 0
+        self.failed = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def add_usage(self, usage: Optional[Dict[str, int]]) -> None:
+        if usage:
+            self.input_tokens += usage.get("input_tokens", 0)
+            self.output_tokens += usage.get("output_tokens", 0)
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self.started_at
+        total = self.succeeded + self.failed
+        return {
+            "requests": total,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "requests_per_second": round(total / elapsed, 3) if elapsed else None,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "output_tokens_per_second": round(self.output_tokens / elapsed, 1) if elapsed else None,
+        }
+
+
+def parse_line(line: str, index: int) -> Tuple[str, ChatRequest]:
+    """
+    Parse one JSONL line into an item id and a chat request
+
+    Args:
+        line: JSON object with ChatRequest fields and an optional "id"
+        index: Zero-based position of the line, used as id when none is given
+
+    Returns:
+        Tuple of (item id, request)
+
+    Raises:
+        ValueError: If the line is not valid JSON or not a valid ChatRequest
+    """
+    try:
+        data = json.loads(line)
+    except json.JSONDecodeError as e:
+        raise ValueError(f"Invalid JSON: {e}")
+    if not isinstance(data, dict):
+        raise ValueError("Each line must be a JSON object")
+
+    item_id = str(data.pop("id", index))
+    try:
+        return item_id, ChatRequest.model_validate(data)
+    except ValidationError as e:
+        raise ValueError(f"Invalid chat request: {e.errors()[0]['msg']}")
+
+
+async def run_batch(handler: ChatHandler, lines: Iterable[str], concurrency: int) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Execute JSONL chat requests with at most `concurrency` in flight
+
+    Results are yielded in completion order, followed by a final {"summary": ...}
+    record. Requests are only parsed and started as slots free up.
+
+    Args:
+        handler: Executes one request
+        lines: JSONL lines
+        concurrency: Maximum concurrent requests
+
+    Yields:
+        One result record per non-empty line ({"id", "index", "response", ...} or
+        {"id", "index", "error"}), then the summary record
+    """
+    stats = BatchStats()
+    results: asyncio.Queue = asyncio.Queue()
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = set()
+
+    async def execute(index: int, item_id: str, request: ChatRequest) -> None:
+        start_time = time.monotonic()
+        try:
+            response, metadata = await handler(request)
+            stats.succeeded += 1
+            stats.add_usage(metadata.get("usage"))
+            record = {
+                "id": item_id,
+                "index": index,
+                "response": response,
+                "latency_seconds": round(time.monotonic() - start_time, 3),
+                "metadata": metadata or None,
+            }
+        except Exception as e:
+            stats.failed += 1
+            record = {"id": item_id, "index": index, "error": str(e)}
+        finally:
+            semaphore.release()
+        await results.put(record)
+
+    async def feed() -> None:
+        try:
+            index = 0
+            for line in lines:
+                if not line.strip():
+                    continue
+                await semaphore.acquire()
+                try:
+                    item_id, request = parse_line(line, index)
+                except ValueError as e:
+                    semaphore.release()
+                    stats.failed += 1
+                    await results.put({"id": str(index), "index": index, "error": str(e)})
+                else:
+                    task = asyncio.create_task(execute(index, item_id, request))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                index += 1
+            await asyncio.gather(*list(tasks))
+        finally:
+            await results.put(None)
+
+    feeder = asyncio.create_task(feed())
+    try:
+        while True:
+            record = await results.get()
+            if record is None:
+                break
+            yield record
+        await feeder
+
+        summary = stats.summary()
+        logger.info(
+            f"Batch finished: {summary['succeeded']}/{summary['requests']} succeeded in {summary['elapsed_seconds']}s "
+            f"({summary['requests_per_second']} req/s, {summary['output_tokens_per_second']} output tokens/s)"
+        )
+        yield {"summary": summary}
+    finally:
+        # Client went away: stop reading input and cancel in-flight requests
+        feeder.cancel()
+        for task in list(tasks):
+            task.cancel()
@@ -0,0 +1,181 @@
+"""Creation and connection pool monitoring of the boto3 bedrock-runtime client"""
+
+import socket
+import logging
+import threading
+from typing import Optional, List, Dict, Any
+from app.services.governor import THROTTLING_ERROR_CODES
+from app.utils.logger import get_logger
+from app.utils.metrics import BEDROCK_POOL_OVERFLOW
+
+logger = get_logger(__name__)
+
+# Logged by urllib3 when a call returns a connection to a full pool
+POOL_FULL_MESSAGE = "Connection pool is full"
+
+
+def pool_size(settings) -> int:
+    """Pooled connections per endpoint: one per Bedrock executor worker and per stream reader unless configured"""
+    return settings.bedrock_max_pool_connections or settings.bedrock_executor_workers + settings.max_concurrent_streams
+
+
+def create_bedrock_client(settings, region: Optional[str] = None):
+    """
+    Create a bedrock-runtime client with the configured pool, timeouts, keep-alive and retries
+
+    boto3 is imported here because it is slow to import.
+
+    Args:
+        settings: Settings with the Bedrock client options
+        region: AWS region (default: settings.aws_region)
+
+    Returns:
+        boto3 bedrock-runtime client
+    """
+    import boto3
+    from botocore.config import Config
+
+    client = boto3.client(
+        'bedrock-runtime',
+        region_name=region or settings.aws_region,
+        endpoint_url=settings.bedrock_endpoint_url,
+        config=Config(
+            max_pool_connections=pool_size(settings),
+            connect_timeout=settings.bedrock_connect_timeout_seconds,
+            read_timeout=settings.bedrock_read_timeout_seconds,
+            tcp_keepalive=settings.bedrock_tcp_keepalive,
+            retries={"mode": settings.bedrock_retry_mode, "total_max_attempts": settings.bedrock_max_attempts}
+        )
+    )
+    if settings.bedrock_tcp_keepalive:
+        _set_keepalive_timing(client, settings.bedrock_tcp_keepalive_idle_seconds)
+    if settings.bedrock_retry_mode != "legacy":
+        _retry_transient_errors_only(client, settings.bedrock_max_attempts)
+    install_pool_overflow_counter()
+    logger.info(
+        f"Bedrock client for {client.meta.region_name}: {pool_size(settings)} pooled connections, "
+        f"timeouts {settings.bedrock_connect_timeout_seconds}s connect / {settings.bedrock_read_timeout_seconds}s read, "
+        f"retry mode {settings.bedrock_retry_mode} ({settings.bedrock_max_attempts} attempts)"
+    )
+    return client
+
+
+def _pool_manager(client):
+    """urllib3 PoolManager behind a botocore client, or None if botocore's internals differ"""
+    try:
+        return client._endpoint.http_session._manager
+    except AttributeError:
+        return None
+
+
+def _set_keepalive_timing(client, idle_seconds: int) -> None:
+    """
+    Start keep-alive probes after idle_seconds instead of the OS default (2 hours on Linux)
+
+    botocore only sets SO_KEEPALIVE. Without shorter timing, a pooled connection silently
+    dropped by a NAT gateway (350s idle timeout) is only noticed when the next call on it
+    hits the read timeout.
+    """
+    manager = _pool_manager(client)
+    if manager is None or not hasattr(socket, "TCP_KEEPIDLE"):
+        return
+    options = list(manager.connection_pool_kw.get("socket_options") or [])
+    options += [
+        (socket.IPPROTO_TCP, socket.TCP_KEEPIDLE, idle_seconds),
+        (socket.IPPROTO_TCP, socket.TCP_KEEPINTVL, max(1, idle_seconds // 4)),
+        (socket.IPPROTO_TCP, socket.TCP_KEEPCNT, 4),
+    ]
+    manager.connection_pool_kw["socket_options"] = options
+
+
+def _retry_transient_errors_only(client, max_attempts: int) -> None:
+    """
+    Replace botocore's standard retry handler with one that does not retry throttling
+
+    Transient errors (5xx, connection errors, timeouts) are still retried here.
+    Throttling is retried by the governor, which needs to see every throttle to
+    adapt its concurrency limit.
+    """
+    from botocore.retries import standard, quota
+
+    class TransientNonThrottlingChecker(standard.BaseRetryableChecker):
+        def __init__(self):
+            self._max_attempts = standard.MaxAttemptsChecker(max_attempts)
+            self._transient = standard.TransientRetryableChecker()
+
+        def is_retryable(self, context):
+            return (
+                context.get_error_code() not in THROTTLING_ERROR_CODES
+                and self._max_attempts.is_retryable(context)
+                and self._transient.is_retryable(context)
+            )
+
+    service_event_name = client.meta.service_model.service_id.hyphenize()
+    unique_id = f"retry-config-{service_event_name}"
+    retry_quota = standard.RetryQuotaChecker(quota.RetryQuota())
+    handler = standard.RetryHandler(
+        retry_policy=standard.RetryPolicy(
+            retry_checker=TransientNonThrottlingChecker(),
+            retry_backoff=standard.ExponentialBackoff()
+        ),
+        retry_event_adapter=standard.RetryEventAdapter(),
+        retry_quota=retry_quota
+    )
+    client.meta.events.unregister(f"needs-retry.{service_event_name}", unique_id=unique_id)
+    client.meta.events.register(f"after-call.{service_event_name}", retry_quota.release_retry_quota)
+    client.meta.events.register(f"needs-retry.{service_event_name}", handler.needs_retry, unique_id=unique_id)
+
+
+def pool_stats(client) -> List[Dict[str, Any]]:
+    """
+    Utilization of each connection pool of a client
+
+    Args:
+        client: boto3 client
+
+    Returns:
+        Per host: pool size, connections in use and idle, connections opened and requests sent
+    """
+    manager = _pool_manager(client)
+    if manager is None:
+        return []
+
+    stats = []
+    for key in manager.pools.keys():
+        pool = manager.pools.get(key)
+        if pool is None:
+            continue
+        queue = pool.pool
+        idle = sum(1 for conn in list(queue.queue) if conn is not None)
+        stats.append({
+            "host": pool.host,
+            "size": queue.maxsize,
+            "in_use": max(0, queue.maxsize - queue.qsize()),
+            "idle": idle,
+            "connections_opened": pool.num_connections,
+            "requests": pool.num_requests,
+        })
+    return stats
+
+
+class _PoolOverflowCounter(logging.Filter):
+    """Counts urllib3's 'Connection pool is full' warnings per host (the warnings are still logged)"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if isinstance(record.msg, str) and record.msg.startswith(POOL_FULL_MESSAGE):
+            host = str(record.args[0]) if record.args else "unknown"
+            BEDROCK_POOL_OVERFLOW.inc(host)
+        return True
+
+
+_overflow_counter_lock = threading.Lock()
+_overflow_counter: Optional[_PoolOverflowCounter] = None
+
+
+def install_pool_overflow_counter() -> None:
+    """Attach the overflow counter to urllib3's connection pool logger, once per process"""
+    global _overflow_counter
+    with _overflow_counter_lock:
+        if _overflow_counter is None:
+            _overflow_counter = _PoolOverflowCounter()
+            logging.getLogger("urllib3.connectionpool").addFilter(_overflow_counter)
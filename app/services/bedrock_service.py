@@ -1,26 +1,613 @@
 """AWS Bedrock service for chatbot functionality"""
 
 import json
-import boto3
+import asyncio
+import functools
+import threading
 import time
-from typing import Optional, List
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, AsyncIterator, Union, Tuple
 from app.models.schemas import Message
+from app.services.response_cache import ResponseCache
+from app.services.coalescing import RequestCoalescer, coalescing_key
+from app.services.prompt_selection import PromptSelector, PromptSelection
+from app.services.model_router import ModelRouter, RoutingDecision, STRONG
+from app.services.hedging import HedgePolicy
+from app.services.history import HistoryManager
+from app.services.governor import BedrockGovernor, BedrockCapacityError, is_throttling_error
+from app.services.bedrock_client import create_bedrock_client, pool_stats
+from app.services.regions import RegionPool, INVOKE, STREAM, is_regional_error
 from app.utils.logger import get_logger
-from config.settings import settings
+from app.utils.telemetry import TelemetryExporter
+from app.utils.metrics import (
+    StageTimer, REQUESTS, REQUEST_SECONDS, IN_FLIGHT, TOKENS,
+    BEDROCK_IN_FLIGHT, BEDROCK_WAITING, BEDROCK_LIMIT, ACTIVE_STREAMS,
+    BEDROCK_POOL_SIZE, BEDROCK_POOL_IN_USE, BEDROCK_POOL_IDLE
+)
+from config.settings import settings, prompt_cache
 
 logger = get_logger(__name__)
 
 
+def _close_quietly(stream) -> None:
+    """Close a botocore event stream, ignoring errors from an already closed connection"""
+    try:
+        stream.close()
+    except Exception:
+        pass
+
+
 class BedrockService:
     """Service class for interacting with AWS Bedrock"""
 
     def __init__(self):
         """Initialize Bedrock client and Langfuse"""
-        self.client = boto3.client('bedrock-runtime', region_name=settings.aws_region)
+        # The boto3 client, Langfuse and the telemetry exporter are created on first use
+        # (normally by the startup warm-up), so importing the app stays fast and no
+        # clients or threads exist before a gunicorn worker is forked
+        self.regions = RegionPool(
+            settings.bedrock_regions or [settings.aws_region],
+            client_factory=self._create_client,
+            latency_alpha=settings.bedrock_region_latency_alpha,
+            error_alpha=settings.bedrock_region_error_alpha,
+            error_penalty=settings.bedrock_region_error_penalty,
+            cooldown_seconds=settings.bedrock_region_cooldown_seconds,
+            explore_ratio=settings.bedrock_region_explore_ratio
+        )
+        self._langfuse = None
+        self._telemetry = None
+        self._observability_initialized = False
+        self._init_lock = threading.Lock()
         self.default_model_id = settings.default_model_id
 
-        # Initialize Langfuse for observability
-        self.langfuse = settings._get_langfuse_client()
+        # Blocking boto3 calls run on a dedicated pool so they never stall the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.bedrock_executor_workers,
+            thread_name_prefix="bedrock"
+        )
+        # Stream readers hold a thread for the whole response, so they get their own pool
+        # (one thread per allowed stream) and cannot starve the invocations above
+        self._stream_executor = ThreadPoolExecutor(
+            max_workers=settings.max_concurrent_streams,
+            thread_name_prefix="bedrock-stream"
+        )
+
+        # Per-model rate limiting, adaptive concurrency and throttling retries
+        self.governor = BedrockGovernor(
+            concurrency=settings.bedrock_model_concurrency,
+            concurrency_overrides=settings.bedrock_model_concurrency_overrides,
+            min_concurrency=settings.bedrock_min_concurrency,
+            adaptive=settings.bedrock_adaptive_concurrency,
+            rate=settings.bedrock_rate_limit_per_second,
+            burst=settings.bedrock_rate_limit_burst,
+            latency_target_seconds=settings.bedrock_latency_target_seconds,
+            queue_timeout_seconds=settings.bedrock_queue_timeout_seconds,
+            deadline_seconds=settings.bedrock_request_deadline_seconds,
+            max_retries=settings.bedrock_max_retries,
+            backoff_base_seconds=settings.bedrock_backoff_base_seconds,
+            backoff_max_seconds=settings.bedrock_backoff_max_seconds
+        )
+
+        # Streaming responses share a separate cap since they hold a slot for the whole answer
+        self._stream_semaphore = asyncio.Semaphore(settings.max_concurrent_streams)
+        self._stream_stats = {
+            "active": 0,
+            "completed": 0,
+            "cancelled": 0,
+            "rejected": 0,
+            "ttfb_seconds_total": 0.0,
+            "chunks_total": 0,
+            "chunk_gap_seconds_total": 0.0,
+        }
+
+        # Answers to repeated first-turn questions are served from memory
+        self.response_cache = None
+        if settings.response_cache_enabled:
+            self.response_cache = ResponseCache(
+                max_entries=settings.response_cache_max_entries,
+                ttl_seconds=settings.response_cache_ttl_seconds,
+                similarity_threshold=settings.response_cache_similarity_threshold
+            )
+
+        # Concurrent identical requests share one upstream invocation (or stream)
+        self.coalescer = RequestCoalescer() if settings.request_coalescing_enabled else None
+
+        # Relevant few-shot examples and knowledge base categories are picked per request
+        # from indexes rebuilt on prompt changes
+        self.prompt_selector = PromptSelector(
+            prompt_cache,
+            few_shot_top_k=settings.few_shot_retrieval_top_k,
+            kb_routing_enabled=settings.kb_routing_enabled,
+            kb_max_categories=settings.kb_routing_max_categories,
+            kb_min_score=settings.kb_routing_min_score,
+            serialization_format=settings.prompt_serialization_format
+        )
+
+        # Simple questions go to the fast model, failures fall back to the other tier
+        self.model_router = ModelRouter(
+            fast_model_id=settings.fast_model_id,
+            strong_model_id=self.default_model_id,
+            enabled=settings.model_routing_enabled,
+            simple_max_chars=settings.model_routing_simple_max_chars,
+            simple_max_turns=settings.model_routing_simple_max_turns,
+            fallback_model_ids=settings.model_fallback_ids
+        )
+
+        # Opt-in: slow non-streaming invocations get a second, hedged invocation
+        self.hedging = None
+        if settings.hedging_enabled:
+            self.hedging = HedgePolicy(
+                percentile=settings.hedging_percentile,
+                min_delay_seconds=settings.hedging_min_delay_seconds,
+                max_delay_seconds=settings.hedging_max_delay_seconds,
+                budget_ratio=settings.hedging_budget_ratio,
+                alternate_model_id=settings.hedging_alternate_model_id
+            )
+
+        # Long conversations are trimmed to a token budget, older turns summarized
+        self.history_manager = None
+        if settings.history_max_tokens > 0:
+            self.history_manager = HistoryManager(
+                max_tokens=settings.history_max_tokens,
+                strategy=settings.history_strategy,
+                summary_max_tokens=settings.history_summary_max_tokens,
+                cache_size=settings.history_summary_cache_size
+            )
+
+    @property
+    def client(self):
+        """boto3 bedrock-runtime client of the primary region, created on first use"""
+        return self.regions.client(self.regions.primary)
+
+    @client.setter
+    def client(self, client) -> None:
+        self.regions.set_client(self.regions.primary, client)
+
+    @staticmethod
+    def _create_client(region: str):
+        """Create a region's bedrock-runtime client with the configured connection pool"""
+        return create_bedrock_client(settings, region)
+
+    def _init_observability(self) -> None:
+        """Look up the shared Langfuse client and start the telemetry exporter, once"""
+        with self._init_lock:
+            if self._observability_initialized:
+                return
+            # Initialize Langfuse for observability; generations are finished and shipped in the background
+            self._langfuse = settings._get_langfuse_client()
+            if self._langfuse:
+                self._telemetry = TelemetryExporter(
+                    self._langfuse,
+                    max_queue_size=settings.telemetry_queue_size,
+                    batch_size=settings.telemetry_batch_size,
+                    flush_interval_seconds=settings.telemetry_flush_interval_seconds
+                )
+            self._observability_initialized = True
+
+    @property
+    def langfuse(self):
+        """Shared Langfuse client (None if not configured), looked up on first use"""
+        if not self._observability_initialized:
+            self._init_observability()
+        return self._langfuse
+
+    @langfuse.setter
+    def langfuse(self, client) -> None:
+        self._langfuse = client
+        self._observability_initialized = True
+
+    @property
+    def telemetry(self) -> Optional[TelemetryExporter]:
+        """Background exporter for finished generations (None without Langfuse)"""
+        if not self._observability_initialized:
+            self._init_observability()
+        return self._telemetry
+
+    @telemetry.setter
+    def telemetry(self, exporter: Optional[TelemetryExporter]) -> None:
+        self._telemetry = exporter
+        self._observability_initialized = True
+
+    def _invoke_model_sync(self, model_id: str, body: str, alternate_region: bool = False) -> Dict[str, Any]:
+        """
+        Invoke the model and read the full response body (blocking, runs on the executor)
+
+        The call goes to the best region and fails over to the others on regional errors;
+        with alternate_region=True (hedged invocations) the best region is tried last.
+        """
+        def invoke(client):
+            response = client.invoke_model(
+                modelId=model_id,
+                body=body
+            )
+            return json.loads(response['body'].read())
+        return self.regions.call(
+            INVOKE, invoke, alternate=alternate_region,
+            output_tokens=lambda result: result.get('usage', {}).get('output_tokens')
+        )
+
+    def _open_stream_sync(self, model_id: str, body: str, alternate_region: bool = False):
+        """Start a streaming invocation in the best region and return its event stream (blocking, runs on the executor)"""
+        def open_stream(client):
+            response = client.invoke_model_with_response_stream(
+                modelId=model_id,
+                body=body
+            )
+            return response['body']
+        return self.regions.call(STREAM, open_stream, alternate=alternate_region)
+
+    async def _call_governed(self, model_id: str, call, body: str, hold: bool = False, deadline: Optional[float] = None):
+        """
+        Run a blocking Bedrock call on the executor under the model's governor
+
+        Throttled attempts give their slot back, back off and retry until the request
+        deadline (a new one unless given). With hold=True the slot stays acquired after
+        success and the caller releases it through self.governor.release.
+        """
+        deadline = deadline or self.governor.deadline()
+        loop = asyncio.get_running_loop()
+        attempt = 0
+        while True:
+            await self.governor.acquire(model_id, deadline)
+            start_time = time.monotonic()
+            try:
+                result = await loop.run_in_executor(self._executor, call, model_id, body)
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                self.governor.release(model_id, throttled=throttled)
+                if not throttled:
+                    raise
+                await asyncio.sleep(self.governor.retry_delay(model_id, attempt, deadline))
+                attempt += 1
+                continue
+            except BaseException:
+                self.governor.release(model_id)
+                raise
+
+            if not hold:
+                self.governor.release(model_id, latency=time.monotonic() - start_time)
+            return result
+
+    async def _call_hedged(self, model_id: str, call, build_body, deadline: Optional[float] = None):
+        """
+        Run a governed call, firing a second invocation if the first is slower than the hedge delay
+
+        The first successful result wins; the other invocation is ignored and left to
+        finish so its latency and tokens are recorded by the hedge policy.
+        """
+        policy = self.hedging
+        policy.start()
+        start_time = time.monotonic()
+
+        def track(task: asyncio.Task, task_model_id: str) -> None:
+            task_start = time.monotonic()
+
+            def done(_):
+                if not task.cancelled() and task.exception() is None:
+                    policy.record_invocation(task_model_id, time.monotonic() - task_start)
+            task.add_done_callback(done)
+
+        primary = asyncio.ensure_future(self._call_governed(model_id, call, build_body(model_id), deadline=deadline))
+        track(primary, model_id)
+        hedge = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=policy.delay(model_id))
+            if done or not policy.try_hedge():
+                result = await primary
+                policy.record_served(time.monotonic() - start_time)
+                return result
+
+            hedge_model_id = policy.alternate_model_id or model_id
+            logger.info(f"Hedging {model_id} invocation after {time.monotonic() - start_time:.2f}s on {hedge_model_id}")
+            # With several regions the hedge starts in a different one than the primary call
+            hedge_call = functools.partial(call, alternate_region=True) if len(self.regions) > 1 else call
+            hedge = asyncio.ensure_future(self._call_governed(hedge_model_id, hedge_call, build_body(hedge_model_id), deadline=deadline))
+            track(hedge, hedge_model_id)
+
+            pending = {primary, hedge}
+            errors = []
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                winner = next((task for task in done if task.exception() is None), None)
+                errors.extend(task.exception() for task in done if task.exception() is not None)
+                if winner is not None:
+                    break
+            else:
+                raise errors[0]
+
+            policy.record_served(time.monotonic() - start_time, hedge_won=winner is hedge)
+            for slower in pending:
+                def finished(task, was_first=slower is primary):
+                    failed = task.cancelled() or task.exception() is not None
+                    usage = {} if failed else task.result().get('usage', {})
+                    policy.record_slower(
+                        None if failed else time.monotonic() - start_time,
+                        usage.get('output_tokens', 0),
+                        was_first
+                    )
+                slower.add_done_callback(finished)
+            return winner.result()
+        except BaseException:
+            # Caller gave up (e.g. attempt timeout): stop waiting for both invocations
+            primary.cancel()
+            if hedge is not None:
+                hedge.cancel()
+            raise
+
+    async def _invoke_model(self, model_id: str, body: str) -> Dict[str, Any]:
+        """Invoke the model without blocking the event loop, retrying throttled calls"""
+        return await self._call_governed(model_id, self._invoke_model_sync, body)
+
+    def _route(
+        self,
+        message: str,
+        model_id: Optional[str],
+        messages: List[Dict[str, str]],
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> RoutingDecision:
+        """Choose the model for the request and record the decision in metadata"""
+        decision = self.model_router.route(
+            message,
+            requested_model_id=model_id,
+            history_turns=len(messages) - 1,
+            selection_metadata=metadata
+        )
+        if metadata is not None:
+            metadata["model_routing"] = {
+                "model_id": decision.model_id,
+                "tier": decision.tier,
+                "reason": decision.reason,
+            }
+        return decision
+
+    async def _call_with_fallback(self, decision: RoutingDecision, call, build_body, metadata: Optional[Dict[str, Any]] = None, hold: bool = False):
+        """
+        Run a governed Bedrock call on the routed model, falling back to the next candidate on timeouts or server errors
+
+        All candidates share one request deadline, and each attempt is also bounded by
+        model_attempt_timeout_seconds. Request errors (e.g. ValidationException) and
+        BedrockCapacityError are raised at once, as another model would not fare better.
+
+        Args:
+            decision: Routing decision with the candidate models
+            call: Blocking call taking (model_id, body)
+            build_body: Builds the request body for a model
+            metadata: Request metadata updated with the model that served the request
+            hold: Keep the governor slot after success (see _call_governed)
+
+        Returns:
+            Tuple of (model id that succeeded, call result)
+        """
+        candidates = decision.candidates
+        deadline = self.governor.deadline()
+        for index, candidate in enumerate(candidates):
+            start_time = time.monotonic()
+            timeout = deadline - start_time
+            if settings.model_attempt_timeout_seconds:
+                timeout = min(timeout, settings.model_attempt_timeout_seconds)
+            try:
+                if self.hedging is not None and not hold:
+                    attempt = self._call_hedged(candidate, call, build_body, deadline=deadline)
+                else:
+                    attempt = self._call_governed(candidate, call, build_body(candidate), hold=hold, deadline=deadline)
+                result = await asyncio.wait_for(attempt, timeout=max(timeout, 0.0))
+            except Exception as e:
+                if not isinstance(e, asyncio.TimeoutError) and not is_regional_error(e):
+                    raise
+                self.model_router.record(candidate, None, error=True)
+                if index == len(candidates) - 1 or time.monotonic() >= deadline:
+                    raise
+                self.model_router.fallbacks += 1
+                reason = "timeout" if isinstance(e, asyncio.TimeoutError) else type(e).__name__
+                logger.warning(f"Model {candidate} failed ({reason}), falling back to {candidates[index + 1]}")
+                if metadata is not None:
+                    metadata.setdefault("model_routing", {}).setdefault("fallback_from", []).append(
+                        {"model_id": candidate, "reason": reason}
+                    )
+                continue
+
+            self.model_router.record(candidate, time.monotonic() - start_time)
+            if metadata is not None and "model_routing" in metadata:
+                metadata["model_routing"]["model_id"] = candidate
+            return candidate, result
+
+    @staticmethod
+    def _supports_prompt_caching(model_id: str) -> bool:
+        """Whether Bedrock prompt caching is enabled and supported for the model"""
+        return (
+            settings.bedrock_prompt_caching_enabled
+            and "anthropic.claude" in model_id
+            and any(name in model_id for name in settings.bedrock_prompt_caching_models)
+        )
+
+    def _resolve_system(
+        self,
+        system_prompt: Optional[str],
+        model_id: str,
+        message: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Union[str, List[Dict[str, Any]]]:
+        """Select the prompt subsets for the message and format the system prompt for the model"""
+        return self._format_system(system_prompt, self._select_prompt(system_prompt, message, metadata), model_id)
+
+    def _select_prompt(
+        self,
+        system_prompt: Optional[str],
+        message: str,
+        metadata: Optional[Dict[str, Any]] = None
+    ) -> Optional[PromptSelection]:
+        """
+        Select the few-shot examples and knowledge base categories for the message
+
+        The selection is recorded in metadata. Returns None when the request brings
+        its own system prompt.
+        """
+        if system_prompt:
+            return None
+
+        selection = self.prompt_selector.select(message)
+        if selection.metadata:
+            logger.info(f"Prompt selection: {selection.metadata}")
+            if metadata is not None:
+                metadata.update(selection.metadata)
+        return selection
+
+    def _format_system(
+        self,
+        system_prompt: Optional[str],
+        selection: Optional[PromptSelection],
+        model_id: str
+    ) -> Union[str, List[Dict[str, Any]]]:
+        """
+        Format the system prompt for a model
+
+        Models with prompt caching get the full prompt (knowledge base and all
+        few-shots) as content blocks with a cache point after it, followed only by
+        the current date: a cached read of the full prompt is cheaper than sending
+        the selected subsets uncached on every request. Other models get the prompt
+        assembled with the selected subsets.
+        """
+        if system_prompt:
+            return system_prompt
+
+        if not self._supports_prompt_caching(model_id):
+            return prompt_cache.get(knowledge_base=selection.knowledge_base, few_shots=selection.few_shots)
+
+        static, volatile = prompt_cache.get_blocks()
+        blocks = [{"type": "text", "text": static, "cache_control": {"type": "ephemeral"}}]
+        if volatile:
+            blocks.append({"type": "text", "text": volatile})
+        return blocks
+
+    def _parse_response(self, model_id: str, response_body: Dict[str, Any]) -> Tuple[str, Dict[str, int]]:
+        """Extract text and usage based on model type"""
+        if "anthropic.claude" in model_id:
+            return response_body['content'][0]['text'], self._usage_details(response_body.get('usage', {}))
+        return response_body.get('completion', str(response_body)), self._usage_details({})
+
+    @staticmethod
+    def _usage_details(usage: Dict[str, Any]) -> Dict[str, int]:
+        """Normalize Anthropic usage (including prompt cache reads/writes) for logs and Langfuse"""
+        return {
+            "input_tokens": usage.get('input_tokens', 0),
+            "output_tokens": usage.get('output_tokens', 0),
+            "cache_read_input_tokens": usage.get('cache_read_input_tokens', 0) or 0,
+            "cache_creation_input_tokens": usage.get('cache_creation_input_tokens', 0) or 0,
+        }
+
+    @staticmethod
+    def _format_usage(usage: Dict[str, int]) -> str:
+        """Format usage details for the log line"""
+        text = f"{usage['input_tokens']} input, {usage['output_tokens']} output"
+        if usage['cache_read_input_tokens'] or usage['cache_creation_input_tokens']:
+            text += f", {usage['cache_read_input_tokens']} cache read, {usage['cache_creation_input_tokens']} cache write"
+        return text
+
+    @staticmethod
+    def _build_messages(message: str, conversation_history: Optional[List[Union[Message, Dict[str, str]]]]) -> List[Dict[str, str]]:
+        """Build the Bedrock messages array from the conversation history (request models or stored session dicts) and current message"""
+        messages = []
+        if conversation_history:
+            messages.extend([
+                {"role": msg["role"], "content": msg["content"]} if isinstance(msg, dict)
+                else {"role": msg.role, "content": msg.content}
+                for msg in conversation_history
+            ])
+
+        # Only append the current message if it's not already the last message in history
+        # This prevents duplicate messages when the frontend already includes it in conversation_history
+        if not messages or messages[-1]["content"] != message or messages[-1]["role"] != "user":
+            messages.append({"role": "user", "content": message})
+
+        return messages
+
+    def _coalescing_key(
+        self,
+        message: str,
+        conversation_history: Optional[List[Union[Message, Dict[str, str]]]],
+        system_prompt: Optional[str],
+        model_id: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ):
+        """Coalescing key for the request, or None if coalescing is disabled or not applicable"""
+        if self.coalescer is None:
+            return None
+        return coalescing_key(
+            message,
+            self._build_messages(message, conversation_history),
+            system_prompt,
+            prompt_cache.versions or (),
+            model_id,
+            temperature,
+            max_tokens
+        )
+
+    def _fit_history(self, messages: List[Dict[str, str]], metadata: Optional[Dict[str, Any]] = None) -> List[Dict[str, str]]:
+        """Apply the conversation history token budget, recording what was trimmed in metadata"""
+        if self.history_manager is None:
+            return messages
+
+        messages, details = self.history_manager.fit(messages)
+        if details and metadata is not None:
+            metadata["history"] = details
+        return messages
+
+    def _body_builder(
+        self,
+        system_prompt: Optional[str],
+        selection: Optional[PromptSelection],
+        messages: List[Dict[str, str]],
+        temperature: float,
+        max_tokens: int,
+        timer: StageTimer
+    ):
+        """
+        Return a function building (and memoizing) the request body for a candidate model
+
+        Prompt formatting and JSON encoding are timed as the prompt_load and json_encode stages.
+        """
+        bodies: Dict[str, str] = {}
+
+        def build_body(candidate: str) -> str:
+            body = bodies.get(candidate)
+            if body is None:
+                t = time.perf_counter()
+                system = self._format_system(system_prompt, selection, candidate)
+                t = timer.record("prompt_load", t)
+                body = bodies[candidate] = self._build_request_body(candidate, system, messages, temperature, max_tokens)
+                timer.record("json_encode", t)
+            return body
+
+        return build_body
+
+    @staticmethod
+    def _record_tokens(model_id: str, usage: Dict[str, int]) -> None:
+        """Record the invocation's token counts in the token histogram"""
+        TOKENS.observe(usage['input_tokens'], model_id, "input")
+        TOKENS.observe(usage['output_tokens'], model_id, "output")
+
+    @staticmethod
+    def _build_request_body(model_id: str, system: Union[str, List[Dict[str, Any]]], messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> str:
+        """Serialize the invocation body for the given model family"""
+        # Prepare request body for Claude models
+        if "anthropic.claude" in model_id:
+            return json.dumps({
+                "anthropic_version": "bedrock-2023-05-31",
+                "max_tokens": max_tokens,
+                "temperature": temperature,
+                "system": system,
+                "messages": messages
+            })
+
+        # Add support for other models as needed
+        return json.dumps({
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "system": system
+        })
 
     async def generate_response(
         self,
@@ -45,102 +632,174 @@ class BedrockService:
         Returns:
             Generated response text
         """
+        response_text, _ = await self.generate_response_with_metadata(
+            message=message,
+            conversation_history=conversation_history,
+            system_prompt=system_prompt,
+            model_id=model_id,
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        return response_text
+
+    async def generate_response_with_metadata(
+        self,
+        message: str,
+        conversation_history: Optional[List[Message]] = None,
+        system_prompt: Optional[str] = None,
+        model_id: Optional[str] = None,
+        temperature: float = 0.3,
+        max_tokens: int = 2048
+    ) -> Tuple[str, Dict[str, Any]]:
+        """
+        Generate a response using AWS Bedrock and report how the request was processed
+
+        Concurrent identical requests (see coalescing_key) share one invocation; the
+        requests that joined another one have "coalesced" set in their metadata.
+
+        Args:
+            message: User's input message
+            conversation_history: Previous conversation messages
+            system_prompt: System prompt to guide assistant behavior
+            model_id: Bedrock model ID to use
+            temperature: Temperature for generation
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Tuple of (generated response text, metadata such as prompt routing decisions)
+        """
+        def generate():
+            return self._generate_with_metadata(
+                message, conversation_history, system_prompt, model_id, temperature, max_tokens
+            )
+
+        start_time = time.perf_counter()
+        status, served_by = "error", model_id or "auto"
+        IN_FLIGHT.inc("invoke")
         try:
-            start_time = time.time()
-            model_id = model_id or self.default_model_id
-
-            # Use provided system prompt or load from file
-            system = system_prompt or settings.load_system_prompt(force_local=False)
-
-            # Build messages array
-            messages = []
-            if conversation_history:
-                messages.extend([{"role": msg.role, "content": msg.content} for msg in conversation_history])
-
-            # Only append the current message if it's not already the last message in history
-            # This prevents duplicate messages when the frontend already includes it in conversation_history
-            if not messages or messages[-1]["content"] != message or messages[-1]["role"] != "user":
-                messages.append({"role": "user", "content": message})
-
-            # Prepare request body for Claude models
-            if "anthropic.claude" in model_id:
-                body = json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "system": system,
-                    "messages": messages
-                })
+            key = self._coalescing_key(message, conversation_history, system_prompt, model_id, temperature, max_tokens)
+            if key is None:
+                response_text, metadata = await generate()
+            else:
+                (response_text, metadata), shared = await self.coalescer.run(key, generate)
+                metadata = dict(metadata)
+                if shared:
+                    logger.info("Served by an identical in-flight request")
+                    metadata["coalesced"] = True
+
+            served_by = metadata.get("model_routing", {}).get("model_id", served_by)
+            if metadata.get("coalesced"):
+                status = "coalesced"
+            elif metadata.get("response_cache") == "hit":
+                status = "cached"
             else:
-                # Add support for other models as needed
-                body = json.dumps({
-                    "messages": messages,
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "system": system
-                })
+                status = "ok"
+            return response_text, metadata
+        except BedrockCapacityError:
+            status = "rejected"
+            raise
+        except asyncio.CancelledError:
+            status = "cancelled"
+            raise
+        finally:
+            IN_FLIGHT.dec("invoke")
+            REQUESTS.inc("invoke", served_by, status)
+            REQUEST_SECONDS.observe(time.perf_counter() - start_time, "invoke")
+
+    async def _generate_with_metadata(
+        self,
+        message: str,
+        conversation_history: Optional[List[Message]],
+        system_prompt: Optional[str],
+        model_id: Optional[str],
+        temperature: float,
+        max_tokens: int
+    ) -> Tuple[str, Dict[str, Any]]:
+        """Generate an uncoalesced response (see generate_response_with_metadata)"""
+        generation = None
+        metadata: Dict[str, Any] = {}
+        timer = StageTimer()
+        try:
+            start_time = time.time()
+
+            t = time.perf_counter()
+            untrimmed = self._build_messages(message, conversation_history)
+            messages = self._fit_history(untrimmed, metadata)
+            t = timer.record("message_assembly", t)
+
+            # Only first-turn questions against the shared system prompt are cacheable;
+            # routed requests share one scope since the routing policy is deterministic.
+            # Decided on the untrimmed conversation: trimming can fold a user's history
+            # into a single message, whose answer must not be served to anyone else
+            cache_scope = None
+            first_turn = len(untrimmed) == 1 and "history" not in metadata
+            if self.response_cache and not system_prompt and first_turn and prompt_cache.versions:
+                cache_scope, kb_version = ResponseCache.make_scope(
+                    prompt_cache.versions, model_id or "auto", temperature, max_tokens
+                )
+                cached = self.response_cache.get(message, cache_scope, kb_version)
+                if cached is not None:
+                    logger.info(f"Serving cached response | Latency: {time.time() - start_time:.3f}s")
+                    metadata["response_cache"] = "hit"
+                    return cached, metadata
+
+            # Use provided system prompt or the cached assembled prompt, then pick the model
+            t = time.perf_counter()
+            selection = self._select_prompt(system_prompt, message, metadata)
+            timer.record("prompt_load", t)
+            decision = self._route(message, model_id, messages, metadata)
+            build_body = self._body_builder(system_prompt, selection, messages, temperature, max_tokens, timer)
 
             # Create Langfuse generation span if available
-            generation_context = None
-            generation = None
             if self.langfuse and settings.use_langfuse:
                 try:
-                    generation_context = self.langfuse.start_as_current_generation(
+                    generation = self.langfuse.start_generation(
                         name="bedrock-generation",
-                        model=model_id,
+                        model=decision.model_id,
                         input=messages,
                         model_parameters={
                             "temperature": temperature,
                             "max_tokens": max_tokens
                         }
                     )
-                    generation = generation_context.__enter__()
                 except Exception as e:
                     logger.warning(f"Could not create Langfuse generation: {e}")
-                    generation_context = None
                     generation = None
 
             # Invoke model
-            logger.info(f"Invoking Bedrock model: {model_id}")
-            response = self.client.invoke_model(
-                modelId=model_id,
-                body=body
-            )
+            logger.info(f"Invoking Bedrock model: {decision.model_id} ({decision.tier}, {decision.reason})")
+            build_body(decision.model_id)
+            t = time.perf_counter()
+            model_id, response_body = await self._call_with_fallback(decision, self._invoke_model_sync, build_body, metadata)
+            t = timer.record("upstream", t)
+            response_text, usage = self._parse_response(model_id, response_body)
+            timer.record("response_parse", t)
+
+            # The shared prompt asks for a <response> block; escalate when the fast model omits it
+            escalate_to = self.model_router.escalation(decision)
+            if escalate_to and not system_prompt and "<response>" not in response_text:
+                self.model_router.escalations += 1
+                metadata["model_routing"]["escalated_from"] = model_id
+                logger.info(f"Escalating to {escalate_to}: fast model answer has no <response> block")
+                t = time.perf_counter()
+                model_id, response_body = await self._call_with_fallback(
+                    RoutingDecision(escalate_to, STRONG, "escalated"), self._invoke_model_sync, build_body, metadata
+                )
+                t = timer.record("upstream", t)
+                response_text, usage = self._parse_response(model_id, response_body)
+                timer.record("response_parse", t)
 
             # Calculate latency
             latency = time.time() - start_time
 
-            # Parse response
-            response_body = json.loads(response['body'].read())
-
-            # Extract text and usage based on model type
-            if "anthropic.claude" in model_id:
-                response_text = response_body['content'][0]['text']
-                usage = response_body.get('usage', {})
-                input_tokens = usage.get('input_tokens', 0)
-                output_tokens = usage.get('output_tokens', 0)
-            else:
-                response_text = response_body.get('completion', str(response_body))
-                input_tokens = 0
-                output_tokens = 0
-
-            # Update Langfuse generation with output
-            if generation and generation_context:
-                try:
-                    generation.update(
-                        output=response_text,
-                        usage_details={
-                            "input_tokens": input_tokens,
-                            "output_tokens": output_tokens
-                        }
-                    )
-                    generation_context.__exit__(None, None, None)
-                    self.langfuse.flush()
-                except Exception as e:
-                    logger.warning(f"Could not update Langfuse generation: {e}")
+            # Finish Langfuse generation with output (exported in the background)
+            self._finish_generation(generation, model=model_id, output=response_text, usage_details=usage)
+            metadata["usage"] = usage
+            self._record_tokens(model_id, usage)
+            metadata["timings_ms"] = timer.summary()
 
             logger.info("Successfully generated response")
-            logger.info(f"Tokens: {input_tokens} input, {output_tokens} output | Latency: {latency:.2f}s")
+            logger.info(f"Tokens: {self._format_usage(usage)} | Latency: {latency:.2f}s | Stages (ms): {metadata['timings_ms']}")
             
             if settings.local_dev:
                 # In local development, log the full response for debugging
@@ -149,23 +808,78 @@ class BedrockService:
             response_start = response_text.find("<response>") + 10
             response_end = response_text.find("</response>")
             if response_start != -1 and response_end != -1:
-                return response_text[response_start:response_end].strip()
+                response_text = response_text[response_start:response_end].strip()
 
-            return response_text
+            if cache_scope is not None:
+                self.response_cache.put(message, response_text, cache_scope, kb_version)
+
+            return response_text, metadata
 
         except Exception as e:
             # Close Langfuse generation on error
-            if generation_context:
-                try:
-                    generation_context.__exit__(type(e), e, e.__traceback__)
-                    self.langfuse.flush()
-                except:
-                    pass
+            self._finish_generation(generation, level="ERROR", status_message=str(e))
 
             logger.error(f"Error generating response: {str(e)}")
             raise
 
-    def generate_response_stream(
+    def _stream_events_sync(
+        self,
+        model_id: str,
+        stream,
+        loop: asyncio.AbstractEventLoop,
+        queue: asyncio.Queue,
+        slots: threading.Semaphore,
+        cancelled: threading.Event
+    ) -> None:
+        """
+        Read the Bedrock event stream and push parsed items into the asyncio queue (runs on the executor)
+
+        Items are ("text", str), ("usage", dict), ("done", None) or ("error", Exception).
+        Each item takes one of the free slots released by the consumer, so a slow client applies
+        backpressure to the upstream read instead of buffering the whole answer.
+        """
+        def put(item):
+            while not slots.acquire(timeout=0.1):
+                if cancelled.is_set():
+                    return
+            loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        try:
+            raw_usage = {}
+            for event in stream:
+                if cancelled.is_set():
+                    break
+
+                chunk = json.loads(event['chunk']['bytes'])
+
+                # Extract text based on model type
+                if "anthropic.claude" in model_id:
+                    if chunk.get('type') == 'content_block_delta':
+                        delta = chunk.get('delta', {})
+                        if delta.get('type') == 'text_delta':
+                            put(("text", delta.get('text', '')))
+                    elif chunk.get('type') == 'message_start':
+                        # Extract input and prompt cache usage from message_start
+                        raw_usage.update(chunk.get('message', {}).get('usage', {}))
+                    elif chunk.get('type') == 'message_delta':
+                        # Extract output tokens from message_delta (top-level usage in the Anthropic format)
+                        delta_usage = chunk.get('usage') or chunk.get('delta', {}).get('usage', {})
+                        raw_usage['output_tokens'] = delta_usage.get('output_tokens', 0)
+                else:
+                    # Handle other model types
+                    put(("text", chunk.get('completion', '')))
+
+            if not cancelled.is_set():
+                put(("usage", self._usage_details(raw_usage)))
+                put(("done", None))
+        except Exception as e:
+            if not cancelled.is_set():
+                put(("error", e))
+        finally:
+            if cancelled.is_set():
+                _close_quietly(stream)
+
+    async def generate_response_astream(
         self,
         message: str,
         conversation_history: Optional[List[Message]] = None,
@@ -173,9 +887,13 @@ class BedrockService:
         model_id: Optional[str] = None,
         temperature: float = 0.3,
         max_tokens: int = 2048
-    ):
+    ) -> AsyncIterator[str]:
         """
-        Generate a streaming response using AWS Bedrock (synchronous generator)
+        Generate a streaming response using AWS Bedrock (async generator)
+
+        Concurrent identical requests subscribe to one upstream stream: each gets the
+        chunks received so far, then every new chunk. The upstream stream is cancelled
+        when its last subscriber closes the generator.
 
         Args:
             message: User's input message
@@ -188,129 +906,300 @@ class BedrockService:
         Yields:
             Chunks of generated response text
         """
+        served: Dict[str, str] = {}
+
+        def open_stream():
+            served["status"] = "ok"
+            return self._generate_astream(
+                message, conversation_history, system_prompt, model_id, temperature, max_tokens, served
+            )
+
+        start_time = time.perf_counter()
+        status = "error"
+        IN_FLIGHT.inc("stream")
+        key = self._coalescing_key(message, conversation_history, system_prompt, model_id, temperature, max_tokens)
+        stream = open_stream() if key is None else self.coalescer.stream(key, open_stream)
         try:
-            start_time = time.time()
-            model_id = model_id or self.default_model_id
-
-            # Use provided system prompt or load from file
-            system = system_prompt or settings.load_system_prompt()
-
-            # Build messages array
-            messages = []
-            if conversation_history:
-                messages.extend([{"role": msg.role, "content": msg.content} for msg in conversation_history])
-
-            # Only append the current message if it's not already the last message in history
-            if not messages or messages[-1]["content"] != message or messages[-1]["role"] != "user":
-                messages.append({"role": "user", "content": message})
-
-            # Prepare request body for Claude models
-            if "anthropic.claude" in model_id:
-                body = json.dumps({
-                    "anthropic_version": "bedrock-2023-05-31",
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "system": system,
-                    "messages": messages
-                })
-            else:
-                body = json.dumps({
-                    "messages": messages,
-                    "max_tokens": max_tokens,
-                    "temperature": temperature,
-                    "system": system
-                })
+            async for chunk in stream:
+                yield chunk
+            # Subscribers that joined another request's stream never opened their own
+            status = served.get("status", "coalesced")
+        except BedrockCapacityError:
+            status = "rejected"
+            raise
+        except (asyncio.CancelledError, GeneratorExit):
+            status = "cancelled"
+            raise
+        finally:
+            await stream.aclose()
+            IN_FLIGHT.dec("stream")
+            REQUESTS.inc("stream", served.get("model_id", model_id or "auto"), status)
+            REQUEST_SECONDS.observe(time.perf_counter() - start_time, "stream")
 
-            # Create Langfuse generation span if available
-            generation_context = None
-            generation = None
-            if self.langfuse and settings.use_langfuse:
-                try:
-                    generation_context = self.langfuse.start_as_current_generation(
-                        name="bedrock-generation-stream",
-                        model=model_id,
-                        input=messages,
-                        model_parameters={
-                            "temperature": temperature,
-                            "max_tokens": max_tokens
-                        }
-                    )
-                    generation = generation_context.__enter__()
-                except Exception as e:
-                    logger.warning(f"Could not create Langfuse generation: {e}")
-                    generation_context = None
-                    generation = None
+    async def _generate_astream(
+        self,
+        message: str,
+        conversation_history: Optional[List[Message]],
+        system_prompt: Optional[str],
+        model_id: Optional[str],
+        temperature: float,
+        max_tokens: int,
+        served: Optional[Dict[str, str]] = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate an uncoalesced streaming response using AWS Bedrock (async generator)
 
-            # Invoke model with streaming
-            logger.info(f"Invoking Bedrock model with streaming: {model_id}")
-            response = self.client.invoke_model_with_response_stream(
-                modelId=model_id,
-                body=body
-            )
+        Chunks are pushed from the Bedrock event stream into a bounded asyncio queue and
+        yielded as soon as they arrive. Closing the generator (e.g. on client disconnect)
+        cancels the upstream Bedrock stream. The model that served the stream is set
+        in `served`.
+        """
+        requested_model_id = model_id
+        model_id = model_id or self.default_model_id
 
-            # Process the streaming response
-            full_response = ""
-            input_tokens = 0
-            output_tokens = 0
+        try:
+            await asyncio.wait_for(self._stream_semaphore.acquire(), timeout=settings.bedrock_queue_timeout_seconds)
+        except asyncio.TimeoutError:
+            self._stream_stats["rejected"] += 1
+            raise BedrockCapacityError(model_id, retry_after=settings.bedrock_queue_timeout_seconds)
 
-            for event in response['body']:
-                chunk = json.loads(event['chunk']['bytes'])
+        generation = None
+        cancelled = threading.Event()
+        upstream: Dict[str, Any] = {}
+        queue: asyncio.Queue = asyncio.Queue()
+        slots = threading.Semaphore(settings.stream_queue_size)
+        completed = False
+        self._stream_stats["active"] += 1
+        slot_held = False
+        open_latency = None
+        timer = StageTimer()
+        try:
+            try:
+                start_time = time.time()
 
-                # Extract text based on model type
-                if "anthropic.claude" in model_id:
-                    if chunk.get('type') == 'content_block_delta':
-                        delta = chunk.get('delta', {})
-                        if delta.get('type') == 'text_delta':
-                            text = delta.get('text', '')
-                            full_response += text
-                            yield text
-                    elif chunk.get('type') == 'message_start':
-                        # Extract usage from message_start
-                        usage = chunk.get('message', {}).get('usage', {})
-                        input_tokens = usage.get('input_tokens', 0)
-                    elif chunk.get('type') == 'message_delta':
-                        # Extract output tokens from message_delta
-                        delta_usage = chunk.get('delta', {}).get('usage', {})
-                        output_tokens = delta_usage.get('output_tokens', 0)
-                else:
-                    # Handle other model types
-                    text = chunk.get('completion', '')
-                    full_response += text
-                    yield text
+                t = time.perf_counter()
+                messages = self._fit_history(self._build_messages(message, conversation_history))
+                t = timer.record("message_assembly", t)
 
-            # Calculate latency
-            latency = time.time() - start_time
+                # Use provided system prompt or the cached assembled prompt, then pick the model
+                routing_metadata: Dict[str, Any] = {}
+                selection = self._select_prompt(system_prompt, message, routing_metadata)
+                timer.record("prompt_load", t)
+                decision = self._route(message, requested_model_id, messages, routing_metadata)
+                build_body = self._body_builder(system_prompt, selection, messages, temperature, max_tokens, timer)
 
-            # Update Langfuse generation with output
-            if generation and generation_context:
-                try:
-                    generation.update(
-                        output=full_response,
-                        usage_details={
-                            "input_tokens": input_tokens,
-                            "output_tokens": output_tokens
-                        }
-                    )
-                    generation_context.__exit__(None, None, None)
-                    self.langfuse.flush()
-                except Exception as e:
-                    logger.warning(f"Could not update Langfuse generation: {e}")
+                # Create Langfuse generation if available
+                if self.langfuse and settings.use_langfuse:
+                    try:
+                        generation = self.langfuse.start_generation(
+                            name="bedrock-generation-stream",
+                            model=decision.model_id,
+                            input=messages,
+                            model_parameters={
+                                "temperature": temperature,
+                                "max_tokens": max_tokens
+                            }
+                        )
+                    except Exception as e:
+                        logger.warning(f"Could not create Langfuse generation: {e}")
+                        generation = None
+
+                # Invoke model with streaming
+                logger.info(f"Invoking Bedrock model with streaming: {decision.model_id} ({decision.tier}, {decision.reason})")
+                build_body(decision.model_id)
+                upstream_start = time.perf_counter()
+                model_id, stream = await self._call_with_fallback(decision, self._open_stream_sync, build_body, hold=True)
+                slot_held = True
+                upstream["body"] = stream
+                open_latency = time.time() - start_time
+                if served is not None:
+                    served["model_id"] = model_id
 
-            logger.info("Successfully generated streaming response")
-            logger.info(f"Tokens: {input_tokens} input, {output_tokens} output | Latency: {latency:.2f}s")
+                loop = asyncio.get_running_loop()
+                producer = loop.run_in_executor(
+                    self._stream_executor, self._stream_events_sync, model_id, stream, loop, queue, slots, cancelled
+                )
+
+                full_response = ""
+                usage = self._usage_details({})
+                ttfb = None
+                last_chunk_at = None
+                chunk_gap_total = 0.0
+                chunk_count = 0
+                first_chunk_at = None
+
+                while True:
+                    kind, data = await queue.get()
+                    slots.release()
+
+                    if kind == "text":
+                        now = time.time()
+                        if ttfb is None:
+                            ttfb = now - start_time
+                            first_chunk_at = timer.record("upstream_ttfb", upstream_start)
+                        else:
+                            chunk_gap_total += now - last_chunk_at
+                        last_chunk_at = now
+                        chunk_count += 1
+                        full_response += data
+                        yield data
+                    elif kind == "usage":
+                        usage = data
+                    elif kind == "done":
+                        break
+                    elif kind == "error":
+                        raise data
+
+                await producer
+                completed = True
+                timer.record("streaming", first_chunk_at or upstream_start)
+                self._record_tokens(model_id, usage)
+
+                # Calculate latency
+                latency = time.time() - start_time
+                mean_gap_ms = (chunk_gap_total / (chunk_count - 1) * 1000) if chunk_count > 1 else 0.0
+
+                self._stream_stats["completed"] += 1
+                self._stream_stats["ttfb_seconds_total"] += ttfb or 0.0
+                self._stream_stats["chunks_total"] += chunk_count
+                self._stream_stats["chunk_gap_seconds_total"] += chunk_gap_total
+
+                # Finish Langfuse generation with output (exported in the background)
+                self._finish_generation(generation, model=model_id, output=full_response, usage_details=usage)
+
+                logger.info("Successfully generated streaming response")
+                logger.info(
+                    f"Tokens: {self._format_usage(usage)} | Latency: {latency:.2f}s | "
+                    f"TTFB: {(ttfb or 0.0):.3f}s | Chunks: {chunk_count}, mean gap {mean_gap_ms:.1f}ms | "
+                    f"Stages (ms): {timer.summary()}"
+                )
+            finally:
+                if slot_held:
+                    self.governor.release(model_id, latency=open_latency if completed else None)
+
+        except (asyncio.CancelledError, GeneratorExit):
+            self._stream_stats["cancelled"] += 1
+            logger.info("Streaming response cancelled by client")
+            raise
 
         except Exception as e:
-            # Close Langfuse generation on error
-            if generation_context:
-                try:
-                    generation_context.__exit__(type(e), e, e.__traceback__)
-                    self.langfuse.flush()
-                except:
-                    pass
+            self._finish_generation(generation, level="ERROR", status_message=str(e))
 
             logger.error(f"Error generating streaming response: {str(e)}")
             raise
 
+        finally:
+            if not completed:
+                # Stop the reader thread and abort the upstream response
+                cancelled.set()
+                if "body" in upstream:
+                    _close_quietly(upstream["body"])
+            self._stream_stats["active"] -= 1
+            self._stream_semaphore.release()
+
+    def _finish_generation(self, generation, **update: Any) -> None:
+        """Hand a started Langfuse generation to the background exporter"""
+        if generation is not None and self.telemetry is not None:
+            self.telemetry.finish_generation(generation, **update)
+
+    def warm_up_connection(self) -> None:
+        """
+        Resolve AWS credentials and open a pooled connection to Bedrock in every region (blocking)
+
+        Sends an invocation with an empty body, which Bedrock rejects with a
+        ValidationException before running the model, so no tokens are used.
+        Credential, permission and connection errors of the primary region are raised;
+        other regions are only logged, since calls fail over away from them.
+        """
+        for region in self.regions.regions:
+            try:
+                self.regions.client(region).invoke_model(modelId=self.default_model_id, body="{}")
+            except Exception as e:
+                if isinstance(e, ClientError) and (
+                    e.response.get("Error", {}).get("Code") == "ValidationException" or is_throttling_error(e)
+                ):
+                    continue
+                if region == self.regions.primary:
+                    raise
+                logger.warning(f"Could not warm up the Bedrock connection to {region}: {e}")
+
+    async def warm_up_models(self) -> List[str]:
+        """
+        Send a one-token invocation with the shared system prompt to each routed model
+
+        Besides the connection, this warms the model and, where supported, the Bedrock
+        prompt cache for the static system prompt.
+
+        Returns:
+            Model IDs that were invoked
+        """
+        model_ids = [self.model_router.strong_model_id]
+        if self.model_router.enabled and self.model_router.fast_model_id not in model_ids:
+            model_ids.append(self.model_router.fast_model_id)
+
+        messages = [{"role": "user", "content": "שלום"}]
+        selection = self.prompt_selector.select(messages[0]["content"])
+        for model_id in model_ids:
+            system = self._format_system(None, selection, model_id)
+            body = self._build_request_body(model_id, system, messages, 0.0, 1)
+            response_body = await self._invoke_model(model_id, body)
+            _, usage = self._parse_response(model_id, response_body)
+            logger.info(f"Warm-up invocation of {model_id} done ({self._format_usage(usage)})")
+        return model_ids
+
+    def close(self) -> None:
+        """Stop the Bedrock worker threads once in-flight calls finish and export pending telemetry"""
+        self._executor.shutdown(wait=False)
+        self._stream_executor.shutdown(wait=False)
+        if self._telemetry is not None:
+            self._telemetry.shutdown()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Per-model concurrency statistics
+
+        Returns:
+            Dictionary with in-flight, limit and rejected counts per model
+        """
+        completed = self._stream_stats["completed"]
+        chunk_gaps = self._stream_stats["chunks_total"] - completed
+        return {
+            "response_cache": self.response_cache.stats() if self.response_cache else None,
+            "coalescing": self.coalescer.stats() if self.coalescer else None,
+            "prompt_selection": self.prompt_selector.stats(),
+            "telemetry": self._telemetry.stats() if self._telemetry else None,
+            "model_routing": self.model_router.stats(),
+            "hedging": self.hedging.stats() if self.hedging else None,
+            "history": self.history_manager.stats() if self.history_manager else None,
+            "executor_workers": settings.bedrock_executor_workers,
+            "connection_pools": [pool for client in self.regions.clients().values() for pool in pool_stats(client)],
+            "regions": self.regions.stats(),
+            "streams": {
+                "active": self._stream_stats["active"],
+                "limit": settings.max_concurrent_streams,
+                "completed": completed,
+                "cancelled": self._stream_stats["cancelled"],
+                "rejected": self._stream_stats["rejected"],
+                "mean_ttfb_seconds": round(self._stream_stats["ttfb_seconds_total"] / completed, 4) if completed else None,
+                "mean_chunk_gap_ms": round(self._stream_stats["chunk_gap_seconds_total"] / chunk_gaps * 1000, 2) if chunk_gaps > 0 else None,
+            },
+            "models": self.governor.stats(),
+        }
+
+    def export_gauges(self) -> None:
+        """Set the Bedrock concurrency and connection pool gauges (called when metrics are scraped)"""
+        for gauge in (BEDROCK_IN_FLIGHT, BEDROCK_WAITING, BEDROCK_LIMIT, BEDROCK_POOL_SIZE, BEDROCK_POOL_IN_USE, BEDROCK_POOL_IDLE):
+            gauge.clear()
+        for model_id, stats in self.governor.stats().items():
+            BEDROCK_IN_FLIGHT.set(model_id, value=stats["in_flight"])
+            BEDROCK_WAITING.set(model_id, value=stats["waiting"])
+            BEDROCK_LIMIT.set(model_id, value=stats["limit"])
+        ACTIVE_STREAMS.set(value=self._stream_stats["active"])
+        for pool in (pool for client in self.regions.clients().values() for pool in pool_stats(client)):
+            BEDROCK_POOL_SIZE.set(pool["host"], value=pool["size"])
+            BEDROCK_POOL_IN_USE.set(pool["host"], value=pool["in_use"])
+            BEDROCK_POOL_IDLE.set(pool["host"], value=pool["idle"])
+
     def list_available_models(self) -> List[str]:
         """
         List available Bedrock models
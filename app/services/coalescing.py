@@ -0,0 +1,188 @@
+"""Single-flight coalescing of identical in-flight chat requests"""
+
+import json
+import asyncio
+import hashlib
+from typing import Optional, List, Dict, Any, Tuple, Callable, Awaitable, AsyncIterator
+from app.utils.text import normalize_hebrew
+
+# (normalized message, history hash, system prompt version, model id, temperature, max tokens)
+CoalescingKey = Tuple[str, str, Tuple[str, ...], str, float, int]
+
+
+def coalescing_key(
+    message: str,
+    messages: List[Dict[str, str]],
+    system_prompt: Optional[str],
+    prompt_versions: Tuple[str, ...],
+    model_id: Optional[str],
+    temperature: float,
+    max_tokens: int
+) -> Optional[CoalescingKey]:
+    """
+    Key identifying requests that can share one upstream invocation
+
+    Args:
+        message: User's message
+        messages: Bedrock messages array ending with the current message
+        system_prompt: Custom system prompt from the request, if any
+        prompt_versions: Versions of the shared system prompt, knowledge base and few-shots
+        model_id: Model named by the client, or None when the model is routed
+        temperature: Generation temperature
+        max_tokens: Maximum tokens to generate
+
+    Returns:
+        Key tuple, or None if the message has no matchable text
+    """
+    normalized = normalize_hebrew(message)
+    if not normalized:
+        return None
+
+    history = json.dumps(messages[:-1], ensure_ascii=False, sort_keys=True)
+    history_hash = hashlib.sha1(history.encode('utf-8')).hexdigest()
+    if system_prompt:
+        prompt_versions = ("custom", hashlib.sha1(system_prompt.encode('utf-8')).hexdigest())
+    return normalized, history_hash, tuple(prompt_versions), model_id or "auto", float(temperature), int(max_tokens)
+
+
+class _Broadcast:
+    """Chunks of one upstream stream, replayed to every subscriber"""
+
+    def __init__(self):
+        self.chunks: List[str] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    def notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def wait(self) -> None:
+        await self._changed.wait()
+
+
+class RequestCoalescer:
+    """
+    Shares one upstream invocation between concurrent identical requests
+
+    The first request for a key (the leader) starts the invocation; requests with
+    the same key that arrive while it is in flight wait for its result instead of
+    invoking Bedrock themselves. Streams are fanned out: every subscriber gets the
+    chunks received so far and then each new chunk. The upstream stream is
+    cancelled only when its last subscriber disconnects. Keys are forgotten as soon
+    as the invocation finishes, so nothing is served after the fact (that is the
+    response cache's job).
+    """
+
+    def __init__(self):
+        self._calls: Dict[CoalescingKey, asyncio.Future] = {}
+        self._streams: Dict[CoalescingKey, _Broadcast] = {}
+
+        self.calls = 0
+        self.coalesced_calls = 0
+        self.streams = 0
+        self.coalesced_streams = 0
+
+    async def run(self, key: CoalescingKey, factory: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """
+        Await the in-flight call for the key, starting it if there is none
+
+        Args:
+            key: Coalescing key
+            factory: Starts the upstream call
+
+        Returns:
+            Tuple of (call result, whether the result was shared from another request)
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if shared:
+            self.coalesced_calls += 1
+        else:
+            self.calls += 1
+            task = asyncio.ensure_future(factory())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._forget(self._calls, key, done))
+
+        # A caller that goes away must not cancel the call for the others
+        return await asyncio.shield(task), shared
+
+    async def stream(self, key: CoalescingKey, factory: Callable[[], AsyncIterator[str]]) -> AsyncIterator[str]:
+        """
+        Subscribe to the in-flight stream for the key, starting it if there is none
+
+        Args:
+            key: Coalescing key
+            factory: Opens the upstream stream (an async iterator of text chunks)
+
+        Yields:
+            Every chunk of the upstream stream, from the first one
+        """
+        broadcast = self._streams.get(key)
+        if broadcast is None:
+            self.streams += 1
+            broadcast = _Broadcast()
+            self._streams[key] = broadcast
+            broadcast.task = asyncio.ensure_future(self._produce(key, broadcast, factory))
+        else:
+            self.coalesced_streams += 1
+
+        broadcast.subscribers += 1
+        index = 0
+        try:
+            while True:
+                while index < len(broadcast.chunks):
+                    yield broadcast.chunks[index]
+                    index += 1
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                await broadcast.wait()
+        finally:
+            broadcast.subscribers -= 1
+            if broadcast.subscribers == 0 and not broadcast.done:
+                # Nobody is listening any more: cancel the upstream stream
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+                broadcast.task.cancel()
+                try:
+                    await broadcast.task
+                except BaseException:
+                    pass
+
+    async def _produce(self, key: CoalescingKey, broadcast: _Broadcast, factory: Callable[[], AsyncIterator[str]]) -> None:
+        upstream = factory()
+        try:
+            async for chunk in upstream:
+                broadcast.chunks.append(chunk)
+                broadcast.notify()
+        except Exception as e:
+            broadcast.error = e
+        finally:
+            await upstream.aclose()
+            broadcast.done = True
+            if self._streams.get(key) is broadcast:
+                del self._streams[key]
+            broadcast.notify()
+
+    @staticmethod
+    def _forget(calls: Dict[CoalescingKey, asyncio.Future], key: CoalescingKey, task: asyncio.Future) -> None:
+        if calls.get(key) is task:
+            del calls[key]
+        if not task.cancelled():
+            task.exception()  # Retrieved here so an unawaited failure is not reported as lost
+
+    def stats(self) -> Dict[str, Any]:
+        """Upstream invocations started vs. requests that joined one in flight"""
+        return {
+            "in_flight_calls": len(self._calls),
+            "in_flight_streams": len(self._streams),
+            "calls": self.calls,
+            "coalesced_calls": self.coalesced_calls,
+            "streams": self.streams,
+            "coalesced_streams": self.coalesced_streams,
+        }
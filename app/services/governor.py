@@ -0,0 +1,292 @@
+"""Per-model rate limiting, adaptive concurrency and retry backoff for Bedrock calls"""
+
+import time
+import random
+import asyncio
+from collections import deque
+from typing import Optional, Dict, Any, Deque
+from botocore.exceptions import ClientError
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+# Bedrock error codes that mean "slow down and try again"
+THROTTLING_ERROR_CODES = {
+    "ThrottlingException",
+    "TooManyRequestsException",
+    "ServiceUnavailableException",
+    "ModelNotReadyException",
+}
+
+
+class BedrockCapacityError(Exception):
+    """Raised when a request cannot be served within its deadline because a model is saturated"""
+
+    def __init__(self, model_id: str, retry_after: float, reason: str = "Too many concurrent requests"):
+        super().__init__(f"{reason} for model {model_id}")
+        self.model_id = model_id
+        self.retry_after = retry_after
+        self.reason = reason
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """Whether an exception from boto3 is a retryable throttling/unavailability error"""
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in THROTTLING_ERROR_CODES
+    return False
+
+
+class TokenBucket:
+    """Token bucket limiting the request start rate"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+
+    def reserve(self) -> float:
+        """
+        Take a token if one is available
+
+        Returns:
+            0.0 if a token was taken, otherwise the seconds until one is available
+        """
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class ModelGovernor:
+    """
+    Concurrency, rate and retry state for one model
+
+    The concurrency limit follows AIMD: it is halved whenever Bedrock throttles
+    (or latency exceeds the target) and grows by about one slot per window of
+    successful calls, never above the configured maximum.
+    """
+
+    def __init__(
+        self,
+        model_id: str,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        adaptive: bool = True,
+        rate: float = 0.0,
+        burst: int = 20,
+        latency_target_seconds: float = 0.0,
+        decrease_ratio: float = 0.5
+    ):
+        self.model_id = model_id
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min(min_concurrency, max_concurrency)
+        self.adaptive = adaptive
+        self.latency_target_seconds = latency_target_seconds
+        self.decrease_ratio = decrease_ratio
+        self.bucket = TokenBucket(rate, burst) if rate > 0 else None
+
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+
+        self.completed = 0
+        self.throttles = 0
+        self.retries = 0
+        self.rejected = 0
+        self.rate_limited = 0
+        self.latency_ewma: Optional[float] = None
+
+    @property
+    def current_limit(self) -> int:
+        return max(self.min_concurrency, int(self.limit))
+
+    async def acquire(self, deadline: float, queue_timeout: float) -> None:
+        """
+        Wait for a token and a concurrency slot
+
+        Args:
+            deadline: Monotonic time by which the request must have started
+            queue_timeout: Maximum time to wait for a slot
+
+        Raises:
+            BedrockCapacityError: If no slot or token is available in time
+        """
+        if self.bucket is not None:
+            while True:
+                wait = self.bucket.reserve()
+                if not wait:
+                    break
+                if time.monotonic() + wait > deadline:
+                    self.rate_limited += 1
+                    raise BedrockCapacityError(self.model_id, retry_after=wait, reason="Rate limit exceeded")
+                await asyncio.sleep(wait)
+
+        if self.in_flight < self.current_limit and not self._waiters:
+            self.in_flight += 1
+            return
+
+        timeout = min(queue_timeout, max(0.0, deadline - time.monotonic()))
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter, timeout=timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise BedrockCapacityError(self.model_id, retry_after=max(queue_timeout, 1.0))
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # The slot was granted just as the caller was cancelled
+                self._release_slot()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False) -> None:
+        """
+        Release a slot and adapt the limit
+
+        Args:
+            latency: Duration of a successful call, or None if it failed or was cancelled
+            throttled: Whether the call was throttled by Bedrock
+        """
+        if throttled:
+            self.throttles += 1
+            self._decrease()
+        elif latency is not None:
+            self.completed += 1
+            self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+            if self.latency_target_seconds and latency > self.latency_target_seconds:
+                self._decrease()
+            elif self.adaptive:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        self._release_slot()
+
+    def _decrease(self) -> None:
+        if self.adaptive:
+            self.limit = max(float(self.min_concurrency), self.limit * self.decrease_ratio)
+
+    def _release_slot(self) -> None:
+        self.in_flight -= 1
+        while self._waiters and self.in_flight < self.current_limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                self.in_flight += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": self.in_flight,
+            "waiting": len(self._waiters),
+            "limit": self.current_limit,
+            "max_limit": self.max_concurrency,
+            "completed": self.completed,
+            "throttles": self.throttles,
+            "retries": self.retries,
+            "rejected": self.rejected,
+            "rate_limited": self.rate_limited,
+            "latency_ewma_seconds": round(self.latency_ewma, 3) if self.latency_ewma is not None else None,
+        }
+
+
+class BedrockGovernor:
+    """
+    Admission control for Bedrock invocations, keyed by model id
+
+    Requests wait for a token (if rate limiting is configured) and a slot under the
+    model's adaptive concurrency limit. Throttled calls are retried with full-jitter
+    exponential backoff as long as the request deadline allows; otherwise the
+    request is shed with BedrockCapacityError carrying a Retry-After hint.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 16,
+        concurrency_overrides: Optional[Dict[str, int]] = None,
+        min_concurrency: int = 1,
+        adaptive: bool = True,
+        rate: float = 0.0,
+        burst: int = 20,
+        latency_target_seconds: float = 0.0,
+        queue_timeout_seconds: float = 30.0,
+        deadline_seconds: float = 60.0,
+        max_retries: int = 4,
+        backoff_base_seconds: float = 0.25,
+        backoff_max_seconds: float = 8.0
+    ):
+        self.concurrency = concurrency
+        self.concurrency_overrides = concurrency_overrides or {}
+        self.min_concurrency = min_concurrency
+        self.adaptive = adaptive
+        self.rate = rate
+        self.burst = burst
+        self.latency_target_seconds = latency_target_seconds
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.deadline_seconds = deadline_seconds
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self._models: Dict[str, ModelGovernor] = {}
+
+    def model(self, model_id: str) -> ModelGovernor:
+        """Get (creating on first use) the governor for a model"""
+        governor = self._models.get(model_id)
+        if governor is None:
+            governor = self._models.setdefault(model_id, ModelGovernor(
+                model_id,
+                max_concurrency=self.concurrency_overrides.get(model_id, self.concurrency),
+                min_concurrency=self.min_concurrency,
+                adaptive=self.adaptive,
+                rate=self.rate,
+                burst=self.burst,
+                latency_target_seconds=self.latency_target_seconds
+            ))
+        return governor
+
+    def deadline(self) -> float:
+        """Monotonic deadline for a request starting now"""
+        return time.monotonic() + self.deadline_seconds
+
+    async def acquire(self, model_id: str, deadline: float) -> None:
+        """Wait for a token and slot for the model (see ModelGovernor.acquire)"""
+        await self.model(model_id).acquire(deadline, self.queue_timeout_seconds)
+
+    def release(self, model_id: str, latency: Optional[float] = None, throttled: bool = False) -> None:
+        """Release a slot acquired with acquire()"""
+        self.model(model_id).release(latency=latency, throttled=throttled)
+
+    def retry_delay(self, model_id: str, attempt: int, deadline: float) -> float:
+        """
+        Backoff before retrying a throttled call
+
+        Args:
+            model_id: Model that throttled
+            attempt: Zero-based number of the attempt that failed
+            deadline: Request deadline
+
+        Returns:
+            Seconds to sleep before the next attempt
+
+        Raises:
+            BedrockCapacityError: If retries are exhausted or the backoff would pass the deadline
+        """
+        governor = self.model(model_id)
+        ceiling = min(self.backoff_max_seconds, self.backoff_base_seconds * (2 ** attempt))
+        delay = random.uniform(0, ceiling)
+
+        if attempt >= self.max_retries or time.monotonic() + delay > deadline:
+            governor.rejected += 1
+            logger.warning(f"Shedding request for {model_id} after {attempt + 1} throttled attempts")
+            raise BedrockCapacityError(model_id, retry_after=max(ceiling, 1.0), reason="Bedrock is throttling requests")
+
+        governor.retries += 1
+        logger.info(f"Bedrock throttled {model_id}, retrying in {delay:.2f}s (attempt {attempt + 2})")
+        return delay
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model governor statistics"""
+        return {model_id: governor.stats() for model_id, governor in self._models.items()}
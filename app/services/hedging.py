@@ -0,0 +1,124 @@
+"""Hedged Bedrock invocations for tail-latency reduction"""
+
+from collections import deque
+from typing import Optional, Dict, Any, Deque
+from app.services.model_router import ModelLatency
+
+
+def _percentile(samples: Deque[float], q: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _rounded(value: Optional[float]) -> Optional[float]:
+    return round(value, 3) if value is not None else None
+
+
+class HedgePolicy:
+    """
+    Decides when to hedge a Bedrock invocation and tracks what hedging costs and saves
+
+    A second invocation is fired once the first has been running longer than the
+    configured percentile of the model's recent latencies (clamped between
+    min_delay_seconds and max_delay_seconds; max_delay_seconds is used until
+    min_samples latencies were seen). Hedges spend credits that accrue at
+    budget_ratio per request, so at most that fraction of requests is hedged over
+    time (with up to `burst` hedges back to back).
+
+    The slower invocation is ignored but allowed to finish, so its latency gives the
+    latency the request would have had without hedging, and its tokens the extra cost.
+    """
+
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        min_delay_seconds: float = 1.0,
+        max_delay_seconds: float = 10.0,
+        min_samples: int = 20,
+        budget_ratio: float = 0.05,
+        burst: float = 5.0,
+        alternate_model_id: Optional[str] = None,
+        window: int = 500
+    ):
+        self.percentile = percentile
+        self.min_delay_seconds = min_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.min_samples = min_samples
+        self.budget_ratio = budget_ratio
+        self.burst = burst
+        self.alternate_model_id = alternate_model_id
+
+        self._latency: Dict[str, ModelLatency] = {}
+        self._credits = burst
+        self._served: Deque[float] = deque(maxlen=window)
+        self._unhedged: Deque[float] = deque(maxlen=window)
+
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self.extra_output_tokens = 0
+
+    def delay(self, model_id: str) -> float:
+        """Seconds to wait for the first invocation before hedging"""
+        latency = self._latency.get(model_id)
+        if latency is None or len(latency.samples) < self.min_samples:
+            return self.max_delay_seconds
+        return min(self.max_delay_seconds, max(self.min_delay_seconds, latency.percentile(self.percentile)))
+
+    def start(self) -> None:
+        """Count a request and accrue hedge budget"""
+        self.requests += 1
+        self._credits = min(self.burst, self._credits + self.budget_ratio)
+
+    def try_hedge(self) -> bool:
+        """Spend budget for a hedge; False if the hedge budget is exhausted"""
+        if self._credits < 1:
+            self.budget_denied += 1
+            return False
+        self._credits -= 1
+        self.hedged += 1
+        return True
+
+    def record_invocation(self, model_id: str, latency: float) -> None:
+        """Record the latency of one completed invocation (feeds the hedge delay)"""
+        self._latency.setdefault(model_id, ModelLatency()).samples.append(latency)
+
+    def record_served(self, latency: float, hedge_won: bool = False) -> None:
+        """Record the latency the caller saw"""
+        self._served.append(latency)
+        if hedge_won:
+            self.hedge_wins += 1
+        else:
+            # Without a hedge win the request would have taken just as long unhedged
+            self._unhedged.append(latency)
+
+    def record_slower(self, latency: Optional[float], output_tokens: int, was_first: bool) -> None:
+        """
+        Record the ignored invocation once it finishes
+
+        Args:
+            latency: Latency measured from the request start, or None if it failed
+            output_tokens: Tokens it generated (extra cost of the hedge)
+            was_first: Whether it was the original invocation (its latency is the unhedged latency)
+        """
+        self.extra_output_tokens += output_tokens
+        if was_first and latency is not None:
+            self._unhedged.append(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hedge rate, wins, extra cost and served vs. unhedged tail latency"""
+        return {
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.requests, 4) if self.requests else None,
+            "hedge_wins": self.hedge_wins,
+            "budget_denied": self.budget_denied,
+            "extra_output_tokens": self.extra_output_tokens,
+            "served_p50_seconds": _rounded(_percentile(self._served, 0.5)),
+            "served_p99_seconds": _rounded(_percentile(self._served, 0.99)),
+            "unhedged_p99_seconds": _rounded(_percentile(self._unhedged, 0.99)),
+            "delays_seconds": {model_id: _rounded(self.delay(model_id)) for model_id in self._latency},
+        }
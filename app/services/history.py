@@ -0,0 +1,193 @@
+"""Token budgeting for the conversation history sent to Bedrock"""
+
+import re
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+from app.utils.logger import get_logger
+from app.utils.prompt_format import estimate_tokens
+
+logger = get_logger(__name__)
+
+# Role/turn framing added by the model around every message
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_SENTENCE_END_RE = re.compile(r'(?<=[.!?:])\s|\n')
+
+HISTORY_STRATEGIES = ("drop", "summarize")
+
+
+def message_tokens(message: Dict[str, str]) -> int:
+    """Estimated tokens of one Bedrock message including framing"""
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD_TOKENS
+
+
+def _summary_line(message: Dict[str, str], max_chars: int) -> str:
+    """One-line extract of a message: its first sentence, truncated"""
+    text = message["content"].strip()
+    first = _SENTENCE_END_RE.split(text, maxsplit=1)[0].strip() or text
+    if len(first) > max_chars:
+        first = first[:max_chars].rstrip() + "…"
+    speaker = "User" if message["role"] == "user" else "Assistant"
+    return f"{speaker}: {first}"
+
+
+class HistoryManager:
+    """
+    Keeps the Bedrock messages array within a token budget
+
+    The newest messages are kept as long as they fit the budget (the current user
+    message is always kept). Older turns are either dropped or replaced by an
+    extractive summary that is folded into the first kept user message, so the
+    user/assistant alternation required by Claude is preserved.
+
+    Summaries are built from one line per message and cached under a hash chain of
+    the summarized prefix, so on the next turn only the newly dropped messages are
+    summarized.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 3000,
+        strategy: str = "summarize",
+        summary_max_tokens: int = 400,
+        summary_line_chars: int = 160,
+        cache_size: int = 1000
+    ):
+        if strategy not in HISTORY_STRATEGIES:
+            raise ValueError(f"Unknown history strategy: {strategy} (expected one of {', '.join(HISTORY_STRATEGIES)})")
+
+        self.max_tokens = max_tokens
+        self.strategy = strategy
+        self.summary_max_tokens = summary_max_tokens
+        self.summary_line_chars = summary_line_chars
+        self.cache_size = cache_size
+
+        self._summaries: "OrderedDict[str, List[str]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.truncated = 0
+        self.tokens_before_total = 0
+        self.tokens_saved_total = 0
+        self.summary_cache_hits = 0
+        self.summary_cache_misses = 0
+
+    def fit(self, messages: List[Dict[str, str]]) -> Tuple[List[Dict[str, str]], Optional[Dict[str, Any]]]:
+        """
+        Trim the messages array to the token budget
+
+        Args:
+            messages: Bedrock messages, ending with the current user message
+
+        Returns:
+            Tuple of (messages to send, truncation details or None if nothing was trimmed)
+        """
+        tokens = [message_tokens(message) for message in messages]
+        total = sum(tokens)
+        self.requests += 1
+        self.tokens_before_total += total
+
+        if total <= self.max_tokens or len(messages) <= 1:
+            return messages, None
+
+        # Keep the longest suffix that fits, always including the current message
+        budget = self.max_tokens
+        if self.strategy == "summarize":
+            budget -= self.summary_max_tokens
+        start = len(messages) - 1
+        used = tokens[start]
+        while start > 0 and used + tokens[start - 1] <= budget:
+            start -= 1
+            used += tokens[start]
+
+        # The kept history has to start with a user turn
+        while messages[start]["role"] != "user" and start < len(messages) - 1:
+            start += 1
+
+        kept = [dict(message) for message in messages[start:]]
+        summarized = False
+        if self.strategy == "summarize" and start > 0:
+            summary = self._summary(messages[:start])
+            kept[0]["content"] = f"<conversation_summary>\n{summary}\n</conversation_summary>\n\n{kept[0]['content']}"
+            summarized = True
+
+        after = sum(message_tokens(message) for message in kept)
+        saved = max(0, total - after)
+        self.truncated += 1
+        self.tokens_saved_total += saved
+
+        details = {
+            "strategy": self.strategy,
+            "messages_before": len(messages),
+            "messages_after": len(kept),
+            "summarized": summarized,
+            "tokens_before": total,
+            "tokens_after": after,
+            "tokens_saved": saved,
+        }
+        logger.info(
+            f"Conversation history trimmed: {len(messages)} -> {len(kept)} messages, "
+            f"~{total} -> ~{after} tokens ({self.strategy})"
+        )
+        return kept, details
+
+    def _summary(self, prefix: List[Dict[str, str]]) -> str:
+        """Extractive summary of the dropped messages, reusing the summary of the longest cached prefix"""
+        chain = []
+        digest = hashlib.sha1()
+        for message in prefix:
+            digest.update(f"{message['role']}\x00{message['content']}\x00".encode('utf-8'))
+            chain.append(digest.copy().hexdigest())
+
+        lines: List[str] = []
+        cached_length = 0
+        with self._lock:
+            for length in range(len(chain), 0, -1):
+                cached = self._summaries.get(chain[length - 1])
+                if cached is not None:
+                    self._summaries.move_to_end(chain[length - 1])
+                    lines, cached_length = list(cached), length
+                    break
+
+        if cached_length == len(prefix):
+            self.summary_cache_hits += 1
+        else:
+            self.summary_cache_misses += 1
+            lines.extend(_summary_line(message, self.summary_line_chars) for message in prefix[cached_length:])
+            with self._lock:
+                self._summaries[chain[-1]] = lines
+                self._summaries.move_to_end(chain[-1])
+                while len(self._summaries) > self.cache_size:
+                    self._summaries.popitem(last=False)
+
+        # Most recent lines are the most relevant; keep as many as fit the summary budget
+        rendered: List[str] = []
+        used = 0
+        for line in reversed(lines):
+            line_tokens = estimate_tokens(line) + 1
+            if used + line_tokens > self.summary_max_tokens:
+                break
+            rendered.append(line)
+            used += line_tokens
+        rendered.reverse()
+
+        omitted = len(lines) - len(rendered)
+        if omitted:
+            rendered.insert(0, f"({omitted} earlier messages omitted)")
+        return '\n'.join(rendered)
+
+    def stats(self) -> Dict[str, Any]:
+        """Truncation counters and tokens saved"""
+        return {
+            "max_tokens": self.max_tokens,
+            "strategy": self.strategy,
+            "requests": self.requests,
+            "truncated": self.truncated,
+            "tokens_saved_total": self.tokens_saved_total,
+            "mean_tokens_saved": round(self.tokens_saved_total / self.requests, 1) if self.requests else None,
+            "summary_cache_size": len(self._summaries),
+            "summary_cache_hits": self.summary_cache_hits,
+            "summary_cache_misses": self.summary_cache_misses,
+        }
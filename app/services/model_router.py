@@ -0,0 +1,160 @@
+"""Routing of requests between a fast and a strong Bedrock model, with fallback"""
+
+from collections import deque, Counter
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Deque
+from app.utils.text import normalize_hebrew
+
+FAST = "fast"
+STRONG = "strong"
+EXPLICIT = "explicit"
+
+
+@dataclass
+class RoutingDecision:
+    """Model chosen for a request and the models to try if it fails"""
+    model_id: str
+    tier: str
+    reason: str
+    fallbacks: List[str] = field(default_factory=list)
+
+    @property
+    def candidates(self) -> List[str]:
+        return [self.model_id] + self.fallbacks
+
+
+class ModelLatency:
+    """Latency samples and error counts for one model"""
+
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.requests = 0
+        self.errors = 0
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def stats(self) -> Dict[str, Any]:
+        p50 = self.percentile(0.5)
+        p95 = self.percentile(0.95)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "p50_seconds": round(p50, 3) if p50 is not None else None,
+            "p95_seconds": round(p95, 3) if p95 is not None else None,
+        }
+
+
+class ModelRouter:
+    """
+    Chooses the model for each request
+
+    Short first questions that the knowledge base router matched to a topic go to
+    the fast model; long questions, longer conversations and questions that match
+    no topic go to the strong model. A request that fails or times out on its model
+    is retried on the other tier and then on the configured fallback models.
+    Requests that name a model explicitly are not routed and do not fall back.
+    """
+
+    def __init__(
+        self,
+        fast_model_id: str,
+        strong_model_id: str,
+        enabled: bool = True,
+        simple_max_chars: int = 120,
+        simple_max_turns: int = 4,
+        fallback_model_ids: Optional[List[str]] = None
+    ):
+        self.fast_model_id = fast_model_id
+        self.strong_model_id = strong_model_id
+        self.enabled = enabled
+        self.simple_max_chars = simple_max_chars
+        self.simple_max_turns = simple_max_turns
+        self.fallback_model_ids = fallback_model_ids or []
+
+        self.decisions: Counter = Counter()
+        self.fallbacks = 0
+        self.escalations = 0
+        self._latency: Dict[str, ModelLatency] = {}
+
+    def route(
+        self,
+        message: str,
+        requested_model_id: Optional[str] = None,
+        history_turns: int = 0,
+        selection_metadata: Optional[Dict[str, Any]] = None
+    ) -> RoutingDecision:
+        """
+        Decide which model serves a request
+
+        Args:
+            message: User's message
+            requested_model_id: Model named by the client, if any
+            history_turns: Number of previous messages in the conversation
+            selection_metadata: Prompt selection metadata (knowledge base routing result)
+
+        Returns:
+            RoutingDecision with the primary model and ordered fallbacks
+        """
+        if requested_model_id:
+            decision = RoutingDecision(requested_model_id, EXPLICIT, "requested")
+        elif not self.enabled:
+            decision = RoutingDecision(self.strong_model_id, STRONG, "routing_disabled", self._fallbacks(self.strong_model_id))
+        else:
+            tier, reason = self._classify(message, history_turns, selection_metadata or {})
+            model_id = self.fast_model_id if tier == FAST else self.strong_model_id
+            decision = RoutingDecision(model_id, tier, reason, self._fallbacks(model_id))
+
+        self.decisions[f"{decision.tier}:{decision.reason}"] += 1
+        return decision
+
+    def _classify(self, message: str, history_turns: int, selection_metadata: Dict[str, Any]) -> tuple:
+        if len(normalize_hebrew(message)) > self.simple_max_chars:
+            return STRONG, "long_message"
+        if history_turns > self.simple_max_turns:
+            return STRONG, "long_conversation"
+        if message.count('?') > 1:
+            return STRONG, "multiple_questions"
+
+        kb_routing = selection_metadata.get("kb_routing")
+        if kb_routing is not None and kb_routing.get("fallback"):
+            return STRONG, "no_topic_match"
+
+        return FAST, "simple_question"
+
+    def _fallbacks(self, model_id: str) -> List[str]:
+        chain = []
+        for candidate in [self.strong_model_id, self.fast_model_id] + self.fallback_model_ids:
+            if candidate != model_id and candidate not in chain:
+                chain.append(candidate)
+        return chain
+
+    def escalation(self, decision: RoutingDecision) -> Optional[str]:
+        """Model to escalate to when the fast model's answer is unusable, if any"""
+        if decision.tier == FAST and self.strong_model_id != decision.model_id:
+            return self.strong_model_id
+        return None
+
+    def record(self, model_id: str, latency: Optional[float], error: bool = False) -> None:
+        """Record the outcome of one model invocation"""
+        stats = self._latency.setdefault(model_id, ModelLatency())
+        stats.requests += 1
+        if error:
+            stats.errors += 1
+        elif latency is not None:
+            stats.samples.append(latency)
+
+    def stats(self) -> Dict[str, Any]:
+        """Routing decisions, fallbacks and per-model latency"""
+        return {
+            "enabled": self.enabled,
+            "fast_model_id": self.fast_model_id,
+            "strong_model_id": self.strong_model_id,
+            "decisions": dict(self.decisions),
+            "fallbacks": self.fallbacks,
+            "escalations": self.escalations,
+            "models": {model_id: latency.stats() for model_id, latency in self._latency.items()},
+        }
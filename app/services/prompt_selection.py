@@ -0,0 +1,294 @@
+"""Per-request selection of few-shot examples and knowledge base categories for the system prompt"""
+
+import time
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Any, Tuple, Counter
+from app.utils.logger import get_logger
+from app.utils.text import normalize_hebrew, char_ngrams, vector_norm, cosine_similarity
+from app.utils.prompt_format import serialize_for_prompt
+from config.settings import PromptCache, PromptSnapshot
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class PromptSelection:
+    """Per-request prompt subsets; None means the full section from the cached prompt is used"""
+    few_shots: Optional[Dict[str, Any]] = None
+    knowledge_base: Optional[Dict[str, Any]] = None
+    metadata: Dict[str, Any] = field(default_factory=dict)
+
+
+class FewShotRetriever:
+    """
+    Character n-gram index over few-shot examples
+
+    Each example is indexed by its user_query and its classification main/sub topic.
+    """
+
+    def __init__(self, few_shots: Dict[str, Any]):
+        self.few_shots = few_shots
+        self._index: List[Tuple[Dict[str, Any], Counter, float]] = []
+
+        for example in few_shots.get('few_shot_examples', []):
+            classification = example.get('classification', {})
+            text = ' '.join([
+                example.get('user_query', ''),
+                classification.get('main_topic', ''),
+                classification.get('sub_topic', ''),
+            ])
+            grams = char_ngrams(normalize_hebrew(text))
+            self._index.append((example, grams, vector_norm(grams)))
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def search(self, message: str, top_k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        Find the examples most similar to the message
+
+        Args:
+            message: User's message
+            top_k: Number of examples to return
+
+        Returns:
+            List of (example, similarity) sorted by descending similarity
+        """
+        grams = char_ngrams(normalize_hebrew(message))
+        norm = vector_norm(grams)
+        scored = [
+            (example, cosine_similarity(grams, example_grams, norm, example_norm))
+            for example, example_grams, example_norm in self._index
+        ]
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:top_k]
+
+    def select(self, message: str, top_k: int) -> Dict[str, Any]:
+        """
+        Build a few-shots document containing only the top-k examples
+
+        Other top-level keys (e.g. classification_patterns) are kept as-is.
+        """
+        subset = dict(self.few_shots)
+        subset['few_shot_examples'] = [example for example, _ in self.search(message, top_k)]
+        return subset
+
+
+class KnowledgeBaseRouter:
+    """
+    Routes messages to knowledge base categories by main_topic_code
+
+    Every sub-topic is indexed as character n-grams of its category's main topic
+    together with the sub-topic name, description and common queries. A category
+    scores as its best matching sub-topic.
+    """
+
+    def __init__(self, knowledge_base: Dict[str, Any], serialization_format: str = "minified"):
+        self.knowledge_base = knowledge_base
+        self._index: List[Tuple[int, Counter, float]] = []
+        self._category_chars: List[int] = []
+
+        self.categories = self._categories(knowledge_base)
+        for position, category in enumerate(self.categories):
+            self._category_chars.append(len(serialize_for_prompt(category, serialization_format)))
+
+            main_topic = category.get('main_topic', '')
+            sub_topics = category.get('sub_topics') or [{}]
+            for sub_topic in sub_topics:
+                parts = [main_topic]
+                if isinstance(sub_topic, dict):
+                    parts.append(sub_topic.get('sub_topic', ''))
+                    parts.append(sub_topic.get('description', ''))
+                    parts.extend(q for q in sub_topic.get('common_queries', []) if isinstance(q, str))
+                else:
+                    parts.append(str(sub_topic))
+                grams = char_ngrams(normalize_hebrew(' '.join(parts)))
+                self._index.append((position, grams, vector_norm(grams)))
+
+        self.total_chars = sum(self._category_chars)
+
+    @staticmethod
+    def _categories(knowledge_base: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Locate the categories list (either nested under "knowledge_base" or top-level)"""
+        container = knowledge_base.get('knowledge_base', knowledge_base)
+        categories = container.get('categories', []) if isinstance(container, dict) else []
+        return [c for c in categories if isinstance(c, dict)]
+
+    def __len__(self) -> int:
+        return len(self.categories)
+
+    def route(self, message: str, max_categories: int, min_score: float) -> Tuple[List[int], Dict[int, float]]:
+        """
+        Score categories for a message
+
+        Args:
+            message: User's message
+            max_categories: Maximum number of categories to route to
+            min_score: Minimum similarity for a category to be selected
+
+        Returns:
+            Tuple of (selected category positions, best score per category position)
+        """
+        grams = char_ngrams(normalize_hebrew(message))
+        norm = vector_norm(grams)
+
+        scores: Dict[int, float] = {}
+        for position, sub_grams, sub_norm in self._index:
+            score = cosine_similarity(grams, sub_grams, norm, sub_norm)
+            if score > scores.get(position, 0.0):
+                scores[position] = score
+
+        ranked = sorted(scores, key=scores.get, reverse=True)
+        selected = [position for position in ranked[:max_categories] if scores[position] >= min_score]
+        return selected, scores
+
+    def subset(self, positions: List[int]) -> Dict[str, Any]:
+        """Build a knowledge base document containing only the given categories"""
+        categories = [self.categories[position] for position in sorted(positions)]
+        if 'knowledge_base' in self.knowledge_base and isinstance(self.knowledge_base['knowledge_base'], dict):
+            inner = dict(self.knowledge_base['knowledge_base'])
+            inner['categories'] = categories
+            subset = dict(self.knowledge_base)
+            subset['knowledge_base'] = inner
+            return subset
+
+        subset = dict(self.knowledge_base)
+        subset['categories'] = categories
+        return subset
+
+    def selected_chars(self, positions: List[int]) -> int:
+        """Approximate serialized size of the selected categories"""
+        return sum(self._category_chars[position] for position in positions)
+
+
+class PromptSelector:
+    """
+    Chooses the prompt subsets for each request
+
+    Indexes are rebuilt off the request path whenever the prompt cache picks up a
+    new version, so selection is a pure in-memory lookup.
+    """
+
+    def __init__(
+        self,
+        cache: PromptCache,
+        few_shot_top_k: int = 0,
+        kb_routing_enabled: bool = False,
+        kb_max_categories: int = 2,
+        kb_min_score: float = 0.2,
+        serialization_format: str = "minified"
+    ):
+        self._cache = cache
+        self.few_shot_top_k = few_shot_top_k
+        self.kb_routing_enabled = kb_routing_enabled
+        self.kb_max_categories = kb_max_categories
+        self.kb_min_score = kb_min_score
+        self.serialization_format = serialization_format
+        self._few_shot_retriever: Optional[FewShotRetriever] = None
+        self._kb_router: Optional[KnowledgeBaseRouter] = None
+
+        self.kb_routed = 0
+        self.kb_fallbacks = 0
+        self.kb_chars_saved = 0
+
+        cache.add_listener(self._rebuild)
+        if cache.snapshot is not None:
+            self._rebuild(cache.snapshot)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether any per-request selection is configured"""
+        return self.few_shot_top_k > 0 or self.kb_routing_enabled
+
+    def _rebuild(self, snapshot: PromptSnapshot) -> None:
+        """Rebuild indexes for a new prompt snapshot"""
+        if self.few_shot_top_k > 0:
+            start_time = time.perf_counter()
+            retriever = FewShotRetriever(snapshot.few_shots)
+            self._few_shot_retriever = retriever
+            logger.info(
+                f"Built few-shot index: {len(retriever)} examples "
+                f"in {(time.perf_counter() - start_time) * 1000:.1f}ms"
+            )
+
+        if self.kb_routing_enabled:
+            start_time = time.perf_counter()
+            router = KnowledgeBaseRouter(snapshot.knowledge_base, self.serialization_format)
+            self._kb_router = router
+            logger.info(
+                f"Built knowledge base routing index: {len(router)} categories "
+                f"in {(time.perf_counter() - start_time) * 1000:.1f}ms"
+            )
+
+    def select(self, message: str) -> PromptSelection:
+        """
+        Select prompt subsets for a message
+
+        Args:
+            message: User's message
+
+        Returns:
+            PromptSelection with the subsets to inject
+        """
+        selection = PromptSelection()
+        if not self.enabled:
+            return selection
+
+        if self._cache.snapshot is None:
+            # Cold cache: loading the prompt builds the indexes through the listener
+            self._cache.get()
+
+        retriever = self._few_shot_retriever
+        if retriever is not None and len(retriever) > self.few_shot_top_k:
+            selection.few_shots = retriever.select(message, self.few_shot_top_k)
+            selection.metadata["few_shot_ids"] = [
+                example.get('id') for example in selection.few_shots['few_shot_examples']
+            ]
+
+        router = self._kb_router
+        if router is not None and len(router) > 1:
+            self._route_knowledge_base(router, message, selection)
+
+        return selection
+
+    def _route_knowledge_base(self, router: KnowledgeBaseRouter, message: str, selection: PromptSelection) -> None:
+        """Restrict the knowledge base to the routed categories, or keep all of it when nothing matches"""
+        positions, scores = router.route(message, self.kb_max_categories, self.kb_min_score)
+        top_scores = {
+            router.categories[position].get('main_topic_code', str(position)): round(score, 3)
+            for position, score in sorted(scores.items(), key=lambda item: item[1], reverse=True)[:3]
+        }
+
+        if not positions:
+            self.kb_fallbacks += 1
+            selection.metadata["kb_routing"] = {
+                "topic_codes": None,
+                "fallback": True,
+                "top_scores": top_scores,
+                "prompt_chars": router.total_chars,
+                "prompt_chars_full": router.total_chars,
+            }
+            return
+
+        selected_chars = router.selected_chars(positions)
+        self.kb_routed += 1
+        self.kb_chars_saved += router.total_chars - selected_chars
+
+        selection.knowledge_base = router.subset(positions)
+        selection.metadata["kb_routing"] = {
+            "topic_codes": [router.categories[position].get('main_topic_code') for position in positions],
+            "fallback": False,
+            "top_scores": top_scores,
+            "prompt_chars": selected_chars,
+            "prompt_chars_full": router.total_chars,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        """Routing counters for auditing prompt-size savings"""
+        return {
+            "few_shot_top_k": self.few_shot_top_k,
+            "kb_routing_enabled": self.kb_routing_enabled,
+            "kb_routed": self.kb_routed,
+            "kb_fallbacks": self.kb_fallbacks,
+            "kb_chars_saved": self.kb_chars_saved,
+        }
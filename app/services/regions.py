@@ -0,0 +1,239 @@
+"""Latency-aware selection and failover between Bedrock regions"""
+
+import time
+import random
+import threading
+from typing import Optional, List, Dict, Any, Callable
+from botocore.exceptions import ClientError, ConnectionError as BotoConnectionError, HTTPClientError
+from app.services.governor import THROTTLING_ERROR_CODES, is_throttling_error
+from app.utils.logger import get_logger
+from app.utils.metrics import BEDROCK_REGION_REQUESTS, BEDROCK_REGION_LATENCY
+
+logger = get_logger(__name__)
+
+INVOKE = "invoke"
+STREAM = "stream"
+
+# Errors that say more about the region than about the request, so another region may succeed
+REGIONAL_ERROR_CODES = THROTTLING_ERROR_CODES | {
+    "InternalServerException",
+    "ModelTimeoutException",
+}
+
+
+def is_regional_error(error: Exception) -> bool:
+    """Whether a boto3 error is worth retrying in another region (throttling, server or connection errors)"""
+    if isinstance(error, ClientError):
+        return error.response.get("Error", {}).get("Code") in REGIONAL_ERROR_CODES
+    return isinstance(error, (BotoConnectionError, HTTPClientError))
+
+
+class RegionStats:
+    """Per-region EWMA latency (per call kind), EWMA error rate and counters"""
+
+    def __init__(self, region: str):
+        self.region = region
+        self.latency: Dict[str, float] = {}
+        self.error_rate = 0.0
+        self.cooldown_until = 0.0
+        self.requests = 0
+        self.errors = 0
+        self.throttled = 0
+
+
+class RegionPool:
+    """
+    bedrock-runtime clients for several regions, ordered by observed performance
+
+    Each region is scored by its EWMA latency for the kind of call (full invocation time
+    per output token, so long answers do not count against a region, or time to the
+    first stream event) times (1 + error_penalty * EWMA error rate). Calls
+    go to the best region and fail over to the next on throttling, server or connection
+    errors; a failing region is skipped for cooldown_seconds. Regions without latency
+    samples score like the best sampled one, so ties go to the configured order, and a
+    small share of calls explores the other regions to keep their estimates fresh.
+    """
+
+    def __init__(
+        self,
+        regions: List[str],
+        client_factory: Callable[[str], Any],
+        latency_alpha: float = 0.2,
+        error_alpha: float = 0.1,
+        error_penalty: float = 4.0,
+        cooldown_seconds: float = 30.0,
+        explore_ratio: float = 0.02
+    ):
+        """
+        Initialize the pool
+
+        Args:
+            regions: AWS regions, preferred first
+            client_factory: Creates the bedrock-runtime client for a region (called on first use)
+            latency_alpha: EWMA weight of the newest latency sample
+            error_alpha: EWMA weight of the newest success/failure
+            error_penalty: How strongly the error rate inflates a region's latency score
+            cooldown_seconds: Time a region is skipped after a regional error
+            explore_ratio: Share of calls sent to a random other region
+        """
+        self.regions = list(dict.fromkeys(regions))
+        self.client_factory = client_factory
+        self.latency_alpha = latency_alpha
+        self.error_alpha = error_alpha
+        self.error_penalty = error_penalty
+        self.cooldown_seconds = cooldown_seconds
+        self.explore_ratio = explore_ratio
+
+        self._lock = threading.Lock()
+        self._clients: Dict[str, Any] = {}
+        self._stats = {region: RegionStats(region) for region in self.regions}
+        self.failovers = 0
+
+    @property
+    def primary(self) -> str:
+        return self.regions[0]
+
+    def __len__(self) -> int:
+        return len(self.regions)
+
+    def client(self, region: str):
+        """Client for a region, created on first use"""
+        client = self._clients.get(region)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(region)
+                if client is None:
+                    client = self._clients[region] = self.client_factory(region)
+        return client
+
+    def set_client(self, region: str, client) -> None:
+        """Use a given client for a region"""
+        self._clients[region] = client
+
+    def clients(self) -> Dict[str, Any]:
+        """Clients created so far, by region"""
+        return dict(self._clients)
+
+    def _score(self, stats: RegionStats, kind: str, best_latency: float) -> float:
+        latency = stats.latency.get(kind, best_latency)
+        return latency * (1 + self.error_penalty * stats.error_rate)
+
+    def order(self, kind: str = INVOKE, alternate: bool = False) -> List[str]:
+        """
+        Regions in the order to try them for one call
+
+        Args:
+            kind: INVOKE or STREAM, the latency estimate to rank by
+            alternate: Move the best region to the end (e.g. for a hedged invocation)
+
+        Returns:
+            Regions outside their cooldown ranked by score, then those cooling down
+        """
+        now = time.monotonic()
+        with self._lock:
+            sampled = [stats.latency[kind] for stats in self._stats.values() if kind in stats.latency]
+            best_latency = min(sampled) if sampled else 0.0
+            ranked = sorted(
+                self.regions,
+                key=lambda region: (
+                    self._stats[region].cooldown_until > now,
+                    self._score(self._stats[region], kind, best_latency),
+                    self.regions.index(region),
+                )
+            )
+
+        if len(ranked) > 1 and (alternate or random.random() < self.explore_ratio):
+            if alternate:
+                ranked.append(ranked.pop(0))
+            else:
+                ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    def record_success(self, region: str, kind: str, latency: float, output_tokens: Optional[int] = None) -> None:
+        """Update a region's latency estimate; with output_tokens the sample is the latency per token"""
+        if output_tokens is not None:
+            latency /= max(output_tokens, 1)
+        with self._lock:
+            stats = self._stats[region]
+            stats.requests += 1
+            previous = stats.latency.get(kind)
+            stats.latency[kind] = latency if previous is None else (
+                self.latency_alpha * latency + (1 - self.latency_alpha) * previous
+            )
+            stats.error_rate *= 1 - self.error_alpha
+        BEDROCK_REGION_REQUESTS.inc(region, "ok")
+        BEDROCK_REGION_LATENCY.set(region, kind, value=stats.latency[kind])
+
+    def record_failure(self, region: str, error: Exception) -> None:
+        """Count a regional error and put the region into cooldown"""
+        throttled = is_throttling_error(error)
+        with self._lock:
+            stats = self._stats[region]
+            stats.requests += 1
+            stats.errors += 1
+            stats.throttled += int(throttled)
+            stats.error_rate = self.error_alpha + (1 - self.error_alpha) * stats.error_rate
+            stats.cooldown_until = time.monotonic() + self.cooldown_seconds
+        BEDROCK_REGION_REQUESTS.inc(region, "throttled" if throttled else "error")
+
+    def call(
+        self,
+        kind: str,
+        call: Callable[[Any], Any],
+        alternate: bool = False,
+        output_tokens: Optional[Callable[[Any], Optional[int]]] = None
+    ):
+        """
+        Run a blocking boto3 call in the best region, failing over on regional errors
+
+        Args:
+            kind: INVOKE or STREAM, the latency estimate the call updates
+            call: Called with the region's client
+            alternate: Start with the second-best region
+            output_tokens: Reads the output token count from a result, to rank by latency per token
+
+        Returns:
+            The call's result
+
+        Raises:
+            The last regional error if every region failed, or any non-regional error at once
+        """
+        last_error: Optional[Exception] = None
+        for attempt, region in enumerate(self.order(kind, alternate)):
+            if attempt:
+                self.failovers += 1
+                logger.warning(f"Bedrock {kind} failing over to {region}: {type(last_error).__name__}: {last_error}")
+            start_time = time.monotonic()
+            try:
+                result = call(self.client(region))
+            except Exception as e:
+                if not is_regional_error(e):
+                    raise
+                self.record_failure(region, e)
+                last_error = e
+                continue
+            self.record_success(
+                region, kind, time.monotonic() - start_time,
+                output_tokens(result) if output_tokens is not None else None
+            )
+            return result
+        raise last_error
+
+    def stats(self) -> Dict[str, Any]:
+        """Traffic share, latency (per output token for invocations), error rate and cooldown per region"""
+        now = time.monotonic()
+        with self._lock:
+            total = sum(stats.requests for stats in self._stats.values())
+            regions = {
+                region: {
+                    "requests": stats.requests,
+                    "share": round(stats.requests / total, 3) if total else None,
+                    "errors": stats.errors,
+                    "throttled": stats.throttled,
+                    "ewma_latency_ms": {kind: round(value * 1000, 1) for kind, value in stats.latency.items()},
+                    "ewma_error_rate": round(stats.error_rate, 3),
+                    "cooldown_seconds": round(max(0.0, stats.cooldown_until - now), 1),
+                }
+                for region, stats in self._stats.items()
+            }
+        return {"primary": self.primary, "failovers": self.failovers, "regions": regions}
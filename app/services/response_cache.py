@@ -0,0 +1,184 @@
+"""Semantic response cache for repeated first-turn questions"""
+
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any, Tuple, Counter, FrozenSet
+from app.utils.logger import get_logger
+from app.utils.text import normalize_hebrew, key_terms, char_ngrams, vector_norm, cosine_similarity
+
+logger = get_logger(__name__)
+
+# (system prompt version, few-shots version, model id, temperature, max tokens)
+CacheScope = Tuple[str, str, str, float, int]
+
+
+@dataclass
+class CacheEntry:
+    """A cached answer together with the data needed to match and invalidate it"""
+    normalized: str
+    grams: Counter
+    norm: float
+    terms: FrozenSet[str]
+    response: str
+    kb_version: str
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of Bedrock answers for first-turn questions
+
+    Questions are matched after Hebrew normalization, first exactly and then by
+    character trigram cosine similarity against entries with the same scope
+    (prompt versions, model and generation parameters). A near-duplicate must also
+    contain the same numbers, negations and status words (see key_terms), which
+    decide the answer but hardly change the trigrams. Entries built against an
+    older knowledge base version are dropped when they are looked up.
+    """
+
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600, similarity_threshold: float = 0.92):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+
+        self._entries: "OrderedDict[Tuple[CacheScope, str], CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.similar_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_scope(
+        prompt_versions: Tuple[str, str, str],
+        model_id: str,
+        temperature: float,
+        max_tokens: int
+    ) -> Tuple[CacheScope, str]:
+        """
+        Split prompt versions into the match scope and the knowledge base version
+
+        Args:
+            prompt_versions: (system, knowledge base, few-shots) version triple
+            model_id: Bedrock model ID
+            temperature: Generation temperature
+            max_tokens: Maximum tokens to generate
+
+        Returns:
+            Tuple of (scope, knowledge base version)
+        """
+        system_version, kb_version, fs_version = prompt_versions
+        return (system_version, fs_version, model_id, float(temperature), int(max_tokens)), kb_version
+
+    def get(self, message: str, scope: CacheScope, kb_version: str) -> Optional[str]:
+        """
+        Look up a cached answer for the message
+
+        Args:
+            message: User's question
+            scope: Match scope from make_scope
+            kb_version: Current knowledge base version
+
+        Returns:
+            Cached answer, or None on a miss
+        """
+        normalized = normalize_hebrew(message)
+        if not normalized:
+            return None
+
+        now = time.monotonic()
+        with self._lock:
+            key = (scope, normalized)
+            entry = self._entries.get(key)
+            if entry is not None and self._is_valid(entry, kb_version, now):
+                self._entries.move_to_end(key)
+                self.exact_hits += 1
+                return entry.response
+            if entry is not None:
+                self._remove(key)
+
+            grams = char_ngrams(normalized)
+            norm = vector_norm(grams)
+            terms = key_terms(normalized)
+            best_key = None
+            best_score = 0.0
+            for candidate_key, candidate in list(self._entries.items()):
+                if candidate_key[0] != scope or candidate.terms != terms:
+                    continue
+                if not self._is_valid(candidate, kb_version, now):
+                    self._remove(candidate_key)
+                    continue
+                score = cosine_similarity(grams, candidate.grams, norm, candidate.norm)
+                if score > best_score:
+                    best_key, best_score = candidate_key, score
+
+            if best_key is not None and best_score >= self.similarity_threshold:
+                self._entries.move_to_end(best_key)
+                self.similar_hits += 1
+                logger.info(f"Response cache near-duplicate hit (similarity {best_score:.2f})")
+                return self._entries[best_key].response
+
+            self.misses += 1
+            return None
+
+    def put(self, message: str, response: str, scope: CacheScope, kb_version: str) -> None:
+        """
+        Store an answer for the message
+
+        Args:
+            message: User's question
+            response: Generated answer
+            scope: Match scope from make_scope
+            kb_version: Knowledge base version the answer was generated with
+        """
+        normalized = normalize_hebrew(message)
+        if not normalized:
+            return
+
+        grams = char_ngrams(normalized)
+        entry = CacheEntry(
+            normalized=normalized,
+            grams=grams,
+            norm=vector_norm(grams),
+            terms=key_terms(normalized),
+            response=response,
+            kb_version=kb_version
+        )
+
+        with self._lock:
+            key = (scope, normalized)
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        """Drop all cached answers"""
+        with self._lock:
+            self._entries.clear()
+
+    def _is_valid(self, entry: CacheEntry, kb_version: str, now: float) -> bool:
+        return entry.kb_version == kb_version and now - entry.created_at < self.ttl_seconds
+
+    def _remove(self, key: Tuple[CacheScope, str]) -> None:
+        del self._entries[key]
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/eviction counters and current size"""
+        lookups = self.exact_hits + self.similar_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "exact_hits": self.exact_hits,
+            "similar_hits": self.similar_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.exact_hits + self.similar_hits) / lookups, 3) if lookups else None,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
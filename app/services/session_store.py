@@ -0,0 +1,281 @@
+"""Server-side conversation sessions"""
+
+import time
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+StoredMessage = Dict[str, str]
+
+
+class SessionNotFoundError(KeyError):
+    """Raised when a conversation id is unknown or its session expired"""
+
+    def __init__(self, conversation_id: str):
+        super().__init__(conversation_id)
+        self.conversation_id = conversation_id
+
+    def __str__(self) -> str:
+        return f"Conversation not found: {self.conversation_id}"
+
+
+class SQLiteSessionBackend:
+    """Persistent session storage in a local SQLite database"""
+
+    def __init__(self, path: str):
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "conversation_id TEXT PRIMARY KEY, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS messages ("
+                "conversation_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, "
+                "PRIMARY KEY (conversation_id, seq))"
+            )
+
+    def load(self, conversation_id: str) -> Optional[Tuple[List[StoredMessage], float]]:
+        """Load a session's messages and last update time, or None if it does not exist"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT updated_at FROM sessions WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            rows = self._conn.execute(
+                "SELECT role, content FROM messages WHERE conversation_id = ? ORDER BY seq", (conversation_id,)
+            ).fetchall()
+        return [{"role": role, "content": content} for role, content in rows], row[0]
+
+    def version(self, conversation_id: str) -> Optional[Tuple[int, float]]:
+        """Message count and last update time of a session, or None if it does not exist"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT (SELECT COUNT(*) FROM messages WHERE conversation_id = ?), updated_at "
+                "FROM sessions WHERE conversation_id = ?", (conversation_id, conversation_id)
+            ).fetchone()
+        return (row[0], row[1]) if row is not None else None
+
+    def create(self, conversation_id: str, updated_at: float) -> None:
+        """Persist a new empty session"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO sessions (conversation_id, updated_at) VALUES (?, ?)", (conversation_id, updated_at)
+            )
+
+    def append(self, conversation_id: str, messages: List[StoredMessage], updated_at: float) -> Optional[int]:
+        """
+        Append messages after the last stored one, in one write transaction
+
+        Sequence numbers come from the database rather than a cached length, so
+        appends from several workers to the same session never overwrite each other.
+
+        Returns:
+            Number of messages in the session after the append, or None if it does not exist
+        """
+        with self._lock, self._conn:
+            # The update takes the write lock before the next sequence number is read
+            updated = self._conn.execute(
+                "UPDATE sessions SET updated_at = ? WHERE conversation_id = ?", (updated_at, conversation_id)
+            )
+            if updated.rowcount == 0:
+                return None
+            start = self._conn.execute(
+                "SELECT COALESCE(MAX(seq) + 1, 0) FROM messages WHERE conversation_id = ?", (conversation_id,)
+            ).fetchone()[0]
+            self._conn.executemany(
+                "INSERT INTO messages (conversation_id, seq, role, content) VALUES (?, ?, ?, ?)",
+                [(conversation_id, start + i, m["role"], m["content"]) for i, m in enumerate(messages)]
+            )
+        return start + len(messages)
+
+    def delete(self, conversation_id: str) -> None:
+        """Remove a session and its messages"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM messages WHERE conversation_id = ?", (conversation_id,))
+            self._conn.execute("DELETE FROM sessions WHERE conversation_id = ?", (conversation_id,))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class SessionStore:
+    """
+    Conversation histories keyed by conversation id
+
+    Sessions live in an in-memory LRU; idle sessions expire after ttl_seconds.
+    With a persistent backend the database is the source of truth: appends are
+    written there first, and the in-memory copy is revalidated against the stored
+    message count and update time on every access, so sessions evicted from memory
+    or changed by another worker are loaded back.
+    """
+
+    def __init__(self, max_sessions: int = 10000, ttl_seconds: float = 86400, backend: Optional[SQLiteSessionBackend] = None):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+
+        # conversation_id -> (messages, updated_at)
+        self._sessions: "OrderedDict[str, Tuple[List[StoredMessage], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.hits = 0
+        self.backend_loads = 0
+        self.expired = 0
+        self.evictions = 0
+
+    def create(self) -> str:
+        """
+        Start a new empty session
+
+        Returns:
+            The new conversation id
+        """
+        conversation_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._put(conversation_id, [], now)
+            self.created += 1
+        if self.backend is not None:
+            self.backend.create(conversation_id, now)
+        return conversation_id
+
+    def get(self, conversation_id: str) -> List[StoredMessage]:
+        """
+        Get the messages of a session
+
+        Args:
+            conversation_id: Conversation id returned by create()
+
+        Returns:
+            Copy of the stored messages, oldest first
+
+        Raises:
+            SessionNotFoundError: If the session does not exist or expired
+        """
+        return list(self._load(conversation_id)[0])
+
+    def append(self, conversation_id: str, messages: List[StoredMessage]) -> int:
+        """
+        Append messages to a session
+
+        Args:
+            conversation_id: Conversation id returned by create()
+            messages: Messages with "role" and "content"
+
+        Returns:
+            Number of messages in the session after the append
+
+        Raises:
+            SessionNotFoundError: If the session does not exist or expired
+        """
+        messages = [{"role": m["role"], "content": m["content"]} for m in messages]
+        now = time.time()
+        with self._lock:
+            stored, _ = self._load_locked(conversation_id)
+            if self.backend is None:
+                stored.extend(messages)
+                self._put(conversation_id, stored, now)
+                return len(stored)
+
+            length = self.backend.append(conversation_id, messages, now)
+            if length is None:
+                self._sessions.pop(conversation_id, None)
+                raise SessionNotFoundError(conversation_id)
+            if len(stored) + len(messages) == length:
+                self._put(conversation_id, stored + messages, now)
+            else:
+                # Another worker appended in between; reload on the next access
+                self._sessions.pop(conversation_id, None)
+            return length
+
+    def delete(self, conversation_id: str) -> None:
+        """Remove a session if it exists"""
+        with self._lock:
+            self._sessions.pop(conversation_id, None)
+        if self.backend is not None:
+            self.backend.delete(conversation_id)
+
+    def _load(self, conversation_id: str) -> Tuple[List[StoredMessage], float]:
+        with self._lock:
+            return self._load_locked(conversation_id)
+
+    def _load_locked(self, conversation_id: str) -> Tuple[List[StoredMessage], float]:
+        entry = self._sessions.get(conversation_id)
+        if self.backend is not None:
+            version = self.backend.version(conversation_id)
+            if version is None:
+                self._sessions.pop(conversation_id, None)
+                entry = None
+            elif entry is None or (len(entry[0]), entry[1]) != version:
+                entry = self.backend.load(conversation_id)
+                if entry is not None:
+                    self.backend_loads += 1
+            else:
+                self.hits += 1
+        elif entry is not None:
+            self.hits += 1
+
+        if entry is None:
+            raise SessionNotFoundError(conversation_id)
+
+        if time.time() - entry[1] > self.ttl_seconds:
+            self._sessions.pop(conversation_id, None)
+            if self.backend is not None:
+                self.backend.delete(conversation_id)
+            self.expired += 1
+            raise SessionNotFoundError(conversation_id)
+
+        self._put(conversation_id, entry[0], entry[1])
+        return entry
+
+    def _put(self, conversation_id: str, messages: List[StoredMessage], updated_at: float) -> None:
+        self._sessions[conversation_id] = (messages, updated_at)
+        self._sessions.move_to_end(conversation_id)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+            self.evictions += 1
+
+    def close(self) -> None:
+        """Close the persistent backend"""
+        if self.backend is not None:
+            self.backend.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Session counters and current in-memory size"""
+        return {
+            "backend": "sqlite" if self.backend is not None else "memory",
+            "in_memory": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "created": self.created,
+            "hits": self.hits,
+            "backend_loads": self.backend_loads,
+            "expired": self.expired,
+            "evictions": self.evictions,
+        }
+
+
+def create_session_store(settings) -> SessionStore:
+    """Create the session store configured in settings"""
+    backend = None
+    if settings.session_backend == "sqlite":
+        backend = SQLiteSessionBackend(settings.session_sqlite_path)
+        logger.info(f"Persisting sessions to {settings.session_sqlite_path}")
+
+    return SessionStore(
+        max_sessions=settings.session_max_sessions,
+        ttl_seconds=settings.session_ttl_seconds,
+        backend=backend
+    )
@@ -0,0 +1,146 @@
+"""Startup warm-up and readiness tracking"""
+
+import asyncio
+import time
+from typing import Optional, List, Dict, Any, Callable, Awaitable, Tuple
+from app.utils.logger import get_logger
+from app.utils.metrics import STARTUP_SECONDS, READY
+
+logger = get_logger(__name__)
+
+Stage = Tuple[str, Callable[[], Awaitable[Any]], bool]
+
+
+class StartupWarmup:
+    """
+    Warms prompts, clients and connections after startup and tracks readiness
+
+    Stages run in order, each timed. The worker is ready once every required stage
+    has succeeded; failed required stages are retried in the background, optional
+    ones (Langfuse, the warm-up invocation) are only reported.
+    """
+
+    def __init__(
+        self,
+        bedrock_service,
+        prompt_cache,
+        langfuse_client_factory: Callable[[], Any],
+        warmup_invocation: bool = False,
+        retry_seconds: float = 10.0,
+        started_at: Optional[float] = None
+    ):
+        """
+        Initialize the warm-up
+
+        Args:
+            bedrock_service: BedrockService whose client, prompt indexes and models are warmed
+            prompt_cache: Prompt cache to load before the first request
+            langfuse_client_factory: Returns the shared Langfuse client, or None if not configured
+            warmup_invocation: Also send a one-token invocation to each routed model
+            retry_seconds: Delay before failed required stages are retried
+            started_at: time.perf_counter() at process start, to report the import stage
+        """
+        self.bedrock_service = bedrock_service
+        self.prompt_cache = prompt_cache
+        self.langfuse_client_factory = langfuse_client_factory
+        self.warmup_invocation = warmup_invocation
+        self.retry_seconds = retry_seconds
+        self.started_at = started_at if started_at is not None else time.perf_counter()
+
+        self.ready = False
+        self.finished = False
+        self.stages_ms: Dict[str, float] = {}
+        self.errors: Dict[str, str] = {}
+        self.attempts = 0
+        self.ready_after_ms: Optional[float] = None
+
+    def _stages(self) -> List[Stage]:
+        """(name, coroutine factory, required) for every warm-up stage"""
+        stages = [
+            ("prompt_cache", self._warm_prompt_cache, True),
+            ("langfuse", self._warm_langfuse, False),
+            ("bedrock_connection", self._warm_bedrock_connection, True),
+        ]
+        if self.warmup_invocation:
+            stages.append(("warmup_invocation", self.bedrock_service.warm_up_models, False))
+        return stages
+
+    async def _warm_prompt_cache(self) -> None:
+        """Load the prompt (building the few-shot and knowledge base indexes) and run one selection"""
+        await asyncio.to_thread(self.prompt_cache.get)
+        await asyncio.to_thread(self.bedrock_service.prompt_selector.select, "שלום")
+
+    async def _warm_langfuse(self) -> None:
+        """Create the shared Langfuse client and open its connection pool"""
+        client = await asyncio.to_thread(self.langfuse_client_factory)
+        if client is not None:
+            await asyncio.to_thread(client.auth_check)
+
+    async def _warm_bedrock_connection(self) -> None:
+        await asyncio.to_thread(self.bedrock_service.warm_up_connection)
+
+    def record_import_time(self) -> None:
+        """Record the time from process start until the application was imported"""
+        self._record("app_import", (time.perf_counter() - self.started_at) * 1000)
+
+    def _record(self, stage: str, elapsed_ms: float) -> None:
+        self.stages_ms[stage] = round(elapsed_ms, 1)
+        STARTUP_SECONDS.set(stage, value=elapsed_ms / 1000)
+
+    async def _run_stages(self, stages: List[Stage]) -> List[Stage]:
+        """Run stages in order and return the required ones that failed"""
+        failed = []
+        for name, stage, required in stages:
+            start = time.perf_counter()
+            try:
+                await stage()
+                self.errors.pop(name, None)
+            except Exception as e:
+                self.errors[name] = str(e) or type(e).__name__
+                logger.warning(f"Startup stage {name} failed: {self.errors[name]}")
+                if required:
+                    failed.append((name, stage, required))
+            finally:
+                self._record(name, (time.perf_counter() - start) * 1000)
+        return failed
+
+    async def run(self) -> None:
+        """Run all stages, then retry failed required stages until they succeed"""
+        pending = self._stages()
+        while True:
+            self.attempts += 1
+            pending = await self._run_stages(pending)
+            if not pending:
+                break
+            self.finished = True
+            logger.warning(
+                f"Not ready: {', '.join(name for name, _, _ in pending)} failed, "
+                f"retrying in {self.retry_seconds}s"
+            )
+            await asyncio.sleep(self.retry_seconds)
+
+        self.mark_ready()
+        logger.info(f"Ready after {self.ready_after_ms} ms (startup stages in ms: {self.stages_ms})")
+
+    def mark_ready(self) -> None:
+        """Report the worker as ready (also used when warm-up is disabled)"""
+        self.ready = True
+        self.finished = True
+        self.ready_after_ms = round((time.perf_counter() - self.started_at) * 1000, 1)
+        READY.set(value=1)
+
+    def status(self) -> Dict[str, Any]:
+        """Readiness, per-stage startup durations and errors"""
+        if self.ready:
+            state = "ready"
+        elif self.finished:
+            state = "not_ready"
+        else:
+            state = "starting"
+        return {
+            "status": state,
+            "ready_after_ms": self.ready_after_ms,
+            "stages_ms": self.stages_ms,
+            "errors": self.errors,
+            "attempts": self.attempts,
+        }
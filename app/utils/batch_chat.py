@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Run a JSONL file of questions through the /api/v1/chat/batch endpoint.
+
+Each input line is a JSON object. The question is read from --message-field and
+the item id from --id-field (the line number is used when it is missing); any
+other ChatRequest fields (model_id, temperature, ...) are passed through.
+
+Results are appended to the output file as they arrive. Re-running with the same
+output file skips items that already have a response, so an interrupted run
+resumes where it stopped.
+
+Usage:
+    python -m app.utils.batch_chat questions.jsonl -o results.jsonl --concurrency 8
+"""
+
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import List, Dict, Any, Set
+import httpx
+from app.models.schemas import ChatRequest
+
+PASSTHROUGH_FIELDS = [name for name in ChatRequest.model_fields if name != "message"]
+
+
+def load_completed_ids(output_path: Path) -> Set[str]:
+    """Ids that already have a successful result in the output file"""
+    completed = set()
+    if not output_path.exists():
+        return completed
+
+    with open(output_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # Partially written line from an interrupted run
+            if "response" in record:
+                completed.add(str(record["id"]))
+    return completed
+
+
+def load_items(input_path: Path, message_field: str, id_field: str) -> List[Dict[str, Any]]:
+    """Convert input lines into batch request objects"""
+    items = []
+    with open(input_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            data = json.loads(line)
+            item = {field: data[field] for field in PASSTHROUGH_FIELDS if field in data}
+            item["id"] = str(data.get(id_field, f"line-{line_number}"))
+            item["message"] = data[message_field]
+            items.append(item)
+    return items
+
+
+def run(args: argparse.Namespace) -> int:
+    output_path = Path(args.output)
+    completed = load_completed_ids(output_path)
+    items = [item for item in load_items(Path(args.input), args.message_field, args.id_field) if item["id"] not in completed]
+
+    print(f"{len(completed)} already completed, {len(items)} to run")
+    if not items:
+        return 0
+
+    url = f"{args.url.rstrip('/')}/api/v1/chat/batch"
+    succeeded = failed = input_tokens = output_tokens = 0
+    start_time = time.monotonic()
+
+    with httpx.Client(timeout=httpx.Timeout(args.timeout, read=None)) as client, \
+            open(output_path, 'a', encoding='utf-8') as out:
+        # Items are sent in chunks so an interruption loses at most one chunk of in-flight work
+        for offset in range(0, len(items), args.chunk_size):
+            chunk = items[offset:offset + args.chunk_size]
+            body = "\n".join(json.dumps(item, ensure_ascii=False) for item in chunk)
+
+            with client.stream(
+                "POST",
+                url,
+                params={"concurrency": args.concurrency},
+                content=body.encode('utf-8'),
+                headers={"Content-Type": "application/x-ndjson"}
+            ) as response:
+                response.raise_for_status()
+                for line in response.iter_lines():
+                    if not line.strip():
+                        continue
+                    record = json.loads(line)
+                    if "summary" in record:
+                        continue
+
+                    out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    out.flush()
+
+                    if "response" in record:
+                        succeeded += 1
+                        usage = (record.get("metadata") or {}).get("usage") or {}
+                        input_tokens += usage.get("input_tokens", 0)
+                        output_tokens += usage.get("output_tokens", 0)
+                    else:
+                        failed += 1
+                        print(f"  {record['id']}: {record['error']}", file=sys.stderr)
+
+            print(f"  {min(offset + args.chunk_size, len(items))}/{len(items)} done")
+
+    elapsed = time.monotonic() - start_time
+    total = succeeded + failed
+    print("=" * 60)
+    print(f"Requests:    {total} ({succeeded} succeeded, {failed} failed)")
+    print(f"Elapsed:     {elapsed:.1f}s")
+    print(f"Throughput:  {total / elapsed:.2f} requests/s")
+    print(f"Tokens:      {input_tokens} input, {output_tokens} output ({output_tokens / elapsed:.1f} output tokens/s)")
+    return 0 if not failed else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Run a JSONL file of questions through the batch chat endpoint")
+    parser.add_argument("input", help="Input JSONL file")
+    parser.add_argument("-o", "--output", required=True, help="Output JSONL file (appended to; used for resumption)")
+    parser.add_argument("--url", default="http://localhost:8000", help="Service base URL")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight on the server")
+    parser.add_argument("--chunk-size", type=int, default=100, help="Items per HTTP request")
+    parser.add_argument("--message-field", default="message", help="Input field holding the question")
+    parser.add_argument("--id-field", default="id", help="Input field holding the item id")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Connect/write timeout in seconds")
+    return run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,281 @@
+"""Minimal Prometheus-style metrics: counters, gauges and histograms rendered in the text exposition format"""
+
+import time
+import threading
+from bisect import bisect_left
+from typing import Optional, List, Dict, Tuple, Sequence
+
+# Latency buckets in seconds, from in-process stages (sub-millisecond) to long generations
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base class: a named metric family with label names"""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"] + self.samples()
+
+
+class Counter(_Metric):
+    """Monotonically increasing count per label set"""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Increase the count for the label values (given in labelnames order)"""
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(labels, 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}"
+            for labels, value in values
+        ]
+
+
+class Gauge(Counter):
+    """Value per label set that can go up and down"""
+    kind = "gauge"
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, *labels: str, value: float) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def clear(self) -> None:
+        """Drop all label sets (before re-setting gauges that are collected at scrape time)"""
+        with self._lock:
+            self._values.clear()
+
+
+class Histogram(_Metric):
+    """Bucketed distribution of observations per label set"""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket (+Inf last)..., sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record one observation for the label values (given in labelnames order)"""
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                series = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bucket] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._values.get(labels)
+            return sum(series[:-1]) if series else 0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            values = [(labels, list(series)) for labels, series in sorted(self._values.items())]
+        lines = []
+        for labels, series in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), series[:-1]):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(series[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Collection of metrics rendered together for the /metrics endpoint
+
+    Updates take a per-metric lock, since some are recorded off the event loop
+    (Bedrock executor threads, urllib3's pool logger). The lock is uncontended in
+    practice, so recording a sample still costs well under a microsecond.
+    """
+
+    CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class StageTimer:
+    """
+    Per-request stage durations
+
+    Each stage is recorded in the stage histogram and kept on the timer so the
+    request can log or return its breakdown. record() returns the current time so
+    consecutive stages chain without extra clock reads:
+
+        t = time.perf_counter()
+        messages = build()
+        t = timer.record("message_assembly", t)
+    """
+
+    __slots__ = ("stages",)
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def record(self, stage: str, started: float) -> float:
+        now = time.perf_counter()
+        elapsed = now - started
+        self.stages[stage] = self.stages.get(stage, 0.0) + elapsed
+        STAGE_SECONDS.observe(elapsed, stage)
+        return now
+
+    def summary(self) -> Dict[str, float]:
+        """Stage durations in milliseconds"""
+        return {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()}
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter(
+    "chatbot_requests_total",
+    "Chat requests by mode (invoke/stream), serving model and outcome",
+    ("mode", "model", "status")
+)
+REQUEST_SECONDS = registry.histogram(
+    "chatbot_request_duration_seconds",
+    "End-to-end chat request duration inside the Bedrock service",
+    ("mode",)
+)
+IN_FLIGHT = registry.gauge(
+    "chatbot_requests_in_flight",
+    "Chat requests currently being served",
+    ("mode",)
+)
+STAGE_SECONDS = registry.histogram(
+    "chatbot_stage_duration_seconds",
+    "Duration of request stages (prompt_load, message_assembly, json_encode, upstream, upstream_ttfb, streaming, response_parse)",
+    ("stage",)
+)
+TOKENS = registry.histogram(
+    "chatbot_tokens",
+    "Tokens per Bedrock invocation",
+    ("model", "direction"),
+    buckets=TOKEN_BUCKETS
+)
+BEDROCK_IN_FLIGHT = registry.gauge(
+    "chatbot_bedrock_in_flight",
+    "Bedrock invocations holding a concurrency slot",
+    ("model",)
+)
+BEDROCK_WAITING = registry.gauge(
+    "chatbot_bedrock_waiting",
+    "Requests queued for a Bedrock concurrency slot",
+    ("model",)
+)
+BEDROCK_LIMIT = registry.gauge(
+    "chatbot_bedrock_concurrency_limit",
+    "Current adaptive concurrency limit",
+    ("model",)
+)
+ACTIVE_STREAMS = registry.gauge(
+    "chatbot_active_streams",
+    "Streaming responses in progress"
+)
+STARTUP_SECONDS = registry.gauge(
+    "chatbot_startup_stage_seconds",
+    "Duration of startup stages (app_import, prompt_cache, langfuse, bedrock_connection, warmup_invocation)",
+    ("stage",)
+)
+READY = registry.gauge(
+    "chatbot_ready",
+    "1 once startup warm-up has finished and the worker can answer requests"
+)
+BEDROCK_POOL_SIZE = registry.gauge(
+    "chatbot_bedrock_pool_size",
+    "Maximum pooled connections per Bedrock endpoint",
+    ("host",)
+)
+BEDROCK_POOL_IN_USE = registry.gauge(
+    "chatbot_bedrock_pool_in_use",
+    "Pooled Bedrock connections currently checked out by a call",
+    ("host",)
+)
+BEDROCK_POOL_IDLE = registry.gauge(
+    "chatbot_bedrock_pool_idle",
+    "Open Bedrock connections waiting in the pool for the next call",
+    ("host",)
+)
+BEDROCK_POOL_OVERFLOW = registry.counter(
+    "chatbot_bedrock_pool_overflow_total",
+    "Connections opened beyond the pool size and discarded after one call (the pool is too small)",
+    ("host",)
+)
+BEDROCK_REGION_REQUESTS = registry.counter(
+    "chatbot_bedrock_region_requests_total",
+    "Bedrock calls per region by outcome (ok, throttled, error); failed calls are retried in the next region",
+    ("region", "outcome")
+)
+BEDROCK_REGION_LATENCY = registry.gauge(
+    "chatbot_bedrock_region_latency_seconds",
+    "EWMA latency per region of full invocations per output token (invoke) and of the time to open a stream (stream)",
+    ("region", "kind")
+)
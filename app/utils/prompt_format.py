@@ -0,0 +1,137 @@
+"""Serialization of knowledge base and few-shot data for prompt injection"""
+
+import re
+import json
+import math
+from typing import Any, Dict, List
+
+SERIALIZATION_FORMATS = ("pretty", "minified", "compact")
+
+_TOKEN_RE = re.compile(r'[^\W_]+|\s+|[^\w\s]|_')
+
+
+def serialize_for_prompt(data: Any, fmt: str = "minified") -> str:
+    """
+    Serialize prompt data in the requested format
+
+    Args:
+        data: JSON-compatible data (knowledge base or few-shots)
+        fmt: One of "pretty" (indented JSON), "minified" (JSON without whitespace)
+             or "compact" (indented key/value text without quotes or braces)
+
+    Returns:
+        Serialized text
+    """
+    if fmt == "pretty":
+        return json.dumps(data, ensure_ascii=False, indent=2)
+    if fmt == "minified":
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+    if fmt == "compact":
+        return '\n'.join(_compact_lines(data, 0))
+
+    raise ValueError(f"Unknown prompt serialization format: {fmt} (expected one of {', '.join(SERIALIZATION_FORMATS)})")
+
+
+def _compact_scalar(value: Any) -> str:
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        return value.replace('\n', '\\n')
+    return str(value)
+
+
+def _compact_lines(data: Any, depth: int) -> List[str]:
+    """Render data as indented "key: value" / "- item" lines"""
+    indent = ' ' * depth
+    lines = []
+
+    if isinstance(data, dict):
+        for key, value in data.items():
+            if isinstance(value, (dict, list)) and value:
+                lines.append(f"{indent}{key}:")
+                lines.extend(_compact_lines(value, depth + 1))
+            elif isinstance(value, (dict, list)):
+                lines.append(f"{indent}{key}:")
+            else:
+                lines.append(f"{indent}{key}: {_compact_scalar(value)}")
+    elif isinstance(data, list):
+        for item in data:
+            if isinstance(item, (dict, list)) and item:
+                # First line of a nested item shares the "- " marker, the rest align after it
+                nested = _compact_lines(item, depth + 2)
+                lines.append(f"{indent}- {nested[0].lstrip()}")
+                lines.extend(nested[1:])
+            else:
+                lines.append(f"{indent}- {_compact_scalar(item)}")
+    else:
+        lines.append(f"{indent}{_compact_scalar(data)}")
+
+    return lines
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of model tokens in a text
+
+    A tokenizer-free heuristic: punctuation is one token each, whitespace runs
+    one token per four characters, Latin words one token per four characters and
+    Hebrew (and other non-ASCII) words one token per two characters.
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        Estimated token count
+    """
+    tokens = 0
+    for piece in _TOKEN_RE.findall(text):
+        if piece.isspace():
+            tokens += math.ceil(len(piece) / 4)
+        elif piece.isascii() and piece.isalnum():
+            tokens += math.ceil(len(piece) / 4)
+        elif piece.isalnum():
+            tokens += math.ceil(len(piece) / 2)
+        else:
+            tokens += 1
+    return tokens
+
+
+def budget_report(data: Any) -> Dict[str, Dict[str, int]]:
+    """
+    Compare character and estimated token counts of all serialization formats
+
+    Args:
+        data: JSON-compatible data
+
+    Returns:
+        Dictionary mapping format name to {"chars": ..., "estimated_tokens": ...}
+    """
+    report = {}
+    for fmt in SERIALIZATION_FORMATS:
+        text = serialize_for_prompt(data, fmt)
+        report[fmt] = {"chars": len(text), "estimated_tokens": estimate_tokens(text)}
+    return report
+
+
+def format_budget_report(name: str, report: Dict[str, Dict[str, int]]) -> str:
+    """Render a budget report as a text table relative to the pretty-printed baseline"""
+    baseline = report["pretty"]["estimated_tokens"] or 1
+    lines = [f"{name}", f"  {'format':<10}{'chars':>10}{'~tokens':>10}{'vs pretty':>12}"]
+    for fmt, counts in report.items():
+        saving = 100 * (1 - counts["estimated_tokens"] / baseline)
+        lines.append(f"  {fmt:<10}{counts['chars']:>10}{counts['estimated_tokens']:>10}{saving:>11.1f}%")
+    return '\n'.join(lines)
+
+
+if __name__ == "__main__":
+    # Print a budget report for the configured knowledge base and few-shots
+    from config.settings import settings
+
+    for label, loader in (("knowledge_base", settings.load_knowledge_base), ("few_shots", settings.load_few_shots)):
+        data = loader(force_local=settings.local_dev)
+        if data:
+            print(format_budget_report(label, budget_report(data)))
+        else:
+            print(f"{label}: not available")
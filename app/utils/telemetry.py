@@ -0,0 +1,160 @@
+"""Background export of Langfuse generations off the request path"""
+
+import time
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Optional, Dict, Any
+from app.utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class GenerationRecord:
+    """A started Langfuse generation and the final attributes to apply to it"""
+    generation: Any
+    update: Dict[str, Any] = field(default_factory=dict)
+    end_time_ns: int = field(default_factory=time.time_ns)
+
+
+class TelemetryExporter:
+    """
+    Finishes Langfuse generations and flushes them from a background thread
+
+    Requests only start a generation and enqueue its output and usage; updating,
+    ending and shipping the generation to Langfuse happens on the exporter thread.
+    The buffer is bounded: when it is full new records are dropped (and counted)
+    rather than slowing down requests. Pending records are flushed every
+    flush_interval_seconds, as soon as batch_size records were exported, and once
+    more on shutdown.
+    """
+
+    def __init__(self, client, max_queue_size: int = 1000, batch_size: int = 50, flush_interval_seconds: float = 5.0):
+        self._client = client
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+
+        self._queue: "queue.Queue[Optional[GenerationRecord]]" = queue.Queue(maxsize=max_queue_size)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._stopped = False
+
+        self.submitted = 0
+        self.exported = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.errors = 0
+
+    def finish_generation(self, generation, end_time_ns: Optional[int] = None, **update: Any) -> bool:
+        """
+        Queue a generation to be updated, ended and exported in the background
+
+        Args:
+            generation: Generation returned by Langfuse start_generation
+            end_time_ns: End timestamp (defaults to now, so the span duration excludes export time)
+            **update: Attributes for generation.update (output, usage_details, level, ...)
+
+        Returns:
+            True if queued, False if dropped because the buffer is full or the exporter stopped
+        """
+        record = GenerationRecord(generation, update, end_time_ns or time.time_ns())
+        if self._stopped:
+            self.dropped += 1
+            return False
+
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+        self.submitted += 1
+        return True
+
+    def _ensure_started(self) -> None:
+        """Start the exporter thread on first use"""
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None and not self._stopped:
+                self._thread = threading.Thread(target=self._run, name="telemetry-exporter", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        pending = 0
+        last_flush = time.monotonic()
+        while True:
+            timeout = max(0.0, self.flush_interval_seconds - (time.monotonic() - last_flush))
+            try:
+                record = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                record = False
+
+            if record is None:
+                # Shutdown sentinel: everything queued before it has been exported
+                if pending:
+                    self._flush()
+                return
+
+            if record:
+                self._export(record)
+                pending += 1
+
+            if pending and (pending >= self.batch_size or time.monotonic() - last_flush >= self.flush_interval_seconds):
+                self._flush()
+                pending = 0
+            if not pending:
+                last_flush = time.monotonic()
+
+    def _export(self, record: GenerationRecord) -> None:
+        try:
+            if record.update:
+                record.generation.update(**record.update)
+            record.generation.end(end_time=record.end_time_ns)
+            self.exported += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Could not export Langfuse generation: {e}")
+
+    def _flush(self) -> None:
+        try:
+            self._client.flush()
+            self.flushes += 1
+        except Exception as e:
+            self.errors += 1
+            logger.warning(f"Could not flush Langfuse telemetry: {e}")
+
+    def shutdown(self, timeout: float = 10.0) -> None:
+        """
+        Export everything queued so far, flush once more and stop the exporter thread
+
+        Args:
+            timeout: Maximum seconds to wait for the final export
+        """
+        with self._lock:
+            self._stopped = True
+            thread = self._thread
+
+        if thread is None:
+            return
+
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            logger.warning("Telemetry buffer still full at shutdown, pending generations are lost")
+            return
+        thread.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Export counters and current buffer size"""
+        return {
+            "queued": self._queue.qsize(),
+            "max_queue_size": self._queue.maxsize,
+            "submitted": self.submitted,
+            "exported": self.exported,
+            "dropped": self.dropped,
+            "flushes": self.flushes,
+            "errors": self.errors,
+        }
@@ -0,0 +1,152 @@
+"""Hebrew text normalization and character n-gram similarity helpers"""
+
+import re
+import math
+import unicodedata
+from collections import Counter
+from typing import Dict, FrozenSet
+
+# Niqqud and cantillation marks (U+0591-U+05C7), excluding maqaf (U+05BE) and sof pasuq (U+05C3)
+_NIQQUD_RE = re.compile(r'[\u0591-\u05BD\u05BF\u05C1\u05C2\u05C4-\u05C7]')
+
+# Final letter forms mapped to their regular forms
+_FINAL_LETTERS = str.maketrans({
+    'ך': 'כ',
+    'ם': 'מ',
+    'ן': 'נ',
+    'ף': 'פ',
+    'ץ': 'צ',
+})
+
+# Geresh/gershayim and ASCII quotes inside abbreviations (e.g. צה"ל) are dropped, not split on
+_QUOTES_RE = re.compile(r'[\'"\u05F3\u05F4]')
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def normalize_hebrew(text: str) -> str:
+    """
+    Normalize Hebrew text for matching
+
+    Removes niqqud, quotes, punctuation and symbols, maps final letters to their regular
+    forms, lower-cases Latin text and collapses whitespace.
+
+    Args:
+        text: Input text
+
+    Returns:
+        Normalized text
+    """
+    text = unicodedata.normalize('NFC', text)
+    text = _NIQQUD_RE.sub('', text)
+    text = text.translate(_FINAL_LETTERS).lower()
+    text = _QUOTES_RE.sub('', text)
+
+    # Replace remaining punctuation and symbols (including maqaf) with spaces
+    text = ''.join(
+        ' ' if unicodedata.category(ch)[0] in ('P', 'S') else ch
+        for ch in text
+    )
+
+    return _WHITESPACE_RE.sub(' ', text).strip()
+
+
+# Words that decide an eligibility answer while barely changing a question's n-grams:
+# negation and possession, marital and personal status, and number words
+_KEY_WORDS = frozenset(normalize_hebrew(word) for word in (
+    "לא", "אין", "אינו", "אינה", "איני", "אינני", "בלי", "ללא", "טרם", "מעולם", "יש",
+    "נשוי", "נשואה", "נשואים", "רווק", "רווקה", "רווקים", "גרוש", "גרושה", "גרושים", "אלמן", "אלמנה",
+    "פרוד", "פרודה", "ידוע", "ידועה", "זוג", "יחיד", "יחידה", "יחידנית", "הורה", "חייל", "חיילת",
+    "נכה", "נכות", "עולה", "תושב", "תושבת", "בעל", "בעלת", "שוכר", "שוכרת",
+    "אחד", "אחת", "שניים", "שתיים", "שני", "שתי", "שלוש", "שלושה", "ארבע", "ארבעה", "חמש", "חמישה",
+    "שש", "שישה", "שבע", "שבעה", "שמונה", "תשע", "תשעה", "עשר", "עשרה", "עשרים", "שלושים", "ארבעים",
+    "חמישים", "שישים",
+))
+
+# One-letter prefixes (and, in, to, the, that, like, from) that may precede a key word
+_PREFIXES = "ובלהשכמ"
+
+_NUMBER_RE = re.compile(r'\d+')
+
+
+def key_terms(text: str) -> FrozenSet[str]:
+    """
+    Numbers and deciding words (negation, status, number words) of normalized text
+
+    Questions differing only in these ("יש לי דירה" / "אין לי דירה", נשוי / רווק,
+    בן 25 / בן 35) are near-identical by n-grams but need different answers.
+    Words are also matched after stripping up to two one-letter prefixes.
+
+    Args:
+        text: Normalized text
+
+    Returns:
+        Set of numbers and key words found
+    """
+    terms = set(_NUMBER_RE.findall(text))
+    for word in text.split():
+        for strip in range(3):
+            if strip and (len(word) - strip < 2 or word[strip - 1] not in _PREFIXES):
+                break
+            if word[strip:] in _KEY_WORDS:
+                terms.add(word[strip:])
+                break
+    return frozenset(terms)
+
+
+def char_ngrams(text: str, n: int = 3) -> Counter:
+    """
+    Count character n-grams of already normalized text
+
+    Each word is padded with spaces so n-grams do not run across word boundaries.
+
+    Args:
+        text: Normalized text
+        n: N-gram length
+
+    Returns:
+        Counter of n-grams
+    """
+    grams: Counter = Counter()
+    for word in text.split():
+        padded = f' {word} '
+        if len(padded) <= n:
+            grams[padded] += 1
+            continue
+        for i in range(len(padded) - n + 1):
+            grams[padded[i:i + n]] += 1
+    return grams
+
+
+def vector_norm(vector: Dict[str, int]) -> float:
+    """Euclidean norm of a sparse count vector"""
+    return math.sqrt(sum(v * v for v in vector.values()))
+
+
+def cosine_similarity(a: Dict[str, int], b: Dict[str, int], norm_a: float = None, norm_b: float = None) -> float:
+    """
+    Cosine similarity of two sparse count vectors
+
+    Args:
+        a: First vector
+        b: Second vector
+        norm_a: Precomputed norm of a (optional)
+        norm_b: Precomputed norm of b (optional)
+
+    Returns:
+        Similarity between 0.0 and 1.0
+    """
+    if not a or not b:
+        return 0.0
+
+    if len(a) > len(b):
+        a, b = b, a
+        norm_a, norm_b = norm_b, norm_a
+
+    dot = sum(count * b.get(gram, 0) for gram, count in a.items())
+    if not dot:
+        return 0.0
+
+    norm_a = norm_a or vector_norm(a)
+    norm_b = norm_b or vector_norm(b)
+    return dot / (norm_a * norm_b)
@@ -0,0 +1 @@
+"""Benchmarks for prompt assembly and request latency"""
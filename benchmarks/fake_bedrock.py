@@ -0,0 +1,225 @@
+"""
+Local stand-in for the bedrock-runtime API
+
+Serves InvokeModel and InvokeModelWithResponseStream for Anthropic models over
+plain HTTP, so the service can be load-tested without AWS. Point the service at it
+with BEDROCK_ENDPOINT_URL. Responses take `latency` seconds to start and then
+produce output at `tokens_per_second`; streams are sent in the AWS event stream
+encoding, `chunk_tokens` tokens per chunk. A fraction of requests (`throttle_rate`)
+is rejected with a ThrottlingException, another (`error_rate`) fails with an
+InternalServerException.
+
+Usage:
+    python -m benchmarks.fake_bedrock --port 9100 --latency 0.3 --tokens-per-second 80
+"""
+
+import json
+import time
+import base64
+import random
+import struct
+import argparse
+import binascii
+import threading
+from dataclasses import dataclass, asdict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any
+from urllib.parse import unquote
+
+# One generated "token"
+TOKEN = "מילה "
+
+
+@dataclass
+class FakeBedrockConfig:
+    """Simulated model behaviour"""
+    latency: float = 0.3  # Seconds before the first output (whole response for InvokeModel)
+    tokens_per_second: float = 80.0  # Output rate after the first token (0 = instant)
+    output_tokens: int = 200  # Tokens per answer
+    chunk_tokens: int = 5  # Tokens per stream chunk
+    throttle_rate: float = 0.0  # Fraction of requests rejected with ThrottlingException
+    error_rate: float = 0.0  # Fraction of requests failing with InternalServerException (HTTP 500)
+
+
+def _string_header(name: str, value: str) -> bytes:
+    name_bytes = name.encode('utf-8')
+    value_bytes = value.encode('utf-8')
+    # Header value type 7 = string
+    return struct.pack('>B', len(name_bytes)) + name_bytes + struct.pack('>BH', 7, len(value_bytes)) + value_bytes
+
+
+def encode_event(payload: Dict[str, Any]) -> bytes:
+    """
+    Encode one Anthropic stream event as an AWS event stream `chunk` message
+
+    Args:
+        payload: Anthropic streaming event (message_start, content_block_delta, ...)
+
+    Returns:
+        Binary event stream message: prelude, prelude CRC, headers, payload, message CRC
+    """
+    body = json.dumps({"bytes": base64.b64encode(json.dumps(payload).encode('utf-8')).decode('ascii')}).encode('utf-8')
+    headers = (
+        _string_header(":event-type", "chunk")
+        + _string_header(":content-type", "application/json")
+        + _string_header(":message-type", "event")
+    )
+    total_length = 12 + len(headers) + len(body) + 4
+    prelude = struct.pack('>II', total_length, len(headers))
+    message = prelude + struct.pack('>I', binascii.crc32(prelude) & 0xFFFFFFFF) + headers + body
+    return message + struct.pack('>I', binascii.crc32(message) & 0xFFFFFFFF)
+
+
+class FakeBedrockServer(ThreadingHTTPServer):
+    """HTTP server answering bedrock-runtime requests according to its config"""
+
+    daemon_threads = True
+
+    def __init__(self, address, config: FakeBedrockConfig):
+        super().__init__(address, _Handler)
+        self.config = config
+        self._lock = threading.Lock()
+        self.counters = {"invocations": 0, "streams": 0, "throttled": 0, "errors": 0, "in_flight": 0, "max_in_flight": 0}
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def track(self, key: str, delta: int = 1) -> None:
+        with self._lock:
+            self.counters[key] += delta
+            if key == "in_flight":
+                self.counters["max_in_flight"] = max(self.counters["max_in_flight"], self.counters["in_flight"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"config": asdict(self.config), **self.counters}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeBedrockServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        parts = self.path.strip('/').split('/')
+        if len(parts) != 3 or parts[0] != "model" or parts[2] not in ("invoke", "invoke-with-response-stream"):
+            self._send_json(404, {"message": f"Unknown path {self.path}"}, "ResourceNotFoundException")
+            return
+        if b'"messages"' not in body:
+            self._send_json(400, {"message": "Malformed input request"}, "ValidationException")
+            return
+
+        config = self.server.config
+        if config.throttle_rate and random.random() < config.throttle_rate:
+            self.server.track("throttled")
+            self._send_json(429, {"message": "Too many requests, please wait before trying again."}, "ThrottlingException")
+            return
+        if config.error_rate and random.random() < config.error_rate:
+            self.server.track("errors")
+            self._send_json(500, {"message": "Internal server error"}, "InternalServerException")
+            return
+
+        model_id = unquote(parts[1])
+        self.server.track("in_flight")
+        try:
+            if parts[2] == "invoke":
+                self.server.track("invocations")
+                self._invoke(model_id)
+            else:
+                self.server.track("streams")
+                self._stream(model_id)
+        finally:
+            self.server.track("in_flight", -1)
+
+    def _send_json(self, status: int, payload: Dict[str, Any], error_type: str = None) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if error_type:
+            self.send_header("x-amzn-ErrorType", error_type)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _generation_time(self, tokens: int) -> float:
+        rate = self.server.config.tokens_per_second
+        return tokens / rate if rate > 0 else 0.0
+
+    def _invoke(self, model_id: str) -> None:
+        config = self.server.config
+        time.sleep(config.latency + self._generation_time(config.output_tokens))
+        self._send_json(200, {
+            "id": "msg_fake",
+            "type": "message",
+            "role": "assistant",
+            "model": model_id,
+            "content": [{"type": "text", "text": f"<response>{TOKEN * config.output_tokens}</response>"}],
+            "stop_reason": "end_turn",
+            "usage": {"input_tokens": 1000, "output_tokens": config.output_tokens},
+        })
+
+    def _write_chunk(self, data: bytes) -> None:
+        self.wfile.write(f"{len(data):x}\r\n".encode('ascii') + data + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, model_id: str) -> None:
+        config = self.server.config
+        self.send_response(200)
+        self.send_header("Content-Type", "application/vnd.amazon.eventstream")
+        self.send_header("X-Amzn-Bedrock-Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        time.sleep(config.latency)
+        self._write_chunk(encode_event({"type": "message_start", "message": {"model": model_id, "usage": {"input_tokens": 1000}}}))
+
+        remaining = config.output_tokens
+        while remaining > 0:
+            tokens = min(config.chunk_tokens, remaining)
+            remaining -= tokens
+            self._write_chunk(encode_event({
+                "type": "content_block_delta",
+                "index": 0,
+                "delta": {"type": "text_delta", "text": TOKEN * tokens},
+            }))
+            if remaining:
+                time.sleep(self._generation_time(tokens))
+
+        self._write_chunk(encode_event({"type": "message_delta", "delta": {"stop_reason": "end_turn"}, "usage": {"output_tokens": config.output_tokens}}))
+        self._write_chunk(encode_event({"type": "message_stop"}))
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def start_fake_bedrock(config: FakeBedrockConfig, port: int = 0) -> FakeBedrockServer:
+    """Start the stand-in on a background thread (port 0 picks a free port)"""
+    server = FakeBedrockServer(("127.0.0.1", port), config)
+    threading.Thread(target=server.serve_forever, name="fake-bedrock", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", type=float, default=FakeBedrockConfig.latency)
+    parser.add_argument("--tokens-per-second", type=float, default=FakeBedrockConfig.tokens_per_second)
+    parser.add_argument("--output-tokens", type=int, default=FakeBedrockConfig.output_tokens)
+    parser.add_argument("--chunk-tokens", type=int, default=FakeBedrockConfig.chunk_tokens)
+    parser.add_argument("--throttle-rate", type=float, default=FakeBedrockConfig.throttle_rate)
+    parser.add_argument("--error-rate", type=float, default=FakeBedrockConfig.error_rate)
+    args = parser.parse_args()
+
+    server = FakeBedrockServer(("127.0.0.1", args.port), FakeBedrockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        chunk_tokens=args.chunk_tokens,
+        throttle_rate=args.throttle_rate,
+        error_rate=args.error_rate
+    ))
+    print(f"Fake Bedrock listening on {server.url}")
+    server.serve_forever()
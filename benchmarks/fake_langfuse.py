@@ -0,0 +1,140 @@
+"""
+Local stand-in for the Langfuse API
+
+Serves the system prompt, knowledge base and few-shots from the local prompt files
+through the prompt API (so prompt loading takes the same path as in production),
+answers the startup auth check and accepts trace exports, counting requests and bytes. Point the service at it with
+LANGFUSE_BASE_URL.
+
+Usage:
+    python -m benchmarks.fake_langfuse --port 9200
+"""
+
+import json
+import argparse
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from pathlib import Path
+from typing import Optional, Dict, Any
+from urllib.parse import urlparse, unquote
+from config.settings import settings
+
+PROMPTS_PATH = "/api/public/v2/prompts/"
+PROJECTS_PATH = "/api/public/projects"
+
+
+def load_local_prompts() -> Dict[str, str]:
+    """Prompt name -> content, from the configured local prompt files"""
+    root_dir = Path(__file__).parent.parent
+    sources = {
+        settings.langfuse_system_prompt_name: settings.system_prompt_file,
+        settings.langfuse_knowledge_base_name: settings.knowledge_base_file,
+        settings.langfuse_few_shots_name: settings.few_shots_file,
+    }
+    prompts = {}
+    for name, path in sources.items():
+        file_path = root_dir / path
+        if file_path.exists():
+            prompts[name] = file_path.read_text(encoding='utf-8').strip()
+    return prompts
+
+
+class FakeLangfuseServer(ThreadingHTTPServer):
+    """HTTP server answering Langfuse prompt fetches and trace exports"""
+
+    daemon_threads = True
+
+    def __init__(self, address, prompts: Optional[Dict[str, str]] = None):
+        super().__init__(address, _Handler)
+        self.prompts = load_local_prompts() if prompts is None else prompts
+        self._lock = threading.Lock()
+        self.requests: Counter = Counter()
+        self.bytes_received = 0
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def track(self, kind: str, size: int) -> None:
+        with self._lock:
+            self.requests[kind] += 1
+            self.bytes_received += size
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"requests": dict(self.requests), "bytes_received": self.bytes_received}
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeLangfuseServer
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == PROJECTS_PATH:
+            self.server.track("projects", 0)
+            self._send_json(200, {"data": [{"id": "benchmark", "name": "benchmark", "metadata": {}}]})
+            return
+        if not path.startswith(PROMPTS_PATH):
+            self.server.track("other", 0)
+            self._send_json(404, {"message": "Not found"})
+            return
+
+        name = unquote(path[len(PROMPTS_PATH):])
+        self.server.track("prompt", 0)
+        prompt = self.server.prompts.get(name)
+        if prompt is None:
+            self._send_json(404, {"message": f"Prompt not found: {name}"})
+            return
+        self._send_json(200, {
+            "name": name,
+            "version": 1,
+            "type": "text",
+            "prompt": prompt,
+            "config": {},
+            "labels": ["production"],
+            "tags": [],
+        })
+
+    def do_POST(self):
+        size = int(self.headers.get('Content-Length', 0))
+        self.rfile.read(size)
+        path = urlparse(self.path).path
+        if path.endswith("/otel/v1/traces"):
+            self.server.track("traces", size)
+            self._send_json(200, {})
+        elif path.endswith("/ingestion"):
+            self.server.track("ingestion", size)
+            self._send_json(207, {"successes": [], "errors": []})
+        else:
+            self.server.track("other", size)
+            self._send_json(200, {})
+
+
+def start_fake_langfuse(port: int = 0, prompts: Optional[Dict[str, str]] = None) -> FakeLangfuseServer:
+    """Start the stand-in on a background thread (port 0 picks a free port; prompts default to the local files)"""
+    server = FakeLangfuseServer(("127.0.0.1", port), prompts)
+    threading.Thread(target=server.serve_forever, name="fake-langfuse", daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=9200)
+    args = parser.parse_args()
+
+    server = FakeLangfuseServer(("127.0.0.1", args.port))
+    print(f"Fake Langfuse listening on {server.url} (prompts: {', '.join(server.prompts) or 'none'})")
+    server.serve_forever()
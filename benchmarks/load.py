@@ -0,0 +1,369 @@
+"""
+Load test the service against local stand-ins for Bedrock and Langfuse
+
+Starts benchmarks.fake_bedrock and benchmarks.fake_langfuse, launches the app with
+uvicorn pointed at them, drives /api/v1/chat and/or /api/v1/chat/stream at the
+given concurrency and reports throughput, latency percentiles, time to first byte
+(streams) and resident memory per server process. Results are written as JSON so
+runs can be compared across commits with --compare.
+
+Usage:
+    python -m benchmarks.load --mode both --concurrency 32 --requests 500 --workers 2
+    python -m benchmarks.load --compare benchmarks/results/previous.json
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import subprocess
+import statistics
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Optional, List, Dict, Any
+import httpx
+from benchmarks.fake_bedrock import FakeBedrockConfig, start_fake_bedrock
+from benchmarks.fake_langfuse import start_fake_langfuse
+
+ROOT_DIR = Path(__file__).parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+QUESTIONS = [
+    "מה התנאים לקבלת זכאות לדירה בהנחה?",
+    "איך מחדשים תעודת זכאות?",
+    "מה ההבדל בין מחיר למשתכן לדירה בהנחה?",
+    "האם אפשר להגיש בקשה כזוג צעיר?",
+]
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def summarize(latencies: List[float], ttfbs: List[float], errors: int, elapsed: float) -> Dict[str, Any]:
+    """Throughput and latency percentiles (milliseconds) for one mode"""
+    def ms(value):
+        return round(value * 1000, 1) if value is not None else None
+
+    total = len(latencies) + errors
+    result = {
+        "requests": total,
+        "errors": errors,
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(latencies) / elapsed, 2) if elapsed else None,
+        "latency_ms": {
+            "mean": ms(statistics.mean(latencies)) if latencies else None,
+            "p50": ms(percentile(latencies, 0.5)),
+            "p95": ms(percentile(latencies, 0.95)),
+            "p99": ms(percentile(latencies, 0.99)),
+        },
+    }
+    if ttfbs:
+        result["ttfb_ms"] = {
+            "p50": ms(percentile(ttfbs, 0.5)),
+            "p95": ms(percentile(ttfbs, 0.95)),
+            "p99": ms(percentile(ttfbs, 0.99)),
+        }
+    return result
+
+
+def question(index: int, distinct: int) -> str:
+    """Question for request `index`; unique per request unless `distinct` limits the set"""
+    base = QUESTIONS[index % len(QUESTIONS)]
+    if distinct:
+        return f"{base} ({index % distinct})"
+    return f"{base} (בקשה {index})"
+
+
+async def drive(base_url: str, mode: str, total: int, concurrency: int, distinct: int, timeout: float) -> Dict[str, Any]:
+    """Send `total` requests with `concurrency` in flight and measure them"""
+    url = f"{base_url}/api/v1/chat/stream" if mode == "stream" else f"{base_url}/api/v1/chat"
+    latencies: List[float] = []
+    ttfbs: List[float] = []
+    errors = 0
+    next_index = 0
+
+    async def worker(client: httpx.AsyncClient):
+        nonlocal next_index, errors
+        while next_index < total:
+            index = next_index
+            next_index += 1
+            payload = {"message": question(index, distinct)}
+            start = time.perf_counter()
+            try:
+                if mode == "stream":
+                    ttfb = None
+                    failed = False
+                    async with client.stream("POST", url, json=payload) as response:
+                        async for line in response.aiter_lines():
+                            if not line.startswith("data: "):
+                                continue
+                            if ttfb is None:
+                                ttfb = time.perf_counter() - start
+                            failed = failed or line.startswith("data: [ERROR")
+                    if response.status_code != 200 or failed:
+                        errors += 1
+                        continue
+                    if ttfb is not None:
+                        ttfbs.append(ttfb)
+                else:
+                    response = await client.post(url, json=payload)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+            except httpx.HTTPError:
+                errors += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[worker(client) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+
+    return summarize(latencies, ttfbs, errors, elapsed)
+
+
+def process_tree(pid: int) -> List[int]:
+    """The process and all its descendants (Linux /proc; just the process elsewhere)"""
+    children: Dict[int, List[int]] = {}
+    for stat_path in Path("/proc").glob("[0-9]*/stat"):
+        try:
+            fields = stat_path.read_text().rsplit(')', 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        children.setdefault(int(fields[1]), []).append(int(stat_path.parent.name))
+
+    pids, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        pids.append(current)
+        pending.extend(children.get(current, []))
+    return pids
+
+
+def rss_mb(pid: int) -> Optional[float]:
+    """Resident set size of a process in MB, if /proc is available"""
+    try:
+        for line in Path(f"/proc/{pid}/status").read_text().splitlines():
+            if line.startswith("VmRSS:"):
+                return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        pass
+    return None
+
+
+def memory_per_process(server_pid: int) -> List[Dict[str, Any]]:
+    return [{"pid": pid, "rss_mb": rss_mb(pid)} for pid in process_tree(server_pid)]
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def start_server(
+    port: int,
+    workers: int,
+    bedrock_url: str,
+    langfuse_url: str,
+    extra_env: Dict[str, str],
+    verbose: bool = False,
+    server: str = "uvicorn"
+) -> subprocess.Popen:
+    """Launch the app with uvicorn or gunicorn, pointed at the stand-ins (server output is discarded unless verbose)"""
+    env = {
+        **os.environ,
+        "BEDROCK_ENDPOINT_URL": bedrock_url,
+        "AWS_ACCESS_KEY_ID": "benchmark",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "LANGFUSE_BASE_URL": langfuse_url,
+        "LANGFUSE_PUBLIC_KEY": "pk-benchmark",
+        "LANGFUSE_SECRET_KEY": "sk-benchmark",
+        "USE_LANGFUSE": "true",
+        "LOCAL_DEV": "false",
+        "LOG_LEVEL": "WARNING",
+        **extra_env,
+    }
+    if server == "gunicorn":
+        command = [
+            sys.executable, "-m", "gunicorn", "app.main:app", "-c", "gunicorn.conf.py",
+            "--bind", f"127.0.0.1:{port}", "--workers", str(workers), "--log-level", "warning",
+        ]
+    else:
+        command = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1", "--port", str(port),
+            "--workers", str(workers), "--log-level", "warning", "--no-access-log",
+        ]
+    output = None if verbose else subprocess.DEVNULL
+    return subprocess.Popen(command, cwd=ROOT_DIR, env=env, stdout=output, stderr=output)
+
+
+def wait_until_ready(base_url: str, timeout: float = 60.0) -> Dict[str, Any]:
+    """Poll /ready until startup warm-up has finished and return the readiness report"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(f"{base_url}/ready", timeout=1.0)
+            if response.status_code == 200:
+                return response.json()
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not become ready within {timeout:.0f}s")
+
+
+def compare(current: Dict[str, Any], baseline_path: Path) -> None:
+    """Print throughput and latency changes against an earlier result file"""
+    baseline = json.loads(baseline_path.read_text(encoding='utf-8'))
+    print(f"Compared with {baseline_path} (commit {baseline.get('commit')})")
+    for mode, result in current["results"].items():
+        previous = baseline.get("results", {}).get(mode)
+        if not previous:
+            continue
+        rows = [("requests/s", previous["requests_per_second"], result["requests_per_second"])]
+        for key in ("p50", "p95", "p99"):
+            rows.append((f"latency {key} ms", previous["latency_ms"][key], result["latency_ms"][key]))
+        if "ttfb_ms" in result and "ttfb_ms" in previous:
+            rows.append(("ttfb p95 ms", previous["ttfb_ms"]["p95"], result["ttfb_ms"]["p95"]))
+        for name, before, after in rows:
+            change = f"{100 * (after - before) / before:+.1f}%" if before and after is not None else "n/a"
+            print(f"  {mode:6} {name:16} {before!s:>10} -> {after!s:>10}  ({change})")
+
+
+def print_result(mode: str, result: Dict[str, Any]) -> None:
+    latency = result["latency_ms"]
+    line = (f"{mode:6} {result['requests']} requests, {result['errors']} errors | "
+            f"{result['requests_per_second']} req/s | latency p50 {latency['p50']} p95 {latency['p95']} p99 {latency['p99']} ms")
+    if "ttfb_ms" in result:
+        line += f" | TTFB p50 {result['ttfb_ms']['p50']} p95 {result['ttfb_ms']['p95']} ms"
+    print(line)
+
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    config = FakeBedrockConfig(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        output_tokens=args.output_tokens,
+        chunk_tokens=args.chunk_tokens,
+        throttle_rate=args.throttle_rate
+    )
+    bedrock = start_fake_bedrock(config)
+    langfuse = start_fake_langfuse()
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    if not args.distinct:
+        # Unique questions differ only slightly, which the near-duplicate cache would still match
+        extra_env.setdefault("RESPONSE_CACHE_ENABLED", "false")
+        extra_env.setdefault("REQUEST_COALESCING_ENABLED", "false")
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    server = start_server(args.port, args.workers, bedrock.url, langfuse.url, extra_env, args.verbose, args.server)
+    try:
+        startup = wait_until_ready(base_url)
+        print(f"Ready after {startup['ready_after_ms']} ms (stages in ms: {startup['stages_ms']})")
+        modes = ["chat", "stream"] if args.mode == "both" else [args.mode]
+
+        # Warm up prompt caches and connection pools in every worker
+        for mode in modes:
+            asyncio.run(drive(base_url, mode, args.workers * 4, args.workers * 2, 1, args.timeout))
+
+        results = {}
+        for mode in modes:
+            results[mode] = asyncio.run(drive(base_url, mode, args.requests, args.concurrency, args.distinct, args.timeout))
+            print_result(mode, results[mode])
+
+        memory = memory_per_process(server.pid)
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+        bedrock.shutdown()
+        langfuse.shutdown()
+
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "startup": startup,
+        "config": {
+            "mode": args.mode,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "workers": args.workers,
+            "server": args.server,
+            "distinct_questions": args.distinct,
+            "env": extra_env,
+            "fake_bedrock": bedrock.stats()["config"],
+        },
+        "results": results,
+        "memory": memory,
+        "fake_bedrock": bedrock.stats(),
+        "fake_langfuse": langfuse.stats(),
+    }
+
+
+def build_parser(description: str) -> argparse.ArgumentParser:
+    """Options shared by the load test and the worker scaling benchmark"""
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--mode", choices=["chat", "stream", "both"], default="both")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per mode")
+    parser.add_argument("--concurrency", type=int, default=16, help="Requests in flight")
+    parser.add_argument("--workers", type=int, default=1, help="Server worker processes")
+    parser.add_argument("--server", choices=["uvicorn", "gunicorn"], default="uvicorn",
+                        help="Process manager (gunicorn uses gunicorn.conf.py, as in the Docker image)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--distinct", type=int, default=0,
+                        help="Number of distinct questions (0 = every request unique, with the response cache and coalescing off)")
+    parser.add_argument("--timeout", type=float, default=120.0, help="Client timeout per request in seconds")
+    parser.add_argument("--latency", type=float, default=FakeBedrockConfig.latency, help="Fake Bedrock time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=FakeBedrockConfig.tokens_per_second)
+    parser.add_argument("--output-tokens", type=int, default=FakeBedrockConfig.output_tokens)
+    parser.add_argument("--chunk-tokens", type=int, default=FakeBedrockConfig.chunk_tokens)
+    parser.add_argument("--throttle-rate", type=float, default=FakeBedrockConfig.throttle_rate)
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE",
+                        help="Extra environment for the server, e.g. --env BEDROCK_MODEL_CONCURRENCY=64")
+    parser.add_argument("--verbose", action="store_true", help="Show the server's log output")
+    parser.add_argument("-o", "--output", help="Result file (default: benchmarks/results/<timestamp>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    return parser
+
+
+def write_result(result: Dict[str, Any], output: Optional[str], prefix: str = "") -> Path:
+    """Write a result as JSON (default: benchmarks/results/<prefix><timestamp>-<commit>.json)"""
+    if output:
+        output_path = Path(output)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output_path = RESULTS_DIR / f"{prefix}{stamp}-{result['commit'] or 'unknown'}.json"
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_text(json.dumps(result, indent=2, ensure_ascii=False) + "\n", encoding='utf-8')
+    return output_path
+
+
+def main() -> int:
+    args = build_parser(__doc__.strip().splitlines()[0]).parse_args()
+    result = run(args)
+    output_path = write_result(result, args.output)
+
+    for process in result["memory"]:
+        print(f"pid {process['pid']}: {process['rss_mb']} MB RSS")
+    print(f"Results written to {output_path}")
+
+    if args.compare:
+        compare(result, Path(args.compare))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
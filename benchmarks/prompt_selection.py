@@ -0,0 +1,86 @@
+"""
+Benchmark prompt size and assembly latency with per-request prompt selection
+
+Compares injecting all few-shot examples against the top-k examples selected per
+message, and the full knowledge base against the routed categories, using the
+configured sources and the few-shot questions as queries.
+
+Usage:
+    python -m benchmarks.prompt_selection [--top-k 4] [--format minified]
+"""
+
+import argparse
+import time
+import statistics
+from app.services.prompt_selection import FewShotRetriever, KnowledgeBaseRouter
+from app.utils.prompt_format import serialize_for_prompt, estimate_tokens, SERIALIZATION_FORMATS
+from config.settings import settings
+
+
+def run(top_k: int, fmt: str) -> None:
+    few_shots = settings.load_few_shots(force_local=settings.local_dev)
+    examples = few_shots.get('few_shot_examples', [])
+    if not examples:
+        print("No few-shot examples available")
+        return
+
+    queries = [example['user_query'] for example in examples if example.get('user_query')]
+
+    # Index build (once per prompt version)
+    start = time.perf_counter()
+    retriever = FewShotRetriever(few_shots)
+    build_ms = (time.perf_counter() - start) * 1000
+
+    full_text = serialize_for_prompt(few_shots, fmt)
+    full_tokens = estimate_tokens(full_text)
+
+    select_us = []
+    selected_tokens = []
+    top1_hits = 0
+    for query, example in zip(queries, examples):
+        start = time.perf_counter()
+        subset = retriever.select(query, top_k)
+        text = serialize_for_prompt(subset, fmt)
+        select_us.append((time.perf_counter() - start) * 1e6)
+        selected_tokens.append(estimate_tokens(text))
+        top1_hits += subset['few_shot_examples'][0].get('id') == example.get('id')
+
+    mean_selected = statistics.mean(selected_tokens)
+    print(f"Few-shot examples: {len(examples)} | top-k: {top_k} | format: {fmt}")
+    print(f"Index build: {build_ms:.2f}ms")
+    print(f"Selection + serialization: p50 {statistics.median(select_us):.0f}us, max {max(select_us):.0f}us")
+    print(f"Few-shots section: all {len(full_text)} chars / ~{full_tokens} tokens, "
+          f"selected ~{mean_selected:.0f} tokens ({100 * (1 - mean_selected / full_tokens):.1f}% fewer)")
+    print(f"Top-1 self-retrieval accuracy: {top1_hits}/{len(queries)}")
+
+    knowledge_base = settings.load_knowledge_base(force_local=settings.local_dev)
+    router = KnowledgeBaseRouter(knowledge_base, fmt)
+    if len(router) < 2:
+        print("Knowledge base routing: fewer than two categories available, skipped")
+        return
+
+    route_us = []
+    routed_chars = []
+    fallbacks = 0
+    for query in queries:
+        start = time.perf_counter()
+        positions, _ = router.route(query, settings.kb_routing_max_categories, settings.kb_routing_min_score)
+        route_us.append((time.perf_counter() - start) * 1e6)
+        if positions:
+            routed_chars.append(router.selected_chars(positions))
+        else:
+            fallbacks += 1
+            routed_chars.append(router.total_chars)
+
+    mean_routed = statistics.mean(routed_chars)
+    print(f"Knowledge base categories: {len(router)} | routing p50 {statistics.median(route_us):.0f}us")
+    print(f"Knowledge base section: all {router.total_chars} chars, routed {mean_routed:.0f} chars "
+          f"({100 * (1 - mean_routed / router.total_chars):.1f}% fewer), fallbacks {fallbacks}/{len(queries)}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top-k", type=int, default=settings.few_shot_retrieval_top_k or 4)
+    parser.add_argument("--format", choices=SERIALIZATION_FORMATS, default=settings.prompt_serialization_format)
+    args = parser.parse_args()
+    run(args.top_k, args.format)
@@ -0,0 +1,80 @@
+"""
+Measure how throughput scales with the number of server workers
+
+Runs the load test (benchmarks.load) once per worker count, by default under
+gunicorn with gunicorn.conf.py as in the Docker image, and reports requests per
+second, speed-up over one worker and scaling efficiency for each mode. Client
+concurrency is scaled with the worker count so every worker stays busy. Use a
+low fake Bedrock latency to make the service's own CPU time the bottleneck.
+
+Usage:
+    python -m benchmarks.scaling --worker-counts 1,2,4 --concurrency 16 --latency 0.05
+"""
+
+import os
+import sys
+from benchmarks.load import build_parser, run, write_result
+
+
+def cpu_count() -> int:
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+def main() -> int:
+    parser = build_parser(__doc__.strip().splitlines()[0])
+    parser.add_argument("--worker-counts", default="1,2,4", help="Comma-separated worker counts to compare")
+    parser.set_defaults(server="gunicorn", mode="chat", requests=400)
+    args = parser.parse_args()
+
+    counts = [int(count) for count in args.worker_counts.split(",")]
+    base_concurrency = args.concurrency
+    print(f"Worker counts {counts} on {cpu_count()} CPUs, {base_concurrency} requests in flight per worker")
+
+    runs = []
+    for workers in counts:
+        args.workers = workers
+        args.concurrency = base_concurrency * workers
+        print(f"--- {workers} worker(s), concurrency {args.concurrency}")
+        runs.append(run(args))
+
+    summary = {}
+    for mode in runs[0]["results"]:
+        baseline = runs[0]["results"][mode]["requests_per_second"]
+        rows = []
+        for workers, result in zip(counts, runs):
+            rps = result["results"][mode]["requests_per_second"]
+            speedup = rps / baseline if baseline else None
+            rows.append({
+                "workers": workers,
+                "requests_per_second": rps,
+                "latency_p95_ms": result["results"][mode]["latency_ms"]["p95"],
+                "speedup": round(speedup, 2) if speedup else None,
+                "efficiency": round(speedup * counts[0] / workers, 2) if speedup else None,
+                "rss_mb_total": round(sum(p["rss_mb"] or 0 for p in result["memory"]), 1),
+            })
+        summary[mode] = rows
+
+    print("=" * 60)
+    for mode, rows in summary.items():
+        for row in rows:
+            print(f"{mode:6} {row['workers']:>2} workers: {row['requests_per_second']:>8} req/s | "
+                  f"x{row['speedup']} ({row['efficiency']:.0%} efficiency) | p95 {row['latency_p95_ms']} ms | "
+                  f"{row['rss_mb_total']} MB RSS")
+
+    result = {
+        "timestamp": runs[0]["timestamp"],
+        "commit": runs[0]["commit"],
+        "cpus": cpu_count(),
+        "scaling": summary,
+        "runs": runs,
+    }
+    output_path = write_result(result, args.output, prefix="scaling-")
+    print(f"Results written to {output_path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
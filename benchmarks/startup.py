@@ -0,0 +1,176 @@
+"""
+Measure import time and cold start of the service
+
+Profiles `import app.main` with `python -X importtime` (total time and the largest
+top-level imports) and checks that modules which are imported on first use
+(boto3, langfuse, httpx) stay out of the import path. Then starts the app against
+the local Bedrock and Langfuse stand-ins several times and reports the time until
+it accepts connections (/health) and until startup warm-up has finished (/ready),
+with the per-stage breakdown from /ready. Exits non-zero when a budget is exceeded.
+
+Usage:
+    python -m benchmarks.startup --runs 5
+    python -m benchmarks.startup --max-import-ms 1000 --max-ready-ms 3000 --server gunicorn --workers 2
+"""
+
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import Optional, List, Dict, Any, Tuple
+import httpx
+from benchmarks.fake_bedrock import FakeBedrockConfig, start_fake_bedrock
+from benchmarks.fake_langfuse import start_fake_langfuse
+from benchmarks.load import ROOT_DIR, git_commit, start_server, write_result
+
+# Imported on first use by the service, never by `import app.main`
+LAZY_MODULES = ("boto3", "botocore.config", "langfuse", "httpx")
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, float, float]]:
+    """(module, self ms, cumulative ms) for every line of `python -X importtime` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us) / 1000, int(cumulative_us) / 1000))
+    return rows
+
+
+def import_profile(module: str = "app.main", top: int = 10) -> Dict[str, Any]:
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    Args:
+        module: Module to import
+        top: Number of largest top-level imports to report
+
+    Returns:
+        Total import time, the largest top-level imports and the lazy modules that were imported
+    """
+    check = f"import sys, {module}; print('imported:' + ','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", check],
+        cwd=ROOT_DIR, capture_output=True, text=True, check=True
+    )
+    rows = parse_importtime(completed.stderr)
+    total_ms = next(cumulative for name, _, cumulative in rows if name == module)
+    packages = sorted(
+        ((name, cumulative) for name, _, cumulative in rows if "." not in name and name != module),
+        key=lambda row: row[1], reverse=True
+    )
+    imported = next(line for line in completed.stdout.splitlines() if line.startswith("imported:"))
+    return {
+        "total_ms": round(total_ms, 1),
+        "largest_imports_ms": {name: round(cumulative, 1) for name, cumulative in packages[:top]},
+        "eager_lazy_modules": [name for name in imported[len("imported:"):].split(",") if name],
+    }
+
+
+def wait_for(url: str, deadline: float) -> httpx.Response:
+    """Poll a URL until it returns 200"""
+    while time.monotonic() < deadline:
+        try:
+            response = httpx.get(url, timeout=1.0)
+            if response.status_code == 200:
+                return response
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)
+    raise RuntimeError(f"{url} did not return 200 in time")
+
+
+def cold_start(args: argparse.Namespace, bedrock_url: str, langfuse_url: str) -> Dict[str, Any]:
+    """Start the server once and time it until it is listening and until it is ready"""
+    base_url = f"http://127.0.0.1:{args.port}"
+    extra_env = dict(item.split("=", 1) for item in args.env)
+    started = time.monotonic()
+    server = start_server(args.port, args.workers, bedrock_url, langfuse_url, extra_env, args.verbose, args.server)
+    try:
+        deadline = started + args.timeout
+        wait_for(f"{base_url}/health", deadline)
+        listening = time.monotonic()
+        report = wait_for(f"{base_url}/ready", deadline).json()
+        ready = time.monotonic()
+    finally:
+        server.terminate()
+        try:
+            server.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            server.kill()
+
+    return {
+        "listening_ms": round((listening - started) * 1000, 1),
+        "ready_ms": round((ready - started) * 1000, 1),
+        "stages_ms": report["stages_ms"],
+    }
+
+
+def median(values: List[float]) -> Optional[float]:
+    return round(statistics.median(values), 1) if values else None
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3, help="Cold starts (and import profiles) to measure")
+    parser.add_argument("--server", choices=("uvicorn", "gunicorn"), default="uvicorn")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for a server to become ready")
+    parser.add_argument("--env", action="append", default=[], metavar="NAME=VALUE", help="Extra server environment")
+    parser.add_argument("--max-import-ms", type=float, help="Fail if the median import of app.main is slower")
+    parser.add_argument("--max-ready-ms", type=float, help="Fail if the median time until /ready is slower")
+    parser.add_argument("--verbose", action="store_true", help="Show server output")
+    parser.add_argument("-o", "--output", help="Result file (default: benchmarks/results/startup-<timestamp>-<commit>.json)")
+    args = parser.parse_args()
+
+    profiles = [import_profile() for _ in range(args.runs)]
+    import_ms = median([profile["total_ms"] for profile in profiles])
+    print(f"import app.main: {import_ms} ms (median of {args.runs})")
+    for name, cumulative in profiles[-1]["largest_imports_ms"].items():
+        print(f"  {name:24} {cumulative:8.1f} ms")
+
+    bedrock = start_fake_bedrock(FakeBedrockConfig(latency=0.0, tokens_per_second=0))
+    langfuse = start_fake_langfuse()
+    try:
+        starts = [cold_start(args, bedrock.url, langfuse.url) for _ in range(args.runs)]
+    finally:
+        bedrock.shutdown()
+        langfuse.shutdown()
+
+    listening_ms = median([start["listening_ms"] for start in starts])
+    ready_ms = median([start["ready_ms"] for start in starts])
+    stages = {name: median([start["stages_ms"].get(name, 0.0) for start in starts]) for name in starts[0]["stages_ms"]}
+    print(f"{args.server} x{args.workers}: listening after {listening_ms} ms, ready after {ready_ms} ms (median)")
+    print(f"  startup stages (ms): {stages}")
+
+    failures = []
+    eager = sorted({name for profile in profiles for name in profile["eager_lazy_modules"]})
+    if eager:
+        failures.append(f"imported by app.main but should be imported on first use: {', '.join(eager)}")
+    if args.max_import_ms is not None and import_ms > args.max_import_ms:
+        failures.append(f"import took {import_ms} ms (budget {args.max_import_ms} ms)")
+    if args.max_ready_ms is not None and ready_ms > args.max_ready_ms:
+        failures.append(f"ready after {ready_ms} ms (budget {args.max_ready_ms} ms)")
+
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "config": {"server": args.server, "workers": args.workers, "runs": args.runs, "env": args.env},
+        "import": {"median_ms": import_ms, **profiles[-1]},
+        "cold_start": {"listening_ms": listening_ms, "ready_ms": ready_ms, "stages_ms": stages, "runs": starts},
+        "failures": failures,
+    }
+    output_path = write_result(result, args.output, prefix="startup-")
+    print(f"Results written to {output_path}")
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
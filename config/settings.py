@@ -2,18 +2,37 @@
 
 import os
 import json
+import time
+import hashlib
+import threading
 from pathlib import Path
-from typing import Optional, Dict, Any
-# import httpx
+from typing import Optional, Dict, Any, Tuple, List, Literal, Callable, TYPE_CHECKING
+from dataclasses import dataclass
 from pydantic_settings import BaseSettings
-from langfuse import Langfuse
 from dotenv import load_dotenv
 from datetime import datetime
+from app.utils.prompt_format import serialize_for_prompt
 load_dotenv()
 
+if TYPE_CHECKING:
+    import httpx
+
+# Imported on first use by LangfuseClientRegistry: langfuse (with httpx) takes about
+# half of the app's import time and isn't needed until the first prompt fetch or trace
+Langfuse = None
+
+
+def _import_langfuse():
+    global Langfuse
+    if Langfuse is None:
+        from langfuse import Langfuse
+    return Langfuse
+
 # workaround for kate
 # client = httpx.Client(verify=False)
 
+DEFAULT_SYSTEM_PROMPT = "You are a helpful AI assistant powered by AWS Bedrock. Provide clear, accurate, and concise responses to user queries."
+
 class Settings(BaseSettings):
     """Application settings"""
 
@@ -21,6 +40,7 @@ class Settings(BaseSettings):
     aws_region: str = "us-east-1"
     aws_access_key_id: Optional[str] = None
     aws_secret_access_key: Optional[str] = None
+    bedrock_endpoint_url: Optional[str] = None  # Override the bedrock-runtime endpoint (e.g. benchmarks.fake_bedrock)
 
     # Bedrock Configuration
     default_model_id: str = "anthropic.claude-3-sonnet-20240229-v1:0"
@@ -29,17 +49,117 @@ class Settings(BaseSettings):
     system_prompt_file: str = "prompts/system_prompt.txt"
     knowledge_base_file: str = "prompts/knowledge_base.json"
     few_shots_file: str = "prompts/few_shots.json"
+    few_shot_retrieval_top_k: int = 4  # Most relevant few-shot examples injected per request (0 = all; prompt-caching models always get all, cached)
+    kb_routing_enabled: bool = True  # Inject only the knowledge base categories matching the message (not for prompt-caching models, which get the full cached knowledge base)
+    kb_routing_max_categories: int = 2
+    kb_routing_min_score: float = 0.2  # Below this similarity the full knowledge base is injected
+    prompt_serialization_format: Literal["pretty", "minified", "compact"] = "minified"  # How knowledge base and few-shots are injected
+
+    # Model Routing Configuration
+    model_routing_enabled: bool = True  # Send simple questions to the fast model, the rest to default_model_id
+    fast_model_id: str = "anthropic.claude-3-haiku-20240307-v1:0"
+    model_routing_simple_max_chars: int = 120  # Longer (normalized) questions go to the strong model
+    model_routing_simple_max_turns: int = 4  # Conversations with more previous messages go to the strong model
+    model_fallback_ids: List[str] = []  # Extra models tried after the fast/strong pair fails
+    model_attempt_timeout_seconds: float = 30.0  # Per-model attempt timeout before falling back (0 = none); all attempts share the request deadline
+
+    # Hedged Request Configuration
+    hedging_enabled: bool = False  # Fire a second invocation when a non-streaming call is slower than usual
+    hedging_percentile: float = 0.95  # Hedge after this percentile of the model's recent latency...
+    hedging_min_delay_seconds: float = 1.0  # ...but never earlier than this
+    hedging_max_delay_seconds: float = 10.0  # ...or later than this (also used until enough samples exist)
+    hedging_budget_ratio: float = 0.05  # Maximum fraction of requests that may be hedged
+    hedging_alternate_model_id: Optional[str] = None  # Model for the hedged invocation (default: same model)
+
+    # Bedrock Concurrency Configuration
+    bedrock_executor_workers: int = 32  # Dedicated threads for blocking boto3 invocations (stream readers get their own max_concurrent_streams threads)
+    bedrock_model_concurrency: int = 16  # Max in-flight invocations per model
+    bedrock_model_concurrency_overrides: Dict[str, int] = {}  # Per-model limits, e.g. {"anthropic.claude-3-haiku-20240307-v1:0": 32}
+    bedrock_queue_timeout_seconds: float = 30.0  # Max wait for a free slot before rejecting the request
+    bedrock_adaptive_concurrency: bool = True  # AIMD: halve a model's limit on throttling, grow it back on success
+    bedrock_min_concurrency: int = 1
+    bedrock_latency_target_seconds: float = 0.0  # Calls slower than this also shrink the limit (0 = ignore latency)
+    bedrock_rate_limit_per_second: float = 0.0  # Token bucket rate per model (0 = unlimited)
+    bedrock_rate_limit_burst: int = 20
+    bedrock_request_deadline_seconds: float = 60.0  # Time budget for a request including throttling retries
+    bedrock_max_retries: int = 4
+    bedrock_backoff_base_seconds: float = 0.25  # Full-jitter exponential backoff between throttled attempts
+    bedrock_backoff_max_seconds: float = 8.0
+    max_concurrent_streams: int = 64  # Max simultaneous /chat/stream responses per worker (one reader thread each)
+    stream_queue_size: int = 64  # Buffered chunks between the Bedrock reader and the SSE response
+
+    # Bedrock Client Configuration
+    bedrock_max_pool_connections: int = 0  # Pooled connections to bedrock-runtime (0 = bedrock_executor_workers + max_concurrent_streams, one per call in flight)
+    bedrock_connect_timeout_seconds: float = 5.0
+    bedrock_read_timeout_seconds: float = 60.0  # Max silence on a connection; non-streaming calls are silent until the answer is complete
+    bedrock_tcp_keepalive: bool = True  # Probe idle pooled connections so ones dropped by NAT/firewalls are detected
+    bedrock_tcp_keepalive_idle_seconds: int = 60  # Idle time before the first probe (Linux; OS default is 2 hours)
+    bedrock_retry_mode: Literal["standard", "adaptive", "legacy"] = "standard"
+    bedrock_max_attempts: int = 3  # botocore attempts per call for transient errors (5xx, connection errors, timeouts); throttling is left to the governor, which needs to see every throttle
+
+    # Multi-Region Configuration
+    bedrock_regions: List[str] = []  # Regions to spread Bedrock calls over, preferred first (empty = aws_region only)
+    bedrock_region_latency_alpha: float = 0.2  # EWMA weight of the newest latency sample
+    bedrock_region_error_alpha: float = 0.1  # EWMA weight of the newest success/failure in the error rate
+    bedrock_region_error_penalty: float = 4.0  # Region score = EWMA latency x (1 + penalty x EWMA error rate)
+    bedrock_region_cooldown_seconds: float = 30.0  # A region that throttled or failed is tried last for this long
+    bedrock_region_explore_ratio: float = 0.02  # Share of calls sent to another region to keep its latency estimate fresh
+
+    # Bedrock Prompt Caching Configuration
+    bedrock_prompt_caching_enabled: bool = True  # Mark the static system prompt as a Bedrock cache point
+    bedrock_prompt_caching_models: List[str] = [
+        "claude-3-5-haiku",
+        "claude-3-7-sonnet",
+        "claude-sonnet-4",
+        "claude-opus-4",
+        "claude-haiku-4",
+    ]  # Model ID substrings that support prompt caching
+
+    # Response Cache Configuration
+    response_cache_enabled: bool = True
+    response_cache_max_entries: int = 1000
+    response_cache_ttl_seconds: int = 3600
+    response_cache_similarity_threshold: float = 0.92  # Char-trigram cosine similarity for near-duplicates (numbers, negations and status words must match exactly)
+
+    # Request Coalescing Configuration
+    request_coalescing_enabled: bool = True  # Identical concurrent requests share one Bedrock invocation/stream
+
+    # Conversation History Configuration
+    history_max_tokens: int = 3000  # Estimated token budget for the messages array (0 = unlimited)
+    history_strategy: Literal["drop", "summarize"] = "summarize"  # What happens to turns beyond the budget
+    history_summary_max_tokens: int = 400  # Part of the budget reserved for the summary of older turns
+    history_summary_cache_size: int = 1000
+
+    # Batch Configuration
+    batch_concurrency: int = 8  # Default requests in flight per /chat/batch call
+    batch_max_concurrency: int = 32  # Upper bound for the concurrency query parameter
+
+    # Session Configuration
+    session_backend: Literal["memory", "sqlite"] = "memory"  # sqlite persists sessions across restarts and workers
+    session_sqlite_path: str = "data/sessions.db"
+    session_max_sessions: int = 10000  # Sessions kept in memory (least recently used are evicted)
+    session_ttl_seconds: int = 86400  # Idle sessions expire after this
 
     # Server Configuration
     host: str = "0.0.0.0"
     port: int = 8000
     log_level: str = "INFO"
 
+    # Startup Configuration
+    startup_warmup_enabled: bool = True  # Warm prompts and connections before /ready reports ready
+    startup_warmup_invocation: bool = False  # Also send a one-token invocation to each routed model
+    startup_retry_seconds: float = 10.0  # Retry failed warm-up stages after this
+
     # Langfuse Configuration
     langfuse_secret_key: Optional[str] = None
     langfuse_public_key: Optional[str] = None
     langfuse_base_url: str = "https://cloud.langfuse.com"
     use_langfuse: bool = True  # Toggle to use Langfuse or local files
+    langfuse_timeout_seconds: int = 10
+    langfuse_max_connections: int = 10  # Pooled HTTP connections shared by prompt fetches and tracing
+    telemetry_queue_size: int = 1000  # Generations buffered for background export; overflow is dropped
+    telemetry_batch_size: int = 50  # Flush after this many exported generations
+    telemetry_flush_interval_seconds: float = 5.0  # ...or after this long, whichever comes first
 
     # Langfuse Prompt Names
     langfuse_system_prompt_name: str = "moch-system-prompt"
@@ -48,194 +168,748 @@ class Settings(BaseSettings):
 
     local_dev: bool = False  # If true, forces loading from local files
 
+    # Prompt Cache Configuration
+    prompt_cache_enabled: bool = True
+    prompt_cache_ttl_seconds: int = 300  # Serve cached prompt, refresh in background after this
+    prompt_snapshot_file: str = "data/prompt_snapshot.json"  # Last-known-good Langfuse prompt, served while Langfuse is down ("" = off)
+
+    # Prompt Source Circuit Breaker Configuration
+    prompt_fetch_timeout_seconds: int = 5  # Per Langfuse prompt fetch, without retries
+    prompt_breaker_failure_threshold: int = 3  # Consecutive failed fetches before Langfuse is skipped
+    prompt_breaker_reset_seconds: float = 30.0  # Time before a background probe is allowed through
+
     class Config:
         env_file = ".env"
         case_sensitive = False
+        protected_namespaces = ("settings_",)  # Allow the model_* routing fields
 
-    def _get_langfuse_client(self) -> Optional[Langfuse]:
-        """Get Langfuse client if credentials are configured"""
+    def _get_langfuse_client(self) -> Optional["Langfuse"]:
+        """Get the shared Langfuse client if credentials are configured"""
         if not self.use_langfuse:
             return None
 
-        if not self.langfuse_secret_key or not self.langfuse_public_key:
-            print("Warning: Langfuse credentials not configured")
+        return langfuse_clients.get(self)
+
+    def _fetch_langfuse_prompt(self, name: str):
+        """
+        Fetch the production version of a prompt from Langfuse through the circuit breaker
+
+        Args:
+            name: Langfuse prompt name
+
+        Returns:
+            Langfuse prompt client, or None if Langfuse is not configured or the breaker is open
+        """
+        client = self._get_langfuse_client()
+        if not client or not prompt_source_breaker.allow():
             return None
 
         try:
-            return Langfuse(
-                secret_key=self.langfuse_secret_key,
-                public_key=self.langfuse_public_key,
-                host=self.langfuse_base_url,
-                # httpx_client=client
+            # No SDK caching or retries: the prompt cache and the breaker handle both
+            prompt = client.get_prompt(
+                name,
+                cache_ttl_seconds=0,
+                max_retries=0,
+                fetch_timeout_seconds=self.prompt_fetch_timeout_seconds
             )
-        except Exception as e:
-            print(f"Warning: Could not initialize Langfuse client: {e}")
-            return None
+        except Exception:
+            prompt_source_breaker.record_failure()
+            raise
+        prompt_source_breaker.record_success()
+        return prompt
 
     def load_knowledge_base(self, force_local:bool=False) -> Dict[str, Any]:
         """Load knowledge base from Langfuse or fallback to local JSON file"""
+        return self.load_knowledge_base_versioned(force_local=force_local)[0]
+
+    def load_knowledge_base_versioned(self, force_local:bool=False) -> Tuple[Dict[str, Any], str]:
+        """Load knowledge base and return it together with its version identifier"""
         prompt = None
         if not force_local:
             # Try Langfuse first
             if self.use_langfuse:
                 try:
-                    client = self._get_langfuse_client()
-                    if client:
-                        # Fetch production version (no caching - always get latest)
-                        prompt = client.get_prompt(self.langfuse_knowledge_base_name, cache_ttl_seconds=0)
-                        if prompt and prompt.prompt:
-                            print(f"✅ Loaded knowledge base from Langfuse (version: {prompt.version})")
-                            # Parse JSON from prompt content
-                            return json.loads(prompt.prompt)
+                    prompt = self._fetch_langfuse_prompt(self.langfuse_knowledge_base_name)
+                    if prompt and prompt.prompt:
+                        print(f"✅ Loaded knowledge base from Langfuse (version: {prompt.version})")
+                        # Parse JSON from prompt content
+                        return json.loads(prompt.prompt), f"langfuse:{prompt.version}"
                 except Exception as e:
                     print(f"Warning: Could not load knowledge base from Langfuse: {e}")
 
-        if not prompt:
-            # Fallback to local file
-            try:
-                root_dir = Path(__file__).parent.parent
-                kb_path = root_dir / self.knowledge_base_file
-
-                if kb_path.exists():
-                    with open(kb_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        print(f"📁 Loaded knowledge base from local file")
-                        return data
-                else:
-                    print(f"Warning: Knowledge base file not found at {kb_path}")
-                    return {}
-            except Exception as e:
-                print(f"Warning: Could not load knowledge base from file: {e}")
-                return {}
+        # Fallback to local file
+        try:
+            root_dir = Path(__file__).parent.parent
+            kb_path = root_dir / self.knowledge_base_file
+
+            if kb_path.exists():
+                with open(kb_path, 'rb') as f:
+                    raw = f.read()
+                data = json.loads(raw.decode('utf-8'))
+                print(f"📁 Loaded knowledge base from local file")
+                return data, _local_version(raw)
+            else:
+                print(f"Warning: Knowledge base file not found at {kb_path}")
+                return {}, "none"
+        except Exception as e:
+            print(f"Warning: Could not load knowledge base from file: {e}")
+            return {}, "none"
 
     def load_few_shots(self, force_local:bool=False) -> Dict[str, Any]:
         """Load few-shot examples from Langfuse or fallback to local JSON file"""
+        return self.load_few_shots_versioned(force_local=force_local)[0]
+
+    def load_few_shots_versioned(self, force_local:bool=False) -> Tuple[Dict[str, Any], str]:
+        """Load few-shot examples and return them together with their version identifier"""
         prompt = None
         if not force_local:
             # Try Langfuse first
             if self.use_langfuse:
                 try:
-                    client = self._get_langfuse_client()
-                    if client:
-                        # Fetch production version (no caching - always get latest)
-                        prompt = client.get_prompt(self.langfuse_few_shots_name, cache_ttl_seconds=0)
-                        if prompt and prompt.prompt:
-                            print(f"✅ Loaded few-shots from Langfuse (version: {prompt.version})")
-                            # Parse JSON from prompt content
-                            return json.loads(prompt.prompt)
+                    prompt = self._fetch_langfuse_prompt(self.langfuse_few_shots_name)
+                    if prompt and prompt.prompt:
+                        print(f"✅ Loaded few-shots from Langfuse (version: {prompt.version})")
+                        # Parse JSON from prompt content
+                        return json.loads(prompt.prompt), f"langfuse:{prompt.version}"
                 except Exception as e:
                     print(f"Warning: Could not load few-shots from Langfuse: {e}")
 
-        if not prompt:
-            # Fallback to local file
-            try:
-                root_dir = Path(__file__).parent.parent
-                fs_path = root_dir / self.few_shots_file
-
-                if fs_path.exists():
-                    with open(fs_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        print(f"📁 Loaded few-shots from local file")
-                        return data
-                else:
-                    print(f"Warning: Few-shots file not found at {fs_path}")
-                    return {}
-            except Exception as e:
-                print(f"Warning: Could not load few-shots from file: {e}")
-                return {}
+        # Fallback to local file
+        try:
+            root_dir = Path(__file__).parent.parent
+            fs_path = root_dir / self.few_shots_file
+
+            if fs_path.exists():
+                with open(fs_path, 'rb') as f:
+                    raw = f.read()
+                data = json.loads(raw.decode('utf-8'))
+                print(f"📁 Loaded few-shots from local file")
+                return data, _local_version(raw)
+            else:
+                print(f"Warning: Few-shots file not found at {fs_path}")
+                return {}, "none"
+        except Exception as e:
+            print(f"Warning: Could not load few-shots from file: {e}")
+            return {}, "none"
+
+    def load_system_prompt_template(self, force_local:bool=False) -> Tuple[Optional[str], str]:
+        """Load the raw system prompt template (without injected data) and its version identifier"""
+        if not force_local:
+            # Try Langfuse first for base template
+            if self.use_langfuse:
+                try:
+                    prompt_obj = self._fetch_langfuse_prompt(self.langfuse_system_prompt_name)
+                    if prompt_obj and prompt_obj.prompt:
+                        print(f"✅ Loaded system prompt from Langfuse (version: {prompt_obj.version})")
+                        return prompt_obj.prompt, f"langfuse:{prompt_obj.version}"
+                except Exception as e:
+                    print(f"Warning: Could not load system prompt from Langfuse: {e}")
+
+        # Fallback to local file if Langfuse failed
+        root_dir = Path(__file__).parent.parent
+        prompt_path = root_dir / self.system_prompt_file
+
+        if prompt_path.exists():
+            with open(prompt_path, 'rb') as f:
+                raw = f.read()
+            print(f"📁 Loaded system prompt from local file")
+            return raw.decode('utf-8').strip(), _local_version(raw)
+
+        return None, "none"
 
     def load_system_prompt(self, force_local:bool=False) -> str:
         """Load system prompt from Langfuse or file and inject knowledge base and few-shot examples"""
         try:
-            prompt = None
-            
-            if not force_local:
-                # Try Langfuse first for base template
-                if self.use_langfuse:
-                    try:
-                        client = self._get_langfuse_client()
-                        if client:
-                            # Fetch production version (no caching - always get latest)
-                            prompt_obj = client.get_prompt(self.langfuse_system_prompt_name, cache_ttl_seconds=0)
-                            if prompt_obj and prompt_obj.prompt:
-                                prompt = prompt_obj.prompt
-                                print(f"✅ Loaded system prompt from Langfuse (version: {prompt_obj.version})")
-                    except Exception as e:
-                        print(f"Warning: Could not load system prompt from Langfuse: {e}")
-
-            # Fallback to local file if Langfuse failed
+            prompt, _ = self.load_system_prompt_template(force_local=force_local)
             if not prompt:
-                root_dir = Path(__file__).parent.parent
-                prompt_path = root_dir / self.system_prompt_file
+                # Ultimate fallback
+                return DEFAULT_SYSTEM_PROMPT
+
+            knowledge_base = self.load_knowledge_base(force_local=force_local)
+            few_shots = self.load_few_shots(force_local=force_local)
+
+            return inject_current_date(
+                assemble_system_prompt(prompt, knowledge_base, few_shots, self.prompt_serialization_format)
+            )
+
+        except Exception as e:
+            # Fallback to default on error
+            print(f"Warning: Could not load system prompt: {e}")
+            return DEFAULT_SYSTEM_PROMPT
+
+
+def _local_version(raw: bytes) -> str:
+    """Build a version identifier for a local prompt file from its content hash"""
+    return f"local:{hashlib.sha1(raw).hexdigest()[:12]}"
+
 
-                if prompt_path.exists():
-                    with open(prompt_path, 'r', encoding='utf-8') as f:
-                        prompt = f.read().strip()
-                        print(f"📁 Loaded system prompt from local file")
+def replace_section(prompt: str, tag: str, content: str) -> str:
+    """Replace the content between <tag> and </tag> in the prompt, if both tags are present"""
+    start_tag = f'<{tag}>'
+    end_tag = f'</{tag}>'
+    if start_tag not in prompt or end_tag not in prompt:
+        return prompt
+
+    start_idx = prompt.find(start_tag) + len(start_tag)
+    end_idx = prompt.find(end_tag)
+
+    return (
+        prompt[:start_idx] +
+        '\n' + content + '\n' +
+        prompt[end_idx:]
+    )
+
+
+def remove_section(prompt: str, tag: str) -> str:
+    """Remove the <tag>...</tag> section (including the tags) from the prompt, if present"""
+    start_tag = f'<{tag}>'
+    end_tag = f'</{tag}>'
+    if start_tag not in prompt or end_tag not in prompt:
+        return prompt
+
+    start_idx = prompt.find(start_tag)
+    end_idx = prompt.find(end_tag) + len(end_tag)
+
+    return (prompt[:start_idx].rstrip() + '\n\n' + prompt[end_idx:].lstrip()).strip()
+
+
+def assemble_system_prompt(
+    template: str,
+    knowledge_base: Dict[str, Any],
+    few_shots: Dict[str, Any],
+    serialization_format: str = "pretty"
+) -> str:
+    """Inject knowledge base and few-shot examples into the system prompt template"""
+    prompt = template
+
+    if knowledge_base:
+        # Replace <knowledge_base> section with actual data
+        kb_text = serialize_for_prompt(knowledge_base, serialization_format)
+        prompt = replace_section(prompt, 'knowledge_base', kb_text)
+
+    if few_shots:
+        # Replace <few_shot_examples> section with actual data
+        fs_text = serialize_for_prompt(few_shots, serialization_format)
+        prompt = replace_section(prompt, 'few_shot_examples', fs_text)
+
+    return prompt
+
+
+def inject_current_date(prompt: str) -> str:
+    """Inject today's date into the <current_date> section of the prompt"""
+    return replace_section(prompt, 'current_date', datetime.now().strftime('%Y-%m-%d'))
+
+
+@dataclass(frozen=True)
+class PromptSnapshot:
+    """Prompt sources and the assembled prompt (without the current date) for one version triple"""
+    prompt: str
+    template: Optional[str]
+    knowledge_base: Dict[str, Any]
+    few_shots: Dict[str, Any]
+    versions: Tuple[str, str, str]
+
+
+class PromptSourceBreaker:
+    """
+    Circuit breaker around Langfuse prompt fetches
+
+    After prompt_breaker_failure_threshold consecutive failed fetches the breaker opens
+    and the loaders skip Langfuse without waiting for it. Once prompt_breaker_reset_seconds
+    have passed, a single probe is let through (half-open): success closes the breaker,
+    failure opens it for another period.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, settings: "Settings"):
+        self._settings = settings
+        self._lock = threading.Lock()
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+
+        self.failures = 0
+        self.rejected = 0
+        self.trips = 0
+
+    @property
+    def errors(self) -> int:
+        """Fetches that failed or were skipped because the breaker was open"""
+        return self.failures + self.rejected
+
+    def probe_due(self) -> bool:
+        """Whether the breaker is open and the next fetch would be let through as a probe"""
+        return (self.state == self.OPEN and
+                time.monotonic() - self._opened_at >= self._settings.prompt_breaker_reset_seconds)
+
+    def available(self) -> bool:
+        """Whether a fetch would currently be attempted"""
+        return self.state == self.CLOSED or self.probe_due()
+
+    def allow(self) -> bool:
+        """Decide whether to attempt a fetch, turning the first one after the reset period into the probe"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.probe_due():
+                self.state = self.HALF_OPEN
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.consecutive_failures = 0
+            if self.state != self.CLOSED:
+                print("✅ Langfuse prompt source recovered, circuit breaker closed")
+            self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.consecutive_failures += 1
+            if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and
+                self.consecutive_failures >= self._settings.prompt_breaker_failure_threshold
+            ):
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
+                self.trips += 1
+                print(f"Warning: Langfuse prompt source unavailable, skipping it for "
+                      f"{self._settings.prompt_breaker_reset_seconds}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Current state and failure counters"""
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "trips": self.trips,
+        }
+
+
+class PromptCache:
+    """
+    In-process cache for the assembled system prompt
+
+    The assembled prompt is kept together with the (system, knowledge base, few-shots)
+    version triple it was built from. Once the entry is older than the TTL, the stale
+    prompt keeps being served while a background thread re-fetches the sources, so
+    request latency never includes Langfuse round-trips after the first load.
+
+    Every prompt loaded from Langfuse is also written to an on-disk snapshot. A cold
+    cache starts from that snapshot and refreshes in the background, and while Langfuse
+    is unavailable the last-known-good prompt keeps being served instead of the local
+    prompt files.
+    """
+
+    def __init__(self, settings: "Settings"):
+        self._settings = settings
+        self._lock = threading.Lock()
+        self._snapshot: Optional[PromptSnapshot] = None
+        self._loaded_at = 0.0
+        self._refreshing = False
+        self._listeners: List[Callable[[PromptSnapshot], None]] = []
+
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        self.refresh_errors = 0
+        self.snapshot_restores = 0
+
+    @property
+    def versions(self) -> Optional[Tuple[str, str, str]]:
+        """Version triple (system, knowledge base, few-shots) of the cached prompt"""
+        return self._snapshot.versions if self._snapshot else None
+
+    @property
+    def snapshot(self) -> Optional[PromptSnapshot]:
+        """Current snapshot, or None before the first load"""
+        return self._snapshot
+
+    def add_listener(self, callback: Callable[[PromptSnapshot], None]) -> None:
+        """Register a callback invoked with the new snapshot whenever a prompt version changes"""
+        self._listeners.append(callback)
+
+    def get(
+        self,
+        knowledge_base: Optional[Dict[str, Any]] = None,
+        few_shots: Optional[Dict[str, Any]] = None
+    ) -> str:
+        """
+        Return the assembled system prompt, loading it synchronously only on a cold cache
+
+        Args:
+            knowledge_base: Per-request knowledge base subset to inject instead of the full one
+            few_shots: Per-request few-shot subset to inject instead of the full set
+
+        Returns:
+            System prompt with the current date injected
+        """
+        snapshot = self._load()
+        prompt = snapshot.prompt
+        for tag, content in self._overrides(snapshot, knowledge_base, few_shots):
+            prompt = replace_section(prompt, tag, content)
+        return inject_current_date(prompt)
+
+    def get_blocks(
+        self,
+        knowledge_base: Optional[Dict[str, Any]] = None,
+        few_shots: Optional[Dict[str, Any]] = None
+    ) -> Tuple[str, str]:
+        """
+        Return the system prompt split into a static prefix and a volatile suffix
+
+        The static part (template, knowledge base and few-shots) is identical across
+        requests and can be marked as a Bedrock prompt cache point. Volatile sections,
+        i.e. <current_date> and any per-request subsets, are moved after it so they
+        don't invalidate the cache.
+        """
+        snapshot = self._load()
+        static = snapshot.prompt
+        sections = self._overrides(snapshot, knowledge_base, few_shots)
+        sections.append(('current_date', datetime.now().strftime('%Y-%m-%d')))
+
+        volatile = []
+        for tag, content in sections:
+            if f'<{tag}>' in static and f'</{tag}>' in static:
+                static = remove_section(static, tag)
+                volatile.append(f'<{tag}>\n{content}\n</{tag}>')
+
+        return static, '\n\n'.join(volatile)
+
+    def _overrides(
+        self,
+        snapshot: PromptSnapshot,
+        knowledge_base: Optional[Dict[str, Any]],
+        few_shots: Optional[Dict[str, Any]]
+    ) -> List[Tuple[str, str]]:
+        """Serialize per-request section overrides as (tag, content) pairs"""
+        if not snapshot.template:
+            return []
+
+        fmt = self._settings.prompt_serialization_format
+        overrides = []
+        if knowledge_base is not None:
+            overrides.append(('knowledge_base', serialize_for_prompt(knowledge_base, fmt)))
+        if few_shots is not None:
+            overrides.append(('few_shot_examples', serialize_for_prompt(few_shots, fmt)))
+        return overrides
+
+    def _load(self) -> PromptSnapshot:
+        """Return the current snapshot, counting hits and scheduling refreshes"""
+        if not self._settings.prompt_cache_enabled:
+            self.refresh()
+            return self._snapshot
+
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self.misses += 1
+                    if not self._restore_snapshot():
+                        self.refresh()
                 else:
-                    # Ultimate fallback
-                    return "You are a helpful AI assistant powered by AWS Bedrock. Provide clear, accurate, and concise responses to user queries."
+                    self.hits += 1
+            snapshot = self._snapshot
+        else:
+            self.hits += 1
 
-            # Load knowledge base and inject into prompt
-            knowledge_base = self.load_knowledge_base(force_local=force_local)
-            if knowledge_base:
-                # Convert knowledge base to formatted string
-                kb_json = json.dumps(knowledge_base, ensure_ascii=False, indent=2)
-
-                # Replace <knowledge_base> section with actual data
-                if '<knowledge_base>' in prompt and '</knowledge_base>' in prompt:
-                    start_tag = '<knowledge_base>'
-                    end_tag = '</knowledge_base>'
-                    start_idx = prompt.find(start_tag) + len(start_tag)
-                    end_idx = prompt.find(end_tag)
-
-                    # Replace the content between tags with the JSON data
-                    prompt = (
-                        prompt[:start_idx] +
-                        '\n' + kb_json + '\n' +
-                        prompt[end_idx:]
-                    )
+        # While the breaker is open, wait for its probe instead of re-fetching
+        if self.is_stale() and prompt_source_breaker.available():
+            self._schedule_refresh()
+        return snapshot
 
-            # Load few-shot examples and inject into prompt
-            few_shots = self.load_few_shots(force_local=force_local)
-            if few_shots:
-                # Convert few_shots to formatted string
-                fs_json = json.dumps(few_shots, ensure_ascii=False, indent=2)
-
-                # Replace <few_shot_examples> section with actual data
-                if '<few_shot_examples>' in prompt and '</few_shot_examples>' in prompt:
-                    start_tag = '<few_shot_examples>'
-                    end_tag = '</few_shot_examples>'
-                    start_idx = prompt.find(start_tag) + len(start_tag)
-                    end_idx = prompt.find(end_tag)
-
-                    # Replace the content between tags with the JSON data
-                    prompt = (
-                        prompt[:start_idx] +
-                        '\n' + fs_json + '\n' +
-                        prompt[end_idx:]
+    def is_stale(self) -> bool:
+        """Whether the cached entry is older than the configured TTL"""
+        return time.monotonic() - self._loaded_at >= self._settings.prompt_cache_ttl_seconds
+
+    def refresh(self) -> None:
+        """Fetch all prompt sources and re-assemble the prompt if any version changed"""
+        settings = self._settings
+        errors = prompt_source_breaker.errors
+
+        def langfuse_failed() -> bool:
+            return prompt_source_breaker.errors != errors
+
+        try:
+            template, system_version = settings.load_system_prompt_template(force_local=settings.local_dev)
+            if langfuse_failed() and self._keep_last_known_good():
+                return
+            # Once a fetch has failed, don't wait for Langfuse again within this refresh
+            knowledge_base, kb_version = settings.load_knowledge_base_versioned(
+                force_local=settings.local_dev or langfuse_failed()
+            )
+            few_shots, fs_version = settings.load_few_shots_versioned(
+                force_local=settings.local_dev or langfuse_failed()
+            )
+            if langfuse_failed() and self._keep_last_known_good():
+                return
+            versions = (system_version, kb_version, fs_version)
+
+            if self._snapshot is None or versions != self._snapshot.versions:
+                if template:
+                    prompt = assemble_system_prompt(
+                        template, knowledge_base, few_shots, settings.prompt_serialization_format
                     )
+                else:
+                    prompt = DEFAULT_SYSTEM_PROMPT
+                snapshot = PromptSnapshot(
+                    prompt=prompt,
+                    template=template,
+                    knowledge_base=knowledge_base,
+                    few_shots=few_shots,
+                    versions=versions
+                )
+                if not langfuse_failed():
+                    self._save_snapshot(snapshot)
+                self._set_snapshot(snapshot)
+                print(f"🔄 Prompt cache updated (versions: {versions})")
+
+            if langfuse_failed():
+                # Local files only stand in until Langfuse is reachable again
+                self.refresh_errors += 1
+                return
+            self._loaded_at = time.monotonic()
+            self.refreshes += 1
+        except Exception as e:
+            self.refresh_errors += 1
+            print(f"Warning: Could not refresh prompt cache: {e}")
+            if self._snapshot is None:
+                self._set_snapshot(PromptSnapshot(
+                    prompt=DEFAULT_SYSTEM_PROMPT,
+                    template=None,
+                    knowledge_base={},
+                    few_shots={},
+                    versions=("default", "none", "none")
+                ))
+                self._loaded_at = time.monotonic()
+
+    def _keep_last_known_good(self) -> bool:
+        """Keep serving the cached or on-disk snapshot while Langfuse is unavailable"""
+        if self._snapshot is None and not self._restore_snapshot():
+            return False
+        self.refresh_errors += 1
+        return True
+
+    def _snapshot_path(self) -> Optional[Path]:
+        """Path of the on-disk snapshot, or None if prompts don't come from Langfuse"""
+        settings = self._settings
+        if not settings.prompt_snapshot_file or not settings.use_langfuse or settings.local_dev:
+            return None
+        return Path(__file__).parent.parent / settings.prompt_snapshot_file
+
+    def _snapshot_sources(self) -> List[str]:
+        settings = self._settings
+        return [
+            settings.langfuse_base_url,
+            settings.langfuse_system_prompt_name,
+            settings.langfuse_knowledge_base_name,
+            settings.langfuse_few_shots_name,
+        ]
+
+    def _save_snapshot(self, snapshot: PromptSnapshot) -> None:
+        """Write a prompt loaded from Langfuse to the on-disk snapshot"""
+        path = self._snapshot_path()
+        if path is None or not any(version.startswith("langfuse:") for version in snapshot.versions):
+            return
+
+        data = {
+            "sources": self._snapshot_sources(),
+            "prompt": snapshot.prompt,
+            "template": snapshot.template,
+            "knowledge_base": snapshot.knowledge_base,
+            "few_shots": snapshot.few_shots,
+            "versions": list(snapshot.versions),
+            "saved_at": datetime.now().isoformat(timespec="seconds"),
+        }
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+            tmp_path.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError as e:
+            print(f"Warning: Could not write prompt snapshot: {e}")
+
+    def _restore_snapshot(self) -> bool:
+        """
+        Load the last-known-good prompt from the on-disk snapshot
+
+        The restored entry is marked stale, so the next read refreshes it in the background.
+
+        Returns:
+            True if a snapshot for the configured prompts was restored
+        """
+        path = self._snapshot_path()
+        if path is None or not path.exists():
+            return False
+
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("sources") != self._snapshot_sources():
+                return False
+            snapshot = PromptSnapshot(
+                prompt=data["prompt"],
+                template=data["template"],
+                knowledge_base=data["knowledge_base"],
+                few_shots=data["few_shots"],
+                versions=tuple(data["versions"])
+            )
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"Warning: Could not read prompt snapshot: {e}")
+            return False
+
+        self._set_snapshot(snapshot)
+        self._loaded_at = 0.0
+        self.snapshot_restores += 1
+        print(f"📁 Prompt cache restored from snapshot saved at {data.get('saved_at')} (versions: {snapshot.versions})")
+        return True
+
+    def _set_snapshot(self, snapshot: PromptSnapshot) -> None:
+        """Swap in a new snapshot and notify listeners"""
+        self._snapshot = snapshot
+        for callback in self._listeners:
+            try:
+                callback(snapshot)
+            except Exception as e:
+                print(f"Warning: Prompt cache listener failed: {e}")
+
+    def invalidate(self) -> None:
+        """Mark the cached prompt as stale so the next request triggers a background refresh"""
+        self._loaded_at = 0.0
 
-            if '<current_date>' in prompt and '</current_date>' in prompt:
-                current_date = datetime.now().strftime('%Y-%m-%d')
-                start_tag = '<current_date>'
-                end_tag = '</current_date>'
-                start_idx = prompt.find(start_tag) + len(start_tag)
-                end_idx = prompt.find(end_tag)
-
-                prompt = (
-                    prompt[:start_idx] +
-                    '\n' + current_date + '\n' + 
-                    prompt[end_idx:]
+    def _schedule_refresh(self) -> None:
+        """Start a background refresh unless one is already running"""
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        thread = threading.Thread(target=self._background_refresh, name="prompt-cache-refresh", daemon=True)
+        thread.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        finally:
+            with self._lock:
+                self._refreshing = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss/refresh counters and current state of the cache"""
+        return {
+            "enabled": self._settings.prompt_cache_enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "refresh_errors": self.refresh_errors,
+            "snapshot_restores": self.snapshot_restores,
+            "versions": list(self.versions) if self.versions else None,
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._snapshot is not None else None,
+            "ttl_seconds": self._settings.prompt_cache_ttl_seconds,
+            "breaker": prompt_source_breaker.stats(),
+        }
+
+
+class LangfuseClientRegistry:
+    """
+    Process-wide registry of Langfuse clients
+
+    Every Langfuse client owns an HTTP connection pool and background export threads,
+    so one client per (host, public key) is created lazily on first use and shared by
+    the prompt loaders and BedrockService until shutdown() is called.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients: Dict[Tuple[str, str], Tuple["Langfuse", "httpx.Client"]] = {}
+        self._warned_missing_credentials = False
+        self.created = 0
+
+    def get(self, settings: "Settings") -> Optional["Langfuse"]:
+        """
+        Get the shared client for the configured credentials
+
+        Args:
+            settings: Settings with the Langfuse credentials and connection options
+
+        Returns:
+            Langfuse client, or None if credentials are missing or initialization failed
+        """
+        if not settings.langfuse_secret_key or not settings.langfuse_public_key:
+            if not self._warned_missing_credentials:
+                self._warned_missing_credentials = True
+                print("Warning: Langfuse credentials not configured")
+            return None
+
+        key = (settings.langfuse_base_url, settings.langfuse_public_key)
+        entry = self._clients.get(key)
+        if entry is not None:
+            return entry[0]
+
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None:
+                return entry[0]
+
+            import httpx
+            langfuse_class = _import_langfuse()
+
+            http_client = httpx.Client(
+                timeout=settings.langfuse_timeout_seconds,
+                limits=httpx.Limits(
+                    max_connections=settings.langfuse_max_connections,
+                    max_keepalive_connections=settings.langfuse_max_connections
+                )
+            )
+            try:
+                client = langfuse_class(
+                    secret_key=settings.langfuse_secret_key,
+                    public_key=settings.langfuse_public_key,
+                    host=settings.langfuse_base_url,
+                    timeout=settings.langfuse_timeout_seconds,
+                    httpx_client=http_client
                 )
+            except Exception as e:
+                http_client.close()
+                print(f"Warning: Could not initialize Langfuse client: {e}")
+                return None
 
-            return prompt
+            self._clients[key] = (client, http_client)
+            self.created += 1
+            return client
 
-        except Exception as e:
-            # Fallback to default on error
-            print(f"Warning: Could not load system prompt: {e}")
-            return "You are a helpful AI assistant powered by AWS Bedrock. Provide clear, accurate, and concise responses to user queries."
+    def shutdown(self) -> None:
+        """Flush pending events, stop background threads and close the connection pools"""
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
 
+        for client, http_client in entries:
+            try:
+                client.shutdown()
+            except Exception as e:
+                print(f"Warning: Could not shut down Langfuse client: {e}")
+            finally:
+                http_client.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Number of live and ever-created clients"""
+        return {"active": len(self._clients), "created": self.created}
+
+
+# Create global Langfuse client registry
+langfuse_clients = LangfuseClientRegistry()
 
 # Create global settings instance
 settings = Settings()
+
+# Create global circuit breaker for Langfuse prompt fetches
+prompt_source_breaker = PromptSourceBreaker(settings)
+
+# Create global prompt cache
+prompt_cache = PromptCache(settings)
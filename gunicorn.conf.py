@@ -0,0 +1,133 @@
+"""
+Gunicorn configuration for production: multiple uvicorn workers per container
+
+Usage:
+    gunicorn app.main:app -c gunicorn.conf.py
+
+Every setting can be overridden from the environment (see .env.example). Workers
+are not preloaded: boto3, Langfuse and the executor threads are created per
+worker after the fork. Each worker loads the prompt cache before it accepts
+requests. When a worker sees a new prompt version, it asks the master for a
+graceful reload, so all workers switch to the new prompt, response cache and
+few-shot index together. Several workers need the shared SQLite session store,
+which is used unless SESSION_BACKEND says otherwise.
+"""
+
+import os
+import fcntl
+import signal
+import tempfile
+import multiprocessing
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and the cgroup (container) CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = multiprocessing.cpu_count()
+
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()
+        if quota != "max":
+            cpus = min(cpus, max(1, int(int(quota) / int(period))))
+    except (OSError, ValueError):
+        pass
+    return cpus
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+def _session_backend():
+    """SESSION_BACKEND as the workers will see it (environment first, then .env), or None if unset"""
+    from dotenv import dotenv_values
+
+    backend = os.getenv("SESSION_BACKEND") or dotenv_values(".env").get("SESSION_BACKEND")
+    return backend.lower() if backend else None
+
+
+# Server socket
+bind = os.getenv("GUNICORN_BIND", f"0.0.0.0:{os.getenv('PORT', '8000')}")
+backlog = _env_int("GUNICORN_BACKLOG", 2048)
+
+# Workers: async workers are I/O bound, one per CPU keeps every core busy
+workers = _env_int("WEB_CONCURRENCY", available_cpus())
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Keep idle connections open longer than the ALB idle timeout (60s) so the
+# load balancer, not the worker, closes them
+keepalive = _env_int("GUNICORN_KEEPALIVE", 75)
+timeout = _env_int("GUNICORN_TIMEOUT", 60)  # Worker heartbeat, not request duration
+graceful_timeout = _env_int("GUNICORN_GRACEFUL_TIMEOUT", 120)  # Lets running streams finish on reload/shutdown
+
+# Optional periodic recycling (0 = never)
+max_requests = _env_int("GUNICORN_MAX_REQUESTS", 0)
+max_requests_jitter = _env_int("GUNICORN_MAX_REQUESTS_JITTER", 0)
+
+accesslog = os.getenv("GUNICORN_ACCESS_LOG") or None
+errorlog = "-"
+loglevel = os.getenv("LOG_LEVEL", "info").lower()
+
+# Reload all workers when any of them sees a new prompt version
+reload_on_prompt_change = os.getenv("GUNICORN_RELOAD_ON_PROMPT_CHANGE", "true").lower() == "true"
+
+# Shared by the workers of this master to request one reload per prompt version
+_reload_marker = os.path.join(tempfile.gettempdir(), f"moch-qna-bot-{os.getpid()}.prompt-versions")
+
+
+def _request_reload(versions) -> None:
+    """Ask the master for a graceful reload, once per version triple across all workers"""
+    key = "|".join(versions)
+    with open(_reload_marker, "a+") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        f.seek(0)
+        if f.read() == key:
+            return  # Another worker already requested the reload for this version
+        f.seek(0)
+        f.truncate()
+        f.write(key)
+    os.kill(os.getppid(), signal.SIGHUP)
+
+
+def on_starting(server):
+    """Share sessions between workers: each worker has its own in-memory session store"""
+    if server.cfg.workers <= 1:
+        return
+    backend = _session_backend()
+    if backend is None:
+        os.environ["SESSION_BACKEND"] = "sqlite"
+        server.log.info(f"Using the SQLite session store shared by {server.cfg.workers} workers")
+    elif backend == "memory":
+        raise RuntimeError(
+            f"SESSION_BACKEND=memory with {server.cfg.workers} workers: conversations would only be "
+            "known to the worker that created them. Use SESSION_BACKEND=sqlite or WEB_CONCURRENCY=1."
+        )
+
+
+def post_worker_init(worker):
+    """Warm the prompt cache and watch for prompt version changes in each worker"""
+    from config.settings import prompt_cache
+
+    if reload_on_prompt_change:
+        loaded = {}
+
+        def on_prompt_change(snapshot):
+            if "versions" in loaded and snapshot.versions != loaded["versions"]:
+                worker.log.info(f"Prompt versions changed to {snapshot.versions}, reloading workers")
+                _request_reload(snapshot.versions)
+            loaded.setdefault("versions", snapshot.versions)
+
+        prompt_cache.add_listener(on_prompt_change)
+
+    prompt_cache.get()
+    worker.log.info(f"Worker {worker.pid} ready (prompt versions: {prompt_cache.versions})")
+
+
+def on_exit(server):
+    try:
+        os.remove(_reload_marker)
+    except OSError:
+        pass
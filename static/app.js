@@ -2,9 +2,11 @@
 const API_BASE_URL = window.location.origin;
 const API_ENDPOINT = `${API_BASE_URL}/api/v1/chat`;
 const API_STREAM_ENDPOINT = `${API_BASE_URL}/api/v1/chat/stream`;
+const API_SESSIONS_ENDPOINT = `${API_BASE_URL}/api/v1/sessions`;
 
 // State
 let conversationHistory = [];
+let conversationId = null;  // Server-side session; the history is kept by the server
 let messageCount = 0;
 
 // DOM Elements
@@ -55,23 +57,66 @@ chatForm.addEventListener('submit', async (e) => {
     }
 });
 
-// Send Message to API
-async function sendMessage(message) {
-    const requestBody = {
-        message: message,
-        conversation_history: conversationHistory,
-        temperature: 0.3,
-        max_tokens: 2048
-    };
-
-    const response = await fetch(API_ENDPOINT, {
+// Create a server-side session, seeding it with the locally kept history
+async function createSession(history) {
+    const response = await fetch(API_SESSIONS_ENDPOINT, { method: 'POST' });
+    if (!response.ok) {
+        throw new Error('Could not create session');
+    }
+    const session = await response.json();
+
+    if (history.length > 0) {
+        const seeded = await fetch(`${API_SESSIONS_ENDPOINT}/${session.conversation_id}/messages`, {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+            },
+            body: JSON.stringify({ messages: history })
+        });
+        if (!seeded.ok) {
+            throw new Error('Could not restore session history');
+        }
+    }
+
+    conversationId = session.conversation_id;
+    localStorage.setItem('conversation_id', conversationId);
+    return conversationId;
+}
+
+// Post a chat request carrying only the new message, recreating the session once if it expired
+async function postChat(endpoint, message) {
+    // The current user message is already the last entry of the local history
+    const previousHistory = () => conversationHistory.slice(0, -1);
+
+    if (!conversationId) {
+        await createSession(previousHistory());
+    }
+
+    const send = () => fetch(endpoint, {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
-        body: JSON.stringify(requestBody)
+        body: JSON.stringify({
+            message: message,
+            conversation_id: conversationId,
+            temperature: 0.3,
+            max_tokens: 2048
+        })
     });
 
+    let response = await send();
+    if (response.status === 404) {
+        await createSession(previousHistory());
+        response = await send();
+    }
+    return response;
+}
+
+// Send Message to API
+async function sendMessage(message) {
+    const response = await postChat(API_ENDPOINT, message);
+
     if (!response.ok) {
         const errorData = await response.json().catch(() => ({}));
         throw new Error(errorData.detail || 'Network response was not ok');
@@ -85,20 +130,7 @@ async function sendMessage(message) {
 
 // Send Message to API with Streaming
 async function sendMessageStream(message) {
-    const requestBody = {
-        message: message,
-        conversation_history: conversationHistory,
-        temperature: 0.3,
-        max_tokens: 2048
-    };
-
-    const response = await fetch(API_STREAM_ENDPOINT, {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-        },
-        body: JSON.stringify(requestBody)
-    });
+    const response = await postChat(API_STREAM_ENDPOINT, message);
 
     if (!response.ok) {
         const errorData = await response.json().catch(() => ({}));
@@ -334,8 +366,13 @@ function clearConversation() {
         updateMessageCount();
         updateStatus('השיחה נוקתה');
 
-        // Clear storage
+        // Clear storage and the server-side session
         localStorage.removeItem('conversation_history');
+        localStorage.removeItem('conversation_id');
+        if (conversationId) {
+            fetch(`${API_SESSIONS_ENDPOINT}/${conversationId}`, { method: 'DELETE' }).catch(() => {});
+            conversationId = null;
+        }
 
         // Reset after 2 seconds
         setTimeout(() => {
@@ -356,6 +393,7 @@ function saveConversationToStorage() {
 // Load from localStorage
 function loadConversationFromStorage() {
     try {
+        conversationId = localStorage.getItem('conversation_id');
         const saved = localStorage.getItem('conversation_history');
         if (saved) {
             conversationHistory = JSON.parse(saved);
@@ -95,6 +95,7 @@ resource "aws_ecs_task_definition" "app" {
         }
       }
 
+      # Liveness only; the ALB target group checks readiness (var.health_check_path)
       healthCheck = {
         command     = ["CMD-SHELL", "curl -f http://localhost:${var.container_port}/health || exit 1"]
         interval    = 30
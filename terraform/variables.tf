@@ -41,9 +41,9 @@ variable "desired_count" {
 }
 
 variable "health_check_path" {
-  description = "Health check endpoint path"
+  description = "ALB health check endpoint path (/ready returns 503 until startup warm-up has finished)"
   type        = string
-  default     = "/health"
+  default     = "/ready"
 }
 
 variable "aws_access_key_id" {
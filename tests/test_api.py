@@ -31,3 +31,28 @@ def test_list_models():
 
 # Note: Chat endpoint test requires AWS credentials and mocking
 # Add more comprehensive tests with mocked Bedrock client as needed
+
+
+def test_metrics_endpoint():
+    """Metrics are exposed in the Prometheus text format"""
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE chatbot_requests_total counter" in response.text
+    assert "# TYPE chatbot_stage_duration_seconds histogram" in response.text
+
+
+def test_ready_reports_startup_state(monkeypatch):
+    """Readiness is 503 until warm-up has finished, then 200 with the stage timings"""
+    from app.main import startup
+
+    monkeypatch.setattr(startup, "ready", False)
+    monkeypatch.setattr(startup, "finished", False)
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["status"] == "starting"
+
+    monkeypatch.setattr(startup, "ready", True)
+    response = client.get("/ready")
+    assert response.status_code == 200
+    assert "stages_ms" in response.json()
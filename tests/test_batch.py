@@ -0,0 +1,95 @@
+"""Tests for the batch chat endpoint and CLI helpers"""
+
+import json
+import asyncio
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import routes
+from app.services.batch import run_batch
+from app.utils.batch_chat import load_completed_ids, load_items
+
+client = TestClient(app)
+
+
+def collect(handler, lines, concurrency):
+    async def gather():
+        return [record async for record in run_batch(handler, lines, concurrency)]
+    return asyncio.run(gather())
+
+
+def test_run_batch_bounds_concurrency_and_streams_in_completion_order():
+    """At most `concurrency` requests run at once and fast requests are not held back by slow ones"""
+    state = {"active": 0, "peak": 0}
+
+    async def handler(request):
+        state["active"] += 1
+        state["peak"] = max(state["peak"], state["active"])
+        await asyncio.sleep(0.1 if request.message == "slow" else 0.01)
+        state["active"] -= 1
+        return request.message.upper(), {"usage": {"input_tokens": 10, "output_tokens": 5}}
+
+    lines = [json.dumps({"id": "a", "message": "slow"})] + [json.dumps({"message": f"q{i}"}) for i in range(5)]
+    records = collect(handler, lines, concurrency=2)
+
+    assert state["peak"] == 2
+    assert records[-2]["id"] == "a"
+    assert records[0]["response"] == "Q0"
+    summary = records[-1]["summary"]
+    assert summary["succeeded"] == 6
+    assert summary["output_tokens"] == 30
+
+
+def test_run_batch_reports_invalid_lines_and_failures():
+    """Bad lines and handler errors become error records without stopping the batch"""
+    async def handler(request):
+        if request.message == "boom":
+            raise RuntimeError("failed")
+        return "ok", {}
+
+    records = collect(handler, ["not json", "", json.dumps({"message": "boom"}), json.dumps({"message": "fine"})], 4)
+
+    errors = {record["index"]: record["error"] for record in records if "error" in record}
+    assert errors[0].startswith("Invalid JSON")
+    assert errors[1] == "failed"
+    assert records[-1]["summary"]["failed"] == 2
+    assert records[-1]["summary"]["succeeded"] == 1
+
+
+def test_batch_endpoint_streams_ndjson(monkeypatch):
+    """The endpoint accepts JSONL and returns one NDJSON record per line plus a summary"""
+    async def fake_generate(**kwargs):
+        return f"answer to {kwargs['message']}", {}
+
+    monkeypatch.setattr(routes.bedrock_service, "generate_response_with_metadata", fake_generate)
+
+    body = "\n".join(json.dumps({"id": str(i), "message": f"שאלה {i}"}) for i in range(3))
+    response = client.post("/api/v1/chat/batch?concurrency=2", content=body.encode("utf-8"),
+                           headers={"Content-Type": "application/x-ndjson"})
+
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(record["id"] for record in records[:-1]) == ["0", "1", "2"]
+    assert records[-1]["summary"]["requests"] == 3
+
+
+def test_cli_resumes_from_completed_ids(tmp_path):
+    """Items with a successful result in the output file are skipped on the next run"""
+    questions = tmp_path / "questions.jsonl"
+    questions.write_text("\n".join([
+        json.dumps({"request_id": "r1", "body": "שאלה 1"}),
+        json.dumps({"request_id": "r2", "body": "שאלה 2", "temperature": 0.1}),
+        json.dumps({"body": "שאלה 3"}),
+    ]), encoding="utf-8")
+    results = tmp_path / "results.jsonl"
+    results.write_text(
+        json.dumps({"id": "r1", "response": "ok"}) + "\n" +
+        json.dumps({"id": "r2", "error": "failed"}) + "\n" +
+        '{"id": "line-3", "resp', encoding="utf-8"
+    )
+
+    items = load_items(questions, message_field="body", id_field="request_id")
+    completed = load_completed_ids(results)
+
+    assert completed == {"r1"}
+    assert items[1] == {"id": "r2", "message": "שאלה 2", "temperature": 0.1}
+    assert items[2]["id"] == "line-3"
@@ -0,0 +1,219 @@
+"""Tests for BedrockService using a local stand-in for the bedrock-runtime client"""
+
+import io
+import json
+import time
+import asyncio
+import pytest
+from app.services.bedrock_service import BedrockService, BedrockCapacityError
+from app.services.model_router import ModelRouter
+from app.services.response_cache import ResponseCache
+from app.services.history import HistoryManager
+from config.settings import settings, prompt_cache
+
+
+class FakeEventStream:
+    """Iterable stand-in for a botocore EventStream emitting Anthropic stream events"""
+
+    def __init__(self, chunks, chunk_delay):
+        self.chunks = chunks
+        self.chunk_delay = chunk_delay
+        self.closed = False
+
+    def __iter__(self):
+        events = [{"type": "message_start", "message": {"usage": {"input_tokens": 10}}}]
+        events += [{"type": "content_block_delta", "delta": {"type": "text_delta", "text": c}} for c in self.chunks]
+        events += [{"type": "message_delta", "delta": {"usage": {"output_tokens": len(self.chunks)}}}]
+        for event in events:
+            if self.closed:
+                return
+            time.sleep(self.chunk_delay)
+            yield {"chunk": {"bytes": json.dumps(event).encode("utf-8")}}
+
+    def close(self):
+        self.closed = True
+
+
+class FakeBedrockClient:
+    """Minimal bedrock-runtime stand-in with a fixed invocation latency"""
+
+    def __init__(self, latency=0.2, text="<response>שלום</response>", chunks=None, chunk_delay=0.0):
+        self.latency = latency
+        self.text = text
+        self.chunks = chunks or ["של", "ום"]
+        self.chunk_delay = chunk_delay
+        self.calls = []
+        self.streams = []
+
+    def invoke_model(self, modelId, body):
+        self.calls.append(json.loads(body))
+        time.sleep(self.latency)
+        payload = {
+            "content": [{"type": "text", "text": self.text}],
+            "usage": {"input_tokens": 10, "output_tokens": 5},
+        }
+        return {"body": io.BytesIO(json.dumps(payload).encode("utf-8"))}
+
+    def invoke_model_with_response_stream(self, modelId, body):
+        self.calls.append(json.loads(body))
+        stream = FakeEventStream(self.chunks, self.chunk_delay)
+        self.streams.append(stream)
+        return {"body": stream}
+
+
+def make_service(client, routing=False):
+    """Create a service that talks to the given fake client without Langfuse (and by default on a single model)"""
+    service = BedrockService()
+    service.client = client
+    service.langfuse = None
+    service.telemetry = None
+    if not routing:
+        service.model_router = ModelRouter(settings.default_model_id, settings.default_model_id, enabled=False)
+    return service
+
+
+def test_generate_response_extracts_response_tag():
+    """The text inside <response> tags is returned"""
+    service = make_service(FakeBedrockClient(latency=0))
+    result = asyncio.run(service.generate_response("שאלה", system_prompt="system"))
+    assert result == "שלום"
+
+
+def test_concurrent_requests_do_not_block_event_loop():
+    """In-flight invocations overlap instead of running one at a time"""
+    service = make_service(FakeBedrockClient(latency=0.2))
+
+    async def run():
+        start = time.perf_counter()
+        await asyncio.gather(*[
+            service.generate_response(f"שאלה {i}", system_prompt="system") for i in range(8)
+        ])
+        return time.perf_counter() - start
+
+    assert asyncio.run(run()) < 0.2 * 8 / 2
+
+
+def test_model_concurrency_limit_rejects_when_saturated(monkeypatch):
+    """Requests beyond the per-model limit wait and are rejected after the queue timeout"""
+    monkeypatch.setattr(settings, "bedrock_model_concurrency", 1)
+    monkeypatch.setattr(settings, "bedrock_queue_timeout_seconds", 0.05)
+    service = make_service(FakeBedrockClient(latency=0.3))
+
+    async def run():
+        return await asyncio.gather(
+            service.generate_response("א", system_prompt="system"),
+            service.generate_response("ב", system_prompt="system"),
+            return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+    assert any(isinstance(r, BedrockCapacityError) for r in results)
+    assert service.stats()["models"][settings.default_model_id]["rejected"] == 1
+
+
+def test_astream_yields_chunks_in_order():
+    """The async stream yields every text delta as it arrives"""
+    service = make_service(FakeBedrockClient(chunks=["א", "ב", "ג"]))
+
+    async def run():
+        return [chunk async for chunk in service.generate_response_astream("שאלה", system_prompt="system")]
+
+    assert asyncio.run(run()) == ["א", "ב", "ג"]
+    assert service.stats()["streams"]["completed"] == 1
+
+
+def test_astream_close_cancels_upstream():
+    """Closing the generator early closes the Bedrock event stream and frees the slot"""
+    client = FakeBedrockClient(chunks=["x"] * 100, chunk_delay=0.01)
+    service = make_service(client)
+
+    async def run():
+        stream = service.generate_response_astream("שאלה", system_prompt="system")
+        first = await stream.__anext__()
+        await stream.aclose()
+        return first
+
+    assert asyncio.run(run()) == "x"
+    assert client.streams[0].closed
+    stats = service.stats()
+    assert stats["streams"]["active"] == 0
+    assert stats["streams"]["cancelled"] == 1
+    assert stats["models"][settings.default_model_id]["in_flight"] == 0
+
+
+def test_long_streams_do_not_block_invocations(monkeypatch):
+    """Stream readers run on their own pool, so invocations get an executor thread while streams are open"""
+    monkeypatch.setattr(settings, "bedrock_executor_workers", 1)
+    service = make_service(FakeBedrockClient(latency=0, chunks=["x"] * 50, chunk_delay=0.02))
+
+    async def run():
+        stream = service.generate_response_astream("שאלה", system_prompt="system")
+        await stream.__anext__()
+        start = time.perf_counter()
+        await service.generate_response("שאלה אחרת", system_prompt="system")
+        elapsed = time.perf_counter() - start
+        await stream.aclose()
+        return elapsed
+
+    assert asyncio.run(run()) < 0.5
+
+
+def test_prompt_caching_marks_static_system_prefix(monkeypatch):
+    """Models with prompt caching get the full static prompt as a cache point and the date after it"""
+    overrides = []
+
+    def get_blocks(**kwargs):
+        overrides.append(kwargs)
+        return "static prompt", "<current_date>\n2026-01-01\n</current_date>"
+
+    monkeypatch.setattr(prompt_cache, "get_blocks", get_blocks)
+    client = FakeBedrockClient(latency=0)
+    service = make_service(client)
+    assert service.prompt_selector.enabled
+
+    asyncio.run(service.generate_response("שאלה", model_id="anthropic.claude-3-5-haiku-20241022-v1:0"))
+
+    # Per-request subsets would move the knowledge base and few-shots out of the cached prefix
+    assert overrides == [{}]
+
+    system = client.calls[0]["system"]
+    assert system[0] == {"type": "text", "text": "static prompt", "cache_control": {"type": "ephemeral"}}
+    assert system[1]["text"].startswith("<current_date>")
+    assert "cache_control" not in system[1]
+
+
+def test_usage_details_include_prompt_cache_tokens():
+    """Cache read/write token counts from the response usage are preserved"""
+    usage = BedrockService._usage_details({
+        "input_tokens": 12,
+        "output_tokens": 34,
+        "cache_read_input_tokens": 5000,
+        "cache_creation_input_tokens": 0,
+    })
+    assert usage["cache_read_input_tokens"] == 5000
+    assert "5000 cache read" in BedrockService._format_usage(usage)
+
+
+def test_trimmed_conversation_is_not_cached():
+    """A long conversation trimmed to one summarized message neither reads nor fills the shared response cache"""
+    prompt_cache.get()
+    assert prompt_cache.versions
+    service = make_service(FakeBedrockClient(latency=0))
+    service.response_cache = ResponseCache()
+    service.history_manager = HistoryManager(max_tokens=800, strategy="summarize", summary_max_tokens=200)
+    question = "ומה לגבי מחיר למשתכן?"
+    history = []
+    for i in range(10):
+        history.append({"role": "user", "content": f"שמי ישראל ישראלי, תעודת זהות {i}. שאלה על זכאות " * 5})
+        history.append({"role": "assistant", "content": "תשובה מפורטת על התנאים " * 200})
+
+    async def run():
+        _, trimmed = await service.generate_response_with_metadata(question, history, temperature=0.0)
+        _, first = await service.generate_response_with_metadata(question, temperature=0.0)
+        _, repeated = await service.generate_response_with_metadata(question, temperature=0.0)
+        return trimmed, first, repeated
+
+    trimmed, first, repeated = asyncio.run(run())
+    assert trimmed["history"]["summarized"]
+    assert "response_cache" not in first
+    assert repeated.get("response_cache") == "hit"
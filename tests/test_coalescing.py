@@ -0,0 +1,103 @@
+"""Tests for single-flight coalescing of identical in-flight requests"""
+
+import asyncio
+from app.services.coalescing import RequestCoalescer, coalescing_key
+from tests.test_bedrock_service import FakeBedrockClient, make_service
+
+VERSIONS = ("sys-1", "kb-1", "fs-1")
+
+
+def test_coalescing_key_scope():
+    """Normalized duplicates share a key; history, prompt and parameters separate keys"""
+    first = [{"role": "user", "content": "מה הזכאות?"}]
+    key = coalescing_key("מה הזכאות?", first, None, VERSIONS, None, 0.3, 2048)
+
+    assert coalescing_key("מָה הַזַּכָּאוּת", [{"role": "user", "content": "מָה הַזַּכָּאוּת"}], None, VERSIONS, None, 0.3, 2048) == key
+    later = [{"role": "user", "content": "שלום"}, {"role": "assistant", "content": "היי"}] + first
+    assert coalescing_key("מה הזכאות?", later, None, VERSIONS, None, 0.3, 2048) != key
+    assert coalescing_key("מה הזכאות?", first, "custom", VERSIONS, None, 0.3, 2048) != key
+    assert coalescing_key("מה הזכאות?", first, None, ("sys-2", "kb-1", "fs-1"), None, 0.3, 2048) != key
+    assert coalescing_key("מה הזכאות?", first, None, VERSIONS, None, 0.7, 2048) != key
+    assert coalescing_key("?!", [{"role": "user", "content": "?!"}], None, VERSIONS, None, 0.3, 2048) is None
+
+
+def test_concurrent_identical_requests_share_one_invocation():
+    """Identical requests in flight together cause one Bedrock call; later ones invoke again"""
+    client = FakeBedrockClient(latency=0.1)
+    service = make_service(client)
+
+    async def run():
+        results = await asyncio.gather(*[
+            service.generate_response_with_metadata("שאלה", system_prompt="system") for _ in range(5)
+        ])
+        await service.generate_response("שאלה", system_prompt="system")
+        return results
+
+    results = asyncio.run(run())
+    assert [text for text, _ in results] == ["שלום"] * 5
+    assert sum(1 for _, metadata in results if metadata.get("coalesced")) == 4
+    assert len(client.calls) == 2
+
+    stats = service.stats()["coalescing"]
+    assert (stats["calls"], stats["coalesced_calls"], stats["in_flight_calls"]) == (2, 4, 0)
+
+
+def test_errors_are_shared_with_coalesced_requests():
+    """A failing invocation fails every request that joined it"""
+    coalescer = RequestCoalescer()
+    calls = []
+
+    async def fail():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    async def run():
+        return await asyncio.gather(*[coalescer.run("key", fail) for _ in range(3)], return_exceptions=True)
+
+    results = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(calls) == 1
+
+
+def test_stream_fans_out_to_late_subscribers():
+    """Subscribers joining mid-stream get every chunk from the start over one upstream stream"""
+    client = FakeBedrockClient(chunks=["א", "ב", "ג", "ד"], chunk_delay=0.02)
+    service = make_service(client)
+
+    async def consume(delay):
+        await asyncio.sleep(delay)
+        return [chunk async for chunk in service.generate_response_astream("שאלה", system_prompt="system")]
+
+    async def run():
+        return await asyncio.gather(consume(0), consume(0.03), consume(0.05))
+
+    assert asyncio.run(run()) == [["א", "ב", "ג", "ד"]] * 3
+    assert len(client.streams) == 1
+    stats = service.stats()
+    assert stats["coalescing"]["coalesced_streams"] == 2
+    assert stats["streams"]["completed"] == 1
+
+
+def test_stream_is_cancelled_when_last_subscriber_leaves():
+    """One subscriber leaving keeps the stream going; the last one leaving cancels it"""
+    client = FakeBedrockClient(chunks=["x"] * 100, chunk_delay=0.01)
+    service = make_service(client)
+
+    async def run():
+        first = service.generate_response_astream("שאלה", system_prompt="system")
+        second = service.generate_response_astream("שאלה", system_prompt="system")
+        await first.__anext__()
+        await second.__anext__()
+        await first.aclose()
+        await second.__anext__()
+        assert not client.streams[0].closed
+        await second.aclose()
+
+    asyncio.run(run())
+    assert len(client.streams) == 1
+    assert client.streams[0].closed
+    stats = service.stats()
+    assert stats["streams"]["active"] == 0
+    assert stats["streams"]["cancelled"] == 1
+    assert stats["coalescing"]["in_flight_streams"] == 0
@@ -0,0 +1,124 @@
+"""Tests for the benchmark stand-ins, driven through the real boto3 client"""
+
+import asyncio
+import httpx
+import pytest
+from urllib.parse import urlparse
+from benchmarks.fake_bedrock import FakeBedrockConfig, start_fake_bedrock
+from benchmarks.fake_langfuse import start_fake_langfuse
+from app.services.bedrock_service import BedrockService, BedrockCapacityError
+from app.services.model_router import ModelRouter
+from app.utils.metrics import BEDROCK_POOL_OVERFLOW, BEDROCK_POOL_SIZE
+from config.settings import settings
+
+
+@pytest.fixture
+def fake_bedrock(monkeypatch):
+    server = start_fake_bedrock(FakeBedrockConfig(latency=0, tokens_per_second=0, output_tokens=12, chunk_tokens=5))
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "test")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "test")
+    monkeypatch.setattr(settings, "bedrock_endpoint_url", server.url)
+    yield server
+    server.shutdown()
+
+
+def make_service():
+    service = BedrockService()
+    service.langfuse = None
+    service.telemetry = None
+    service.model_router = ModelRouter(settings.default_model_id, settings.default_model_id, enabled=False)
+    return service
+
+
+def test_invoke_and_event_stream_round_trip(fake_bedrock):
+    """boto3 parses the stand-in's InvokeModel responses and event stream chunks"""
+    service = make_service()
+
+    async def run():
+        response, metadata = await service.generate_response_with_metadata("שאלה", system_prompt="system")
+        chunks = [chunk async for chunk in service.generate_response_astream("שאלה אחרת", system_prompt="system")]
+        return response, metadata, chunks
+
+    response, metadata, chunks = asyncio.run(run())
+    assert response == ("מילה " * 12).strip()
+    assert metadata["usage"]["output_tokens"] == 12
+    assert len(chunks) == 3
+    assert "".join(chunks) == "מילה " * 12
+    assert (fake_bedrock.counters["invocations"], fake_bedrock.counters["streams"]) == (1, 1)
+
+
+def test_warm_up_connection_and_models(fake_bedrock):
+    """The connection warm-up is rejected before invoking a model; the warm-up invocation reaches each routed model"""
+    service = make_service()
+    service.warm_up_connection()
+    assert fake_bedrock.counters["invocations"] == 0
+
+    service.model_router = ModelRouter("fast-model", "anthropic.strong-model", enabled=True)
+    assert asyncio.run(service.warm_up_models()) == ["anthropic.strong-model", "fast-model"]
+    assert fake_bedrock.counters["invocations"] == 2
+
+
+def test_connection_pool_utilization_is_reported(fake_bedrock, monkeypatch):
+    """Calls beyond the pool size are counted as overflow; pool size and idle connections are exported"""
+    monkeypatch.setattr(settings, "bedrock_executor_workers", 4)
+    monkeypatch.setattr(settings, "bedrock_max_pool_connections", 1)
+    fake_bedrock.config.latency = 0.2
+    service = make_service()
+    host = urlparse(fake_bedrock.url).hostname
+    overflow = BEDROCK_POOL_OVERFLOW.value(host)
+
+    async def run():
+        await asyncio.gather(*(
+            service.generate_response(f"שאלה {i}", system_prompt="system", model_id=f"model-{i}") for i in range(4)
+        ))
+
+    asyncio.run(run())
+
+    [pool] = service.stats()["connection_pools"]
+    assert (pool["host"], pool["size"], pool["in_use"], pool["idle"]) == (host, 1, 0, 1)
+    assert pool["connections_opened"] == 4
+    assert BEDROCK_POOL_OVERFLOW.value(host) - overflow == 3
+
+    service.export_gauges()
+    assert BEDROCK_POOL_SIZE.value(host) == 1
+
+
+def test_throttling_is_reported_as_bedrock_throttling(fake_bedrock, monkeypatch):
+    """Throttled stand-in responses surface as ThrottlingException and are shed after retries"""
+    monkeypatch.setattr(settings, "bedrock_max_retries", 1)
+    monkeypatch.setattr(settings, "bedrock_backoff_base_seconds", 0.01)
+    fake_bedrock.config.throttle_rate = 1.0
+    service = make_service()
+
+    with pytest.raises(BedrockCapacityError):
+        asyncio.run(service.generate_response("שאלה", system_prompt="system"))
+    assert fake_bedrock.counters["throttled"] == 2
+
+
+def test_transient_errors_are_retried_by_botocore(fake_bedrock, monkeypatch):
+    """Server errors are retried up to bedrock_max_attempts; throttling is not retried by botocore"""
+    monkeypatch.setattr(settings, "bedrock_max_attempts", 3)
+    monkeypatch.setattr(settings, "bedrock_max_retries", 0)
+    fake_bedrock.config.error_rate = 1.0
+    service = make_service()
+
+    with pytest.raises(Exception, match="InternalServerException"):
+        asyncio.run(service.generate_response("שאלה", system_prompt="system"))
+    assert fake_bedrock.counters["errors"] == 3
+
+    fake_bedrock.config.error_rate = 0.0
+    fake_bedrock.config.throttle_rate = 1.0
+    with pytest.raises(BedrockCapacityError):
+        asyncio.run(service.generate_response("שאלה", system_prompt="system"))
+    assert fake_bedrock.counters["throttled"] == 1
+
+
+def test_fake_langfuse_serves_prompts():
+    """Prompts are served in the Langfuse prompt API format"""
+    server = start_fake_langfuse(prompts={"moch-system-prompt": "prompt text"})
+    try:
+        response = httpx.get(f"{server.url}/api/public/v2/prompts/moch-system-prompt")
+        assert response.json()["prompt"] == "prompt text"
+        assert httpx.get(f"{server.url}/api/public/v2/prompts/missing").status_code == 404
+    finally:
+        server.shutdown()
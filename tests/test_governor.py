@@ -0,0 +1,138 @@
+"""Tests for Bedrock throttling retries, adaptive concurrency and load shedding"""
+
+import asyncio
+import pytest
+from botocore.exceptions import ClientError
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import routes
+from app.services.governor import BedrockGovernor, BedrockCapacityError, ModelGovernor, TokenBucket
+from config.settings import settings
+from tests.test_bedrock_service import FakeBedrockClient, make_service
+
+
+def throttling_error():
+    return ClientError({"Error": {"Code": "ThrottlingException", "Message": "Rate exceeded"}}, "InvokeModel")
+
+
+class ThrottlingClient(FakeBedrockClient):
+    """Fake client that throttles the first `throttles` invocations"""
+
+    def __init__(self, throttles, **kwargs):
+        super().__init__(latency=0, **kwargs)
+        self.throttles = throttles
+        self.attempts = 0
+
+    def invoke_model(self, modelId, body):
+        self.attempts += 1
+        if self.attempts <= self.throttles:
+            raise throttling_error()
+        return super().invoke_model(modelId, body)
+
+    def invoke_model_with_response_stream(self, modelId, body):
+        self.attempts += 1
+        if self.attempts <= self.throttles:
+            raise throttling_error()
+        return super().invoke_model_with_response_stream(modelId, body)
+
+
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "bedrock_backoff_base_seconds", 0.001)
+    monkeypatch.setattr(settings, "bedrock_backoff_max_seconds", 0.01)
+
+
+def test_throttled_calls_are_retried_and_shrink_the_limit(monkeypatch):
+    """A throttled invocation is retried with backoff and the model's limit is halved"""
+    fast_backoff(monkeypatch)
+    monkeypatch.setattr(settings, "bedrock_model_concurrency", 8)
+    client = ThrottlingClient(throttles=2)
+    service = make_service(client)
+
+    assert asyncio.run(service.generate_response("שאלה", system_prompt="system")) == "שלום"
+
+    stats = service.stats()["models"][settings.default_model_id]
+    assert client.attempts == 3
+    assert stats["throttles"] == 2
+    assert stats["retries"] == 2
+    assert stats["limit"] == 2
+    assert stats["in_flight"] == 0
+
+
+def test_stream_open_is_retried_on_throttling(monkeypatch):
+    """Streaming requests retry a throttled start before any chunk is sent"""
+    fast_backoff(monkeypatch)
+    client = ThrottlingClient(throttles=1, chunks=["א", "ב"])
+    service = make_service(client)
+
+    async def run():
+        return [chunk async for chunk in service.generate_response_astream("שאלה", system_prompt="system")]
+
+    assert asyncio.run(run()) == ["א", "ב"]
+    assert service.stats()["models"][settings.default_model_id]["in_flight"] == 0
+
+
+def test_persistent_throttling_is_shed_with_429(monkeypatch):
+    """When retries are exhausted the API answers 429 with a Retry-After header"""
+    fast_backoff(monkeypatch)
+    monkeypatch.setattr(settings, "bedrock_max_retries", 2)
+    service = make_service(ThrottlingClient(throttles=100))
+    monkeypatch.setattr(routes, "bedrock_service", service)
+
+    response = TestClient(app).post("/api/v1/chat", json={"message": "שאלה", "system_prompt": "system"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert service.stats()["models"][settings.default_model_id]["rejected"] == 1
+
+
+def test_shed_stream_is_answered_with_429(monkeypatch):
+    """A stream shed by the governor gets a 429 with Retry-After instead of an error event"""
+    fast_backoff(monkeypatch)
+    monkeypatch.setattr(settings, "bedrock_max_retries", 2)
+
+    class ThrottlingStreamClient(FakeBedrockClient):
+        def invoke_model_with_response_stream(self, modelId, body):
+            raise throttling_error()
+
+    service = make_service(ThrottlingStreamClient(latency=0))
+    monkeypatch.setattr(routes, "bedrock_service", service)
+
+    response = TestClient(app).post("/api/v1/chat/stream", json={"message": "שאלה", "system_prompt": "system"})
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+    assert service.stats()["streams"]["active"] == 0
+
+
+def test_limit_grows_back_additively():
+    """Successful calls raise the limit by about one slot per window, up to the maximum"""
+    governor = ModelGovernor("model", max_concurrency=8)
+    governor.limit = 2.0
+
+    async def cycle(count):
+        for _ in range(count):
+            await governor.acquire(deadline=float("inf"), queue_timeout=1)
+            governor.release(latency=0.1)
+
+    asyncio.run(cycle(5))
+    assert governor.current_limit == 3
+    asyncio.run(cycle(100))
+    assert governor.current_limit == 8
+
+
+def test_token_bucket_sheds_when_wait_exceeds_deadline():
+    """Requests beyond the burst are rejected if the next token comes after the deadline"""
+    assert TokenBucket(rate=1, burst=1).reserve() == 0.0
+
+    governor = BedrockGovernor(rate=1, burst=1, deadline_seconds=0.1)
+
+    async def run():
+        await governor.acquire("model", governor.deadline())
+        governor.release("model", latency=0.01)
+        with pytest.raises(BedrockCapacityError) as error:
+            await governor.acquire("model", governor.deadline())
+        return error.value
+
+    error = asyncio.run(run())
+    assert error.retry_after > 0.5
+    assert governor.stats()["model"]["rate_limited"] == 1
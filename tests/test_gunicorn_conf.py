@@ -0,0 +1,65 @@
+"""Tests for the production gunicorn configuration"""
+
+import signal
+import pytest
+import importlib.util
+from pathlib import Path
+
+CONFIG_PATH = Path(__file__).parent.parent / "gunicorn.conf.py"
+
+
+def load_config(monkeypatch, **env):
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", CONFIG_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_workers_default_to_available_cpus(monkeypatch):
+    """Worker count follows the CPUs available unless WEB_CONCURRENCY is set"""
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    config = load_config(monkeypatch)
+    assert config.workers == config.available_cpus() >= 1
+    assert config.worker_class == "uvicorn.workers.UvicornWorker"
+
+    assert load_config(monkeypatch, WEB_CONCURRENCY="3").workers == 3
+
+
+def test_prompt_change_requests_one_reload_per_version(monkeypatch, tmp_path):
+    """Workers seeing the same new prompt version signal the master only once"""
+    config = load_config(monkeypatch)
+    monkeypatch.setattr(config, "_reload_marker", str(tmp_path / "marker"))
+    signals = []
+    monkeypatch.setattr(config.os, "kill", lambda pid, sig: signals.append(sig))
+
+    config._request_reload(("sys-2", "kb-1", "fs-1"))
+    config._request_reload(("sys-2", "kb-1", "fs-1"))
+    config._request_reload(("sys-3", "kb-1", "fs-1"))
+
+    assert signals == [signal.SIGHUP, signal.SIGHUP]
+
+
+class FakeServer:
+    def __init__(self, workers):
+        self.cfg = type("Cfg", (), {"workers": workers})()
+        self.log = type("Log", (), {"info": lambda self, message: None})()
+
+
+def test_several_workers_share_sqlite_sessions(monkeypatch, tmp_path):
+    """Several workers default to the SQLite session store and refuse an explicit in-memory one"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("SESSION_BACKEND", raising=False)
+    config = load_config(monkeypatch)
+
+    config.on_starting(FakeServer(workers=1))
+    assert "SESSION_BACKEND" not in config.os.environ
+
+    config.on_starting(FakeServer(workers=4))
+    assert config.os.environ["SESSION_BACKEND"] == "sqlite"
+
+    monkeypatch.delenv("SESSION_BACKEND")
+    (tmp_path / ".env").write_text("SESSION_BACKEND=memory\n")
+    with pytest.raises(RuntimeError):
+        config.on_starting(FakeServer(workers=4))
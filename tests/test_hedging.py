@@ -0,0 +1,73 @@
+"""Tests for hedged Bedrock invocations"""
+
+import time
+import asyncio
+from app.services.hedging import HedgePolicy
+from tests.test_bedrock_service import FakeBedrockClient, make_service
+
+
+class FirstCallSlowClient(FakeBedrockClient):
+    """Fake client whose first invocation is a slow outlier"""
+
+    def __init__(self, slow_latency):
+        super().__init__(latency=0.01)
+        self.slow_latency = slow_latency
+        self.invocations = 0
+
+    def invoke_model(self, modelId, body):
+        self.invocations += 1
+        if self.invocations == 1:
+            time.sleep(self.slow_latency)
+        return super().invoke_model(modelId, body)
+
+
+def make_hedging_service(client, **policy):
+    service = make_service(client)
+    service.hedging = HedgePolicy(**{"max_delay_seconds": 0.05, **policy})
+    return service
+
+
+def test_hedge_wins_over_slow_invocation():
+    """A hedge fired after the delay answers first; the slow call is recorded when it finishes"""
+    service = make_hedging_service(FirstCallSlowClient(slow_latency=0.4))
+
+    async def run():
+        start = time.perf_counter()
+        result = await service.generate_response("שאלה", system_prompt="system")
+        elapsed = time.perf_counter() - start
+        await asyncio.sleep(0.5)  # let the ignored invocation finish
+        return result, elapsed
+
+    result, elapsed = asyncio.run(run())
+    stats = service.stats()["hedging"]
+
+    assert result == "שלום"
+    assert elapsed < 0.3
+    assert (stats["hedged"], stats["hedge_wins"]) == (1, 1)
+    assert stats["extra_output_tokens"] == 5
+    assert stats["unhedged_p99_seconds"] >= 0.4 > stats["served_p99_seconds"]
+
+
+def test_hedge_budget_limits_hedge_rate():
+    """Without budget credits slow calls are not hedged"""
+    service = make_hedging_service(FirstCallSlowClient(slow_latency=0.2), budget_ratio=0.0, burst=0.0)
+
+    asyncio.run(service.generate_response("שאלה", system_prompt="system"))
+
+    stats = service.stats()["hedging"]
+    assert stats["hedged"] == 0
+    assert stats["budget_denied"] == 1
+
+
+def test_delay_follows_latency_percentile():
+    """The hedge delay is the configured percentile of recent latencies, clamped to the bounds"""
+    policy = HedgePolicy(percentile=0.9, min_delay_seconds=0.5, max_delay_seconds=5.0, min_samples=10)
+    assert policy.delay("model") == 5.0
+
+    for i in range(100):
+        policy.record_invocation("model", 1.0 + i / 100)
+    assert policy.delay("model") == 1.9
+
+    for _ in range(100):
+        policy.record_invocation("fast", 0.1)
+    assert policy.delay("fast") == 0.5
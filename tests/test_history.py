@@ -0,0 +1,73 @@
+"""Tests for conversation history token budgeting"""
+
+from app.services.history import HistoryManager, message_tokens
+
+
+def make_conversation(turns):
+    """Alternating user/assistant messages ending with the current user message"""
+    messages = []
+    for i in range(turns):
+        messages.append({"role": "user", "content": f"שאלה מספר {i} על זכאות לדירה בהנחה. פרטים נוספים " * 5})
+        messages.append({"role": "assistant", "content": f"תשובה מספר {i}. הסבר מפורט על התנאים " * 10})
+    messages.append({"role": "user", "content": "ומה לגבי מחיר למשתכן?"})
+    return messages
+
+
+def test_short_history_is_untouched():
+    """Conversations within the budget are forwarded as-is"""
+    manager = HistoryManager(max_tokens=10000)
+    messages = make_conversation(2)
+
+    kept, details = manager.fit(messages)
+
+    assert kept == messages
+    assert details is None
+
+
+def test_drop_keeps_newest_turns_within_budget():
+    """Older turns are dropped and the kept history starts with a user turn"""
+    manager = HistoryManager(max_tokens=600, strategy="drop")
+    messages = make_conversation(10)
+
+    kept, details = manager.fit(messages)
+
+    assert kept[-1] == messages[-1]
+    assert kept[0]["role"] == "user"
+    assert kept == messages[-len(kept):]
+    assert sum(message_tokens(m) for m in kept) <= 600
+    assert details["tokens_saved"] == details["tokens_before"] - details["tokens_after"] > 0
+    assert manager.stats()["tokens_saved_total"] == details["tokens_saved"]
+
+
+def test_summarize_folds_summary_into_first_kept_turn():
+    """Dropped turns are summarized into the first kept user message"""
+    manager = HistoryManager(max_tokens=800, strategy="summarize", summary_max_tokens=200)
+    messages = make_conversation(10)
+
+    kept, details = manager.fit(messages)
+
+    assert details["summarized"]
+    assert kept[0]["role"] == "user"
+    assert kept[0]["content"].startswith("<conversation_summary>")
+    assert "Assistant: תשובה מספר" in kept[0]["content"]
+    assert [m["role"] for m in kept] == ["user", "assistant"] * (len(kept) // 2) + ["user"]
+    assert details["tokens_after"] <= 800
+    # The caller's messages are not modified
+    assert not messages[0]["content"].startswith("<conversation_summary>")
+
+
+def test_summary_is_extended_incrementally():
+    """The next turn reuses the cached summary of the previously dropped prefix"""
+    manager = HistoryManager(max_tokens=800, strategy="summarize", summary_max_tokens=200)
+    messages = make_conversation(10)
+    manager.fit(messages)
+
+    manager.fit(messages)
+    assert manager.stats()["summary_cache_hits"] == 1
+
+    next_turn = messages[:-1] + [{"role": "user", "content": messages[-1]["content"]},
+                                 {"role": "assistant", "content": "תשובה ארוכה. הסבר מפורט על התנאים " * 40},
+                                 {"role": "user", "content": "תודה, ועוד שאלה"}]
+    manager.fit(next_turn)
+    assert manager.stats()["summary_cache_misses"] == 2
+    assert manager.stats()["summary_cache_size"] == 2
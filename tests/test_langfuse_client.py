@@ -0,0 +1,75 @@
+"""Tests for the shared Langfuse client registry"""
+
+import threading
+import config.settings as settings_module
+from config.settings import Settings, LangfuseClientRegistry
+
+
+class FakeLangfuse:
+    """Langfuse stand-in recording construction and shutdown"""
+    instances = []
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.shut_down = False
+        FakeLangfuse.instances.append(self)
+
+    def shutdown(self):
+        self.shut_down = True
+
+
+def make_settings(**overrides):
+    values = dict(use_langfuse=True, langfuse_public_key="pk", langfuse_secret_key="sk")
+    values.update(overrides)
+    return Settings(**values)
+
+
+def test_client_is_created_once_and_shared(monkeypatch):
+    """Concurrent lookups from loaders and services share one lazily created client"""
+    FakeLangfuse.instances = []
+    monkeypatch.setattr(settings_module, "Langfuse", FakeLangfuse)
+    registry = LangfuseClientRegistry()
+    monkeypatch.setattr(settings_module, "langfuse_clients", registry)
+    settings = make_settings()
+
+    assert registry.stats()["created"] == 0
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(settings._get_langfuse_client())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(FakeLangfuse.instances) == 1
+    assert all(client is FakeLangfuse.instances[0] for client in results)
+    assert FakeLangfuse.instances[0].kwargs["httpx_client"] is not None
+    assert registry.stats() == {"active": 1, "created": 1}
+
+
+def test_shutdown_releases_client(monkeypatch):
+    """Shutdown stops the client and closes its connection pool; the next lookup creates a new one"""
+    FakeLangfuse.instances = []
+    monkeypatch.setattr(settings_module, "Langfuse", FakeLangfuse)
+    registry = LangfuseClientRegistry()
+    settings = make_settings()
+
+    client = registry.get(settings)
+    registry.shutdown()
+
+    assert client.shut_down
+    assert client.kwargs["httpx_client"].is_closed
+    assert registry.stats()["active"] == 0
+    assert registry.get(settings) is not client
+
+
+def test_missing_credentials_or_disabled(monkeypatch):
+    """No client is created without credentials or when Langfuse is disabled"""
+    FakeLangfuse.instances = []
+    monkeypatch.setattr(settings_module, "Langfuse", FakeLangfuse)
+    registry = LangfuseClientRegistry()
+    monkeypatch.setattr(settings_module, "langfuse_clients", registry)
+
+    assert registry.get(make_settings(langfuse_secret_key=None)) is None
+    assert make_settings(use_langfuse=False)._get_langfuse_client() is None
+    assert FakeLangfuse.instances == []
@@ -0,0 +1,93 @@
+"""Tests for the metrics registry and per-stage request instrumentation"""
+
+import sys
+import asyncio
+import threading
+from app.utils.metrics import MetricsRegistry, REQUESTS, STAGE_SECONDS, TOKENS
+from tests.test_bedrock_service import FakeBedrockClient, make_service
+from config.settings import settings
+
+
+def test_render_exposition_format():
+    """Counters, gauges and cumulative histogram buckets render in the text format"""
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("status",))
+    in_flight = registry.gauge("in_flight", "In flight")
+    latency = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+
+    requests.inc("ok")
+    requests.inc("ok")
+    requests.inc('say "hi"')
+    in_flight.inc()
+    in_flight.dec()
+    in_flight.inc()
+    for value in (0.05, 0.5, 5.0):
+        latency.observe(value, "upstream")
+
+    lines = registry.render().splitlines()
+    assert "# TYPE requests_total counter" in lines
+    assert 'requests_total{status="ok"} 2' in lines
+    assert 'requests_total{status="say \\"hi\\""} 1' in lines
+    assert "in_flight 1" in lines
+    assert 'latency_seconds_bucket{stage="upstream",le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{stage="upstream",le="1"} 2' in lines
+    assert 'latency_seconds_bucket{stage="upstream",le="+Inf"} 3' in lines
+    assert 'latency_seconds_sum{stage="upstream"} 5.55' in lines
+    assert 'latency_seconds_count{stage="upstream"} 3' in lines
+
+
+def test_updates_from_threads_are_not_lost():
+    """Counters and histograms updated from several threads keep every sample"""
+    registry = MetricsRegistry()
+    calls = registry.counter("calls_total", "Calls", ("region",))
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+
+    def record():
+        for _ in range(5000):
+            calls.inc("us-east-1")
+            latency.observe(0.5)
+
+    # Switch threads as often as possible to provoke interleaved updates
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=record) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+
+    assert calls.value("us-east-1") == 40000
+    assert latency.count() == 40000
+
+
+def test_requests_record_stages_counters_and_tokens():
+    """A chat request records its stages, outcome and token counts"""
+    service = make_service(FakeBedrockClient(latency=0))
+    model = settings.default_model_id
+    before = REQUESTS.value("invoke", model, "ok")
+    upstream_before = STAGE_SECONDS.count("upstream")
+    tokens_before = TOKENS.count(model, "output")
+
+    _, metadata = asyncio.run(service.generate_response_with_metadata("שאלה", system_prompt="system"))
+
+    assert set(metadata["timings_ms"]) == {"message_assembly", "prompt_load", "json_encode", "upstream", "response_parse"}
+    assert REQUESTS.value("invoke", model, "ok") == before + 1
+    assert STAGE_SECONDS.count("upstream") == upstream_before + 1
+    assert TOKENS.count(model, "output") == tokens_before + 1
+
+
+def test_stream_records_ttfb_and_streaming_stages():
+    """Streams record time to first chunk and streaming duration"""
+    service = make_service(FakeBedrockClient(chunks=["א", "ב"]))
+    before = (STAGE_SECONDS.count("upstream_ttfb"), STAGE_SECONDS.count("streaming"))
+    completed_before = REQUESTS.value("stream", settings.default_model_id, "ok")
+
+    async def run():
+        return [chunk async for chunk in service.generate_response_astream("שאלה", system_prompt="system")]
+
+    asyncio.run(run())
+    assert (STAGE_SECONDS.count("upstream_ttfb"), STAGE_SECONDS.count("streaming")) == (before[0] + 1, before[1] + 1)
+    assert REQUESTS.value("stream", settings.default_model_id, "ok") == completed_before + 1
@@ -0,0 +1,121 @@
+"""Tests for fast/strong model routing and fallback"""
+
+import io
+import json
+import time
+import asyncio
+import pytest
+from botocore.exceptions import ClientError
+from app.services.model_router import ModelRouter
+from config.settings import settings
+from tests.test_bedrock_service import FakeBedrockClient, make_service
+
+FAST = settings.fast_model_id
+STRONG = settings.default_model_id
+
+
+class PerModelClient(FakeBedrockClient):
+    """Fake client with per-model failures, delays and answers"""
+
+    def __init__(self, failing=(), slow=None, texts=None, error_code="InternalServerException"):
+        super().__init__(latency=0)
+        self.failing = set(failing)
+        self.error_code = error_code
+        self.slow = slow or {}
+        self.texts = texts or {}
+        self.models = []
+
+    def invoke_model(self, modelId, body):
+        self.models.append(modelId)
+        if modelId in self.failing:
+            raise ClientError({"Error": {"Code": self.error_code, "Message": "model failed"}}, "InvokeModel")
+        time.sleep(self.slow.get(modelId, 0))
+        payload = {"content": [{"type": "text", "text": self.texts.get(modelId, "<response>שלום</response>")}],
+                   "usage": {"input_tokens": 10, "output_tokens": 5}}
+        return {"body": io.BytesIO(json.dumps(payload).encode("utf-8"))}
+
+
+def test_routing_policy():
+    """Short matched questions go to the fast model; long, multi-part or unmatched ones to the strong model"""
+    router = ModelRouter(FAST, STRONG, simple_max_chars=40)
+
+    assert router.route("מה זה מחיר למשתכן?").model_id == FAST
+    assert router.route("מה זה מחיר למשתכן?", selection_metadata={"kb_routing": {"fallback": True}}).reason == "no_topic_match"
+    assert router.route("אני רוצה לדעת מה התנאים לקבלת דירה בהנחה ואיך נרשמים להגרלה").reason == "long_message"
+    assert router.route("מה זה? ואיך נרשמים?").tier == "strong"
+    assert router.route("שאלה", history_turns=10).reason == "long_conversation"
+
+    explicit = router.route("שאלה", requested_model_id="anthropic.claude-3-opus-20240229-v1:0")
+    assert explicit.tier == "explicit" and explicit.fallbacks == []
+    assert router.route("שאלה").fallbacks == [STRONG]
+
+
+def test_falls_back_to_strong_model_on_error():
+    """A server error on the fast model is retried on the strong model and reported in metadata"""
+    client = PerModelClient(failing={FAST})
+    service = make_service(client, routing=True)
+
+    response, metadata = asyncio.run(service.generate_response_with_metadata("מה זה מחיר למשתכן?"))
+
+    assert response == "שלום"
+    assert client.models == [FAST, STRONG]
+    assert metadata["model_routing"]["model_id"] == STRONG
+    assert metadata["model_routing"]["fallback_from"] == [{"model_id": FAST, "reason": "ClientError"}]
+    stats = service.stats()["model_routing"]
+    assert stats["fallbacks"] == 1
+    assert stats["models"][FAST]["errors"] == 1
+
+
+def test_falls_back_on_timeout(monkeypatch):
+    """A fast model attempt exceeding the attempt timeout falls back"""
+    monkeypatch.setattr(settings, "model_attempt_timeout_seconds", 0.05)
+    client = PerModelClient(slow={FAST: 0.3})
+    service = make_service(client, routing=True)
+
+    _, metadata = asyncio.run(service.generate_response_with_metadata("מה זה מחיר למשתכן?"))
+
+    assert metadata["model_routing"]["fallback_from"][0]["reason"] == "timeout"
+    assert metadata["model_routing"]["model_id"] == STRONG
+
+
+def test_request_errors_do_not_fall_back():
+    """Errors caused by the request itself are raised without trying the other model"""
+    client = PerModelClient(failing={FAST}, error_code="ValidationException")
+    service = make_service(client, routing=True)
+
+    with pytest.raises(ClientError):
+        asyncio.run(service.generate_response_with_metadata("מה זה מחיר למשתכן?"))
+
+    assert client.models == [FAST]
+    assert service.stats()["model_routing"]["fallbacks"] == 0
+
+
+def test_fallbacks_share_the_request_deadline(monkeypatch):
+    """The fallback model only gets the time left of the request deadline"""
+    monkeypatch.setattr(settings, "model_attempt_timeout_seconds", 0.2)
+    client = PerModelClient(slow={FAST: 0.5, STRONG: 0.5})
+    service = make_service(client, routing=True)
+    monkeypatch.setattr(service.governor, "deadline_seconds", 0.3)
+
+    start = time.monotonic()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(service.generate_response_with_metadata("מה זה מחיר למשתכן?"))
+
+    assert client.models == [FAST, STRONG]
+    assert time.monotonic() - start < 0.38
+
+
+def test_escalates_unusable_fast_answer(monkeypatch):
+    """A fast model answer without the required <response> block is regenerated by the strong model"""
+    monkeypatch.setattr("app.services.bedrock_service.prompt_cache.get", lambda **kwargs: "system prompt")
+    client = PerModelClient(texts={FAST: "לא יודע"})
+    service = make_service(client, routing=True)
+    service.prompt_selector.few_shot_top_k = 0
+    service.prompt_selector.kb_routing_enabled = False
+
+    response, metadata = asyncio.run(service.generate_response_with_metadata("מה זה מחיר למשתכן?"))
+
+    assert response == "שלום"
+    assert client.models == [FAST, STRONG]
+    assert metadata["model_routing"]["escalated_from"] == FAST
+    assert service.stats()["model_routing"]["escalations"] == 1
@@ -0,0 +1,189 @@
+"""Tests for the in-process system prompt cache"""
+
+import time
+from types import SimpleNamespace
+import config.settings as settings_module
+from config.settings import Settings, PromptCache, PromptSourceBreaker
+
+
+TEMPLATE = "System\n<knowledge_base>\n</knowledge_base>\n<few_shot_examples>\n</few_shot_examples>\n<current_date>\n</current_date>"
+
+
+def make_cache(monkeypatch, ttl=300):
+    """Create a prompt cache whose sources are counted in-memory stubs"""
+    calls = {"template": 0}
+    versions = {"kb": "kb-1"}
+
+    def load_template(self, force_local=False):
+        calls["template"] += 1
+        return TEMPLATE, "sys-1"
+
+    monkeypatch.setattr(Settings, "load_system_prompt_template", load_template)
+    monkeypatch.setattr(Settings, "load_knowledge_base_versioned",
+                        lambda self, force_local=False: ({"categories": []}, versions["kb"]))
+    monkeypatch.setattr(Settings, "load_few_shots_versioned",
+                        lambda self, force_local=False: ({"few_shot_examples": []}, "fs-1"))
+
+    settings = Settings(use_langfuse=False, prompt_cache_ttl_seconds=ttl)
+    return PromptCache(settings), calls, versions
+
+
+def test_cold_cache_loads_once(monkeypatch):
+    """First request loads synchronously, later requests are served from memory"""
+    cache, calls, _ = make_cache(monkeypatch)
+
+    first = cache.get()
+    second = cache.get()
+
+    assert first == second
+    assert '"categories":[]' in first
+    assert calls["template"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.versions == ("sys-1", "kb-1", "fs-1")
+
+
+def test_stale_entry_refreshes_in_background(monkeypatch):
+    """A stale entry is still served while a background refresh picks up new versions"""
+    cache, calls, versions = make_cache(monkeypatch, ttl=0)
+    cache.get()
+
+    versions["kb"] = "kb-2"
+    cache.get()
+
+    deadline = time.time() + 2
+    while cache.stats()["refreshes"] < 2 and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert cache.versions == ("sys-1", "kb-2", "fs-1")
+
+
+def test_current_date_injected_on_read(monkeypatch):
+    """The date is injected at read time so a cached prompt never serves yesterday's date"""
+    cache, _, _ = make_cache(monkeypatch)
+    prompt = cache.get()
+
+    assert "<current_date>\n" + time.strftime("%Y-%m-%d") + "\n</current_date>" in prompt
+
+
+def test_blocks_move_current_date_after_static_prefix(monkeypatch):
+    """The static prefix excludes the date so it stays byte-identical across days"""
+    cache, _, _ = make_cache(monkeypatch)
+    static, volatile = cache.get_blocks()
+
+    assert "<current_date>" not in static
+    assert static.startswith("System")
+    assert volatile == "<current_date>\n" + time.strftime("%Y-%m-%d") + "\n</current_date>"
+
+
+def test_per_request_few_shots_override(monkeypatch):
+    """A few-shot subset replaces the section inline, or moves after the cache point in blocks"""
+    cache, _, _ = make_cache(monkeypatch)
+    subset = {"few_shot_examples": [{"id": "selected"}]}
+
+    assert '"id":"selected"' in cache.get(few_shots=subset)
+
+    static, volatile = cache.get_blocks(few_shots=subset)
+    assert "<few_shot_examples>" not in static
+    assert '"categories":[]' in static
+    assert volatile.startswith('<few_shot_examples>\n{"few_shot_examples":[{"id":"selected"}]}\n</few_shot_examples>')
+    assert volatile.endswith("</current_date>")
+
+
+class FakeLangfuse:
+    """Langfuse client stand-in serving JSON prompts, or failing while down"""
+
+    def __init__(self):
+        self.down = False
+        self.fetches = 0
+
+    def get_prompt(self, name, **kwargs):
+        self.fetches += 1
+        if self.down:
+            raise TimeoutError("Langfuse timed out")
+        content = TEMPLATE if name == "moch-system-prompt" else "{}"
+        return SimpleNamespace(prompt=content, version=1)
+
+
+def make_langfuse_cache(monkeypatch, tmp_path, client, **overrides):
+    """Create a prompt cache loading from a fake Langfuse client, with its own breaker and snapshot file"""
+    options = dict(
+        use_langfuse=True,
+        prompt_snapshot_file=str(tmp_path / "snapshot.json"),
+        prompt_breaker_failure_threshold=1,
+        prompt_breaker_reset_seconds=60,
+    )
+    options.update(overrides)
+    settings = Settings(**options)
+    monkeypatch.setattr(Settings, "_get_langfuse_client", lambda self: client)
+    monkeypatch.setattr(settings_module, "prompt_source_breaker", PromptSourceBreaker(settings))
+    return PromptCache(settings)
+
+
+def wait_for_refresh(cache):
+    deadline = time.time() + 2
+    while cache._refreshing and time.time() < deadline:
+        time.sleep(0.01)
+
+
+def test_breaker_opens_and_probes_after_reset(monkeypatch):
+    """Consecutive failures open the breaker; after the reset period one probe decides"""
+    breaker = PromptSourceBreaker(Settings(prompt_breaker_failure_threshold=2, prompt_breaker_reset_seconds=60))
+    assert breaker.allow()
+    breaker.record_failure()
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.rejected == 1
+
+    breaker._opened_at -= 60
+    assert breaker.available()
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    assert not breaker.allow()  # Only one probe at a time
+
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_outage_serves_snapshot_without_waiting_for_langfuse(monkeypatch, tmp_path):
+    """A restarted worker starts from the on-disk snapshot and stops fetching once the breaker opens"""
+    client = FakeLangfuse()
+    healthy = make_langfuse_cache(monkeypatch, tmp_path, client)
+    prompt = healthy.get()
+    assert healthy.versions == ("langfuse:1", "langfuse:1", "langfuse:1")
+    assert (tmp_path / "snapshot.json").exists()
+
+    client.down = True
+    restarted = make_langfuse_cache(monkeypatch, tmp_path, client)
+    assert restarted.get() == prompt
+    wait_for_refresh(restarted)
+
+    # The background refresh failed on its first fetch and kept the last-known-good prompt
+    assert settings_module.prompt_source_breaker.state == "open"
+    assert restarted.versions == ("langfuse:1", "langfuse:1", "langfuse:1")
+    fetches = client.fetches
+    for _ in range(5):
+        assert restarted.get() == prompt
+    wait_for_refresh(restarted)
+    assert client.fetches == fetches
+    assert restarted.stats()["snapshot_restores"] == 1
+
+
+def test_probe_recovers_after_outage(monkeypatch, tmp_path):
+    """Once the reset period passes, a background probe closes the breaker and refreshes the prompt"""
+    client = FakeLangfuse()
+    client.down = True
+    cache = make_langfuse_cache(monkeypatch, tmp_path, client)
+    cache.get()
+    assert not cache.versions[0].startswith("langfuse:")  # Local fallback until Langfuse recovers
+
+    client.down = False
+    settings_module.prompt_source_breaker._opened_at -= 60
+    cache.get()
+    wait_for_refresh(cache)
+
+    assert settings_module.prompt_source_breaker.state == "closed"
+    assert cache.versions == ("langfuse:1", "langfuse:1", "langfuse:1")
+    assert (tmp_path / "snapshot.json").exists()
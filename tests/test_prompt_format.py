@@ -0,0 +1,48 @@
+"""Tests for prompt data serialization formats"""
+
+import json
+import pytest
+from app.utils.prompt_format import serialize_for_prompt, estimate_tokens, budget_report
+
+DATA = {
+    "few_shot_examples": [
+        {
+            "id": "renew",
+            "user_query": "איך אפשר לחדש תעודת זכאות?",
+            "classification": {"main_topic": "דירה בהנחה", "sub_topic": "חידוש"},
+            "tags": ["זכאות", "חידוש"],
+        }
+    ]
+}
+
+
+def test_minified_is_equivalent_json():
+    """Minified output parses back to the same data"""
+    assert json.loads(serialize_for_prompt(DATA, "minified")) == DATA
+
+
+def test_compact_format_layout():
+    """Compact output is indented key/value text with list markers"""
+    text = serialize_for_prompt(DATA, "compact")
+    assert text.splitlines()[:4] == [
+        "few_shot_examples:",
+        " - id: renew",
+        "   user_query: איך אפשר לחדש תעודת זכאות?",
+        "   classification:",
+    ]
+    assert "    - זכאות" in text
+    assert "{" not in text and '"' not in text
+
+
+def test_unknown_format_rejected():
+    with pytest.raises(ValueError):
+        serialize_for_prompt(DATA, "yaml")
+
+
+def test_budget_report_favours_compact_formats():
+    """Both compact formats use fewer characters and estimated tokens than pretty JSON"""
+    report = budget_report(DATA)
+    for fmt in ("minified", "compact"):
+        assert report[fmt]["chars"] < report["pretty"]["chars"]
+        assert report[fmt]["estimated_tokens"] < report["pretty"]["estimated_tokens"]
+    assert estimate_tokens("") == 0
@@ -0,0 +1,72 @@
+"""Tests for per-request few-shot selection"""
+
+import json
+from pathlib import Path
+from app.services.prompt_selection import FewShotRetriever, KnowledgeBaseRouter
+
+FEW_SHOTS = json.loads((Path(__file__).parent.parent / "prompts" / "few_shots.json").read_text(encoding="utf-8"))
+
+
+def test_retriever_finds_matching_example():
+    """A paraphrased question ranks its source example first"""
+    retriever = FewShotRetriever(FEW_SHOTS)
+    results = retriever.search("איך מחדשים תעודת זכאות שפג תוקפה?", top_k=3)
+
+    assert results[0][0]["id"] == "renew_eligibility_certificate"
+    assert results[0][1] >= results[1][1] >= results[2][1]
+
+
+def test_select_keeps_other_sections():
+    """The subset keeps non-example keys and only the top-k examples"""
+    retriever = FewShotRetriever(FEW_SHOTS)
+    subset = retriever.select("דירה בהנחה נכס מסחרי", top_k=2)
+
+    assert len(subset["few_shot_examples"]) == 2
+    assert subset["classification_patterns"] == FEW_SHOTS["classification_patterns"]
+    assert len(FEW_SHOTS["few_shot_examples"]) > 2
+
+
+KNOWLEDGE_BASE = {
+    "knowledge_base": {
+        "categories": [
+            {
+                "main_topic": "דירה בהנחה",
+                "main_topic_code": "100",
+                "sub_topics": [
+                    {"sub_topic": "תעודת זכאות", "common_queries": ["איך מחדשים תעודת זכאות"]},
+                    {"sub_topic": "הגרלות", "common_queries": ["מתי ההגרלה הבאה"]},
+                ],
+            },
+            {
+                "main_topic": "סיוע בשכר דירה",
+                "main_topic_code": "200",
+                "sub_topics": [{"sub_topic": "גובה הסיוע", "description": "סכום הסיוע החודשי בשכר דירה"}],
+            },
+            {
+                "main_topic": "משכנתאות",
+                "main_topic_code": "300",
+                "sub_topics": [{"sub_topic": "הלוואת מקום", "common_queries": ["מה זה הלוואת מקום למשכנתא"]}],
+            },
+        ],
+        "metadata": {"version": "1.0"},
+    }
+}
+
+
+def test_router_selects_matching_category():
+    """A message about rent assistance routes to its category and keeps the KB structure"""
+    router = KnowledgeBaseRouter(KNOWLEDGE_BASE)
+    positions, scores = router.route("כמה סיוע בשכר דירה מקבלים בחודש?", max_categories=1, min_score=0.1)
+
+    assert [router.categories[p]["main_topic_code"] for p in positions] == ["200"]
+    subset = router.subset(positions)
+    assert [c["main_topic_code"] for c in subset["knowledge_base"]["categories"]] == ["200"]
+    assert subset["knowledge_base"]["metadata"] == {"version": "1.0"}
+    assert router.selected_chars(positions) < router.total_chars
+
+
+def test_router_falls_back_when_nothing_matches():
+    """Unrelated messages select no category so the full knowledge base is kept"""
+    router = KnowledgeBaseRouter(KNOWLEDGE_BASE)
+    positions, _ = router.route("hello world", max_categories=2, min_score=0.2)
+    assert positions == []
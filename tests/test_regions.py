@@ -0,0 +1,126 @@
+"""Tests for latency-aware region selection and failover"""
+
+import time
+import asyncio
+import pytest
+from botocore.exceptions import ClientError, EndpointConnectionError
+from app.services.regions import RegionPool, INVOKE, STREAM
+from config.settings import settings
+from tests.test_bedrock_service import FakeBedrockClient, make_service
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "InvokeModel")
+
+
+class FailingClient(FakeBedrockClient):
+    """Fake client whose calls raise the given error"""
+
+    def __init__(self, error):
+        super().__init__(latency=0)
+        self.error = error
+
+    def invoke_model(self, modelId, body):
+        self.calls.append(body)
+        raise self.error
+
+    def invoke_model_with_response_stream(self, modelId, body):
+        self.calls.append(body)
+        raise self.error
+
+
+def make_pool(regions, **kwargs):
+    return RegionPool(regions, client_factory=lambda region: region, explore_ratio=0, **kwargs)
+
+
+def test_regions_are_ranked_by_latency_and_error_rate():
+    """The fastest region wins per call kind; errors inflate its score; unsampled regions keep the configured order"""
+    pool = make_pool(["us-east-1", "us-west-2", "eu-central-1"], cooldown_seconds=0)
+    assert pool.order(INVOKE) == ["us-east-1", "us-west-2", "eu-central-1"]
+
+    pool.record_success("us-east-1", INVOKE, 2.0)
+    pool.record_success("us-west-2", INVOKE, 1.0)
+    pool.record_success("us-east-1", STREAM, 0.3)
+    pool.record_success("us-west-2", STREAM, 0.5)
+    assert pool.order(INVOKE)[:2] == ["us-west-2", "eu-central-1"]
+    assert pool.order(STREAM)[0] == "us-east-1"
+    assert pool.order(INVOKE, alternate=True)[0] == "eu-central-1"
+
+    for _ in range(3):
+        pool.record_failure("us-west-2", client_error("InternalServerException"))
+    assert pool.order(INVOKE)[-1] == "us-west-2"
+
+    stats = pool.stats()["regions"]["us-west-2"]
+    assert stats["errors"] == 3 and stats["ewma_latency_ms"] == {INVOKE: 1000.0, STREAM: 500.0}
+
+
+def test_invocations_are_ranked_by_latency_per_output_token():
+    """A region that served a long answer is not ranked behind one that served a short answer faster"""
+    pool = make_pool(["us-east-1", "us-west-2"])
+    pool.record_success("us-east-1", INVOKE, 4.0, output_tokens=400)
+    pool.record_success("us-west-2", INVOKE, 1.0, output_tokens=20)
+    assert pool.order(INVOKE)[0] == "us-east-1"
+    assert pool.stats()["regions"]["us-west-2"]["ewma_latency_ms"][INVOKE] == 50.0
+
+    def slow_long_answer(client):
+        time.sleep(0.05)
+        return {"usage": {"output_tokens": 1000}}
+
+    pool = make_pool(["eu-central-1"])
+    pool.call(INVOKE, slow_long_answer, output_tokens=lambda result: result["usage"]["output_tokens"])
+    assert pool.stats()["regions"]["eu-central-1"]["ewma_latency_ms"][INVOKE] < 1.0
+
+
+def test_regional_errors_fail_over_and_cool_down():
+    """Throttled or unreachable regions are skipped; request errors are raised without failover"""
+    pool = make_pool(["us-east-1", "us-west-2", "eu-central-1"], cooldown_seconds=60)
+    errors = {
+        "us-east-1": client_error("ThrottlingException"),
+        "us-west-2": EndpointConnectionError(endpoint_url="https://bedrock-runtime.us-west-2.amazonaws.com"),
+    }
+
+    def call(region):
+        if region in errors:
+            raise errors[region]
+        return region
+
+    assert pool.call(INVOKE, call) == "eu-central-1"
+    assert pool.order(INVOKE) == ["eu-central-1", "us-east-1", "us-west-2"]
+    stats = pool.stats()
+    assert stats["failovers"] == 2
+    assert stats["regions"]["us-east-1"]["throttled"] == 1
+    assert stats["regions"]["us-east-1"]["cooldown_seconds"] > 0
+
+    errors["eu-central-1"] = client_error("ValidationException")
+    with pytest.raises(ClientError):
+        pool.call(INVOKE, call)
+    assert pool.stats()["failovers"] == 2
+
+    errors["eu-central-1"] = errors["us-west-2"] = client_error("ThrottlingException")
+    with pytest.raises(ClientError) as raised:
+        pool.call(INVOKE, call)
+    assert raised.value.response["Error"]["Code"] == "ThrottlingException"
+
+
+def test_service_fails_over_to_another_region(monkeypatch):
+    """Invocations and streams are served by the second region while the first throttles"""
+    monkeypatch.setattr(settings, "bedrock_regions", ["us-east-1", "us-west-2"])
+    monkeypatch.setattr(settings, "bedrock_region_explore_ratio", 0)
+    throttled = FailingClient(client_error("ThrottlingException"))
+    healthy = FakeBedrockClient(latency=0, chunks=["א", "ב"])
+    service = make_service(throttled)
+    service.regions.set_client("us-west-2", healthy)
+
+    async def run():
+        answer = await service.generate_response("שאלה", system_prompt="system")
+        chunks = [chunk async for chunk in service.generate_response_astream("שאלה", system_prompt="system")]
+        return answer, chunks
+
+    assert asyncio.run(run()) == ("שלום", ["א", "ב"])
+    assert len(throttled.calls) == 1
+    assert len(healthy.calls) == 2
+
+    regions = service.stats()["regions"]
+    assert regions["primary"] == "us-east-1"
+    assert regions["regions"]["us-west-2"]["requests"] == 2
+    assert set(regions["regions"]["us-west-2"]["ewma_latency_ms"]) == {INVOKE, STREAM}
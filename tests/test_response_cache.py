@@ -0,0 +1,87 @@
+"""Tests for Hebrew normalization and the semantic response cache"""
+
+import time
+from app.services.response_cache import ResponseCache
+from app.utils.text import normalize_hebrew, char_ngrams, cosine_similarity
+
+VERSIONS = ("sys-1", "kb-1", "fs-1")
+MODEL = "anthropic.claude-3-haiku-20240307-v1:0"
+
+
+def test_normalize_hebrew():
+    """Niqqud, punctuation, whitespace and final letters are normalized"""
+    assert normalize_hebrew("מָה  הַזַּכָּאוּת לְדִירָה בְּהַנָחָה?!") == "מה הזכאות לדירה בהנחה"
+    assert normalize_hebrew("מחיר למשתכן") == "מחיר למשתכנ"
+    assert normalize_hebrew('צה"ל') == "צהל"
+
+
+def test_exact_and_near_duplicate_hits():
+    """Normalized duplicates hit exactly, small rewordings hit by similarity"""
+    cache = ResponseCache(similarity_threshold=0.8)
+    scope, kb_version = ResponseCache.make_scope(VERSIONS, MODEL, 0.3, 2048)
+    cache.put("מה הזכאות לדירה בהנחה?", "תשובה", scope, kb_version)
+
+    assert cache.get("מָה הַזַּכָּאוּת לְדִירָה בְּהַנָחָה", scope, kb_version) == "תשובה"
+    assert cache.get("מה הזכאות שלי לדירה בהנחה", scope, kb_version) == "תשובה"
+    assert cache.get("איך מחדשים תעודת זכאות", scope, kb_version) is None
+
+    stats = cache.stats()
+    assert (stats["exact_hits"], stats["similar_hits"], stats["misses"]) == (1, 1, 1)
+
+
+def test_deciding_details_never_match_by_similarity():
+    """Questions differing in a negation, status or number miss even though their trigrams are near-identical"""
+    cache = ResponseCache()
+    scope, kb_version = ResponseCache.make_scope(VERSIONS, MODEL, 0.3, 2048)
+    pairs = [
+        ("האם אני זכאי לדירה בהנחה אם יש לי דירה", "האם אני זכאי לדירה בהנחה אם אין לי דירה"),
+        ("האם אני זכאי לדירה בהנחה אם אני נשוי", "האם אני זכאי לדירה בהנחה אם אני רווק"),
+        ("אני בן 35, האם אני זכאי לדירה בהנחה", "אני בן 25, האם אני זכאי לדירה בהנחה"),
+        ("האם מי שלא שירת בצבא זכאי לדירה בהנחה", "האם מי ששירת בצבא זכאי לדירה בהנחה"),
+    ]
+    for cached, asked in pairs:
+        grams = [char_ngrams(normalize_hebrew(text)) for text in (cached, asked)]
+        assert cosine_similarity(*grams) >= 0.8
+        cache.put(cached, "תשובה", scope, kb_version)
+        assert cache.get(asked, scope, kb_version) is None
+
+    cache.put("אני בת 30 ואין לי דירה, מה הזכאות שלי", "תשובה", scope, kb_version)
+    assert cache.get("אני בת 30 ואין לי דירה, מה הזכאות", scope, kb_version) == "תשובה"
+
+
+def test_scope_mismatch_misses():
+    """Different model or temperature never shares answers"""
+    cache = ResponseCache()
+    scope, kb_version = ResponseCache.make_scope(VERSIONS, MODEL, 0.3, 2048)
+    other_scope, _ = ResponseCache.make_scope(VERSIONS, MODEL, 0.7, 2048)
+    cache.put("מה הזכאות לדירה בהנחה", "תשובה", scope, kb_version)
+
+    assert cache.get("מה הזכאות לדירה בהנחה", other_scope, kb_version) is None
+
+
+def test_knowledge_base_version_change_invalidates_entry():
+    """An entry generated with an older knowledge base is dropped on lookup"""
+    cache = ResponseCache()
+    scope, _ = ResponseCache.make_scope(VERSIONS, MODEL, 0.3, 2048)
+    cache.put("מה הזכאות לדירה בהנחה", "תשובה", scope, "kb-1")
+
+    assert cache.get("מה הזכאות לדירה בהנחה", scope, "kb-2") is None
+    assert cache.stats()["size"] == 0
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_lru_and_ttl_eviction():
+    """The least recently used entry is evicted at the size cap and entries expire after the TTL"""
+    cache = ResponseCache(max_entries=2, similarity_threshold=1.0)
+    scope, kb_version = ResponseCache.make_scope(VERSIONS, MODEL, 0.3, 2048)
+    cache.put("שאלה ראשונה", "1", scope, kb_version)
+    cache.put("שאלה שנייה", "2", scope, kb_version)
+    cache.get("שאלה ראשונה", scope, kb_version)
+    cache.put("שאלה שלישית", "3", scope, kb_version)
+
+    assert cache.get("שאלה שנייה", scope, kb_version) is None
+    assert cache.get("שאלה ראשונה", scope, kb_version) == "1"
+
+    cache.ttl_seconds = 0.01
+    time.sleep(0.02)
+    assert cache.get("שאלה שלישית", scope, kb_version) is None
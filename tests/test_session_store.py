@@ -0,0 +1,140 @@
+"""Tests for server-side conversation sessions"""
+
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api import routes
+from app.services.session_store import SessionStore, SQLiteSessionBackend, SessionNotFoundError
+
+client = TestClient(app)
+
+
+def test_create_append_get():
+    """Appended messages are returned in order and get() returns a copy"""
+    store = SessionStore()
+    conversation_id = store.create()
+
+    store.append(conversation_id, [{"role": "user", "content": "שלום"}])
+    assert store.append(conversation_id, [{"role": "assistant", "content": "היי"}]) == 2
+
+    messages = store.get(conversation_id)
+    messages.append({"role": "user", "content": "לא נשמר"})
+    assert [m["content"] for m in store.get(conversation_id)] == ["שלום", "היי"]
+
+
+def test_unknown_and_expired_sessions():
+    """Unknown ids and idle sessions past the TTL are not found"""
+    store = SessionStore(ttl_seconds=-1)
+    conversation_id = store.create()
+
+    with pytest.raises(SessionNotFoundError):
+        store.get("missing")
+    with pytest.raises(SessionNotFoundError):
+        store.get(conversation_id)
+    assert store.stats()["expired"] == 1
+
+
+def test_sqlite_backend_survives_eviction_and_restart(tmp_path):
+    """Sessions evicted from memory or written by another process are loaded from SQLite"""
+    path = str(tmp_path / "sessions.db")
+    store = SessionStore(max_sessions=1, backend=SQLiteSessionBackend(path))
+    first = store.create()
+    store.append(first, [{"role": "user", "content": "שאלה"}, {"role": "assistant", "content": "תשובה"}])
+    store.create()  # evicts the first session from memory
+
+    assert store.get(first)[1]["content"] == "תשובה"
+    assert store.stats()["backend_loads"] == 1
+
+    restarted = SessionStore(backend=SQLiteSessionBackend(path))
+    restarted.append(first, [{"role": "user", "content": "עוד שאלה"}])
+    assert len(restarted.get(first)) == 3
+
+
+def test_sqlite_sessions_are_shared_between_workers(tmp_path):
+    """Two stores on one database see each other's appends and never overwrite them"""
+    path = str(tmp_path / "sessions.db")
+    first_worker = SessionStore(backend=SQLiteSessionBackend(path))
+    second_worker = SessionStore(backend=SQLiteSessionBackend(path))
+    conversation_id = first_worker.create()
+
+    first_worker.append(conversation_id, [{"role": "user", "content": "א"}, {"role": "assistant", "content": "ב"}])
+    assert len(second_worker.get(conversation_id)) == 2
+    assert second_worker.append(conversation_id, [{"role": "user", "content": "ג"}]) == 3
+    assert first_worker.append(conversation_id, [{"role": "assistant", "content": "ד"}]) == 4
+
+    for store in (first_worker, second_worker):
+        assert [m["content"] for m in store.get(conversation_id)] == ["א", "ב", "ג", "ד"]
+
+    second_worker.delete(conversation_id)
+    with pytest.raises(SessionNotFoundError):
+        first_worker.get(conversation_id)
+
+
+def test_chat_uses_session_history(monkeypatch):
+    """A chat request with a conversation id only carries the new message"""
+    seen = []
+
+    async def fake_generate(**kwargs):
+        seen.append(kwargs["conversation_history"])
+        return f"תשובה {len(seen)}", {}
+
+    monkeypatch.setattr(routes.bedrock_service, "generate_response_with_metadata", fake_generate)
+
+    conversation_id = client.post("/api/v1/sessions").json()["conversation_id"]
+    for message in ("שאלה ראשונה", "שאלה שנייה"):
+        response = client.post("/api/v1/chat", json={"message": message, "conversation_id": conversation_id})
+        assert response.status_code == 200
+        assert response.json()["conversation_id"] == conversation_id
+
+    assert seen[0] == []
+    assert [m["content"] for m in seen[1]] == ["שאלה ראשונה", "תשובה 1"]
+    assert len(client.get(f"/api/v1/sessions/{conversation_id}").json()["messages"]) == 4
+
+    assert client.post("/api/v1/chat", json={"message": "x", "conversation_id": "missing"}).status_code == 404
+    assert client.delete(f"/api/v1/sessions/{conversation_id}").status_code == 204
+    assert client.get(f"/api/v1/sessions/{conversation_id}").status_code == 404
+
+
+def test_session_store_is_used_off_the_event_loop(monkeypatch, tmp_path):
+    """Session endpoints and chat run the (possibly SQLite-backed) store outside the event loop"""
+    on_loop = []
+
+    class RecordingStore(SessionStore):
+        def _record(self):
+            try:
+                asyncio.get_running_loop()
+                on_loop.append(True)
+            except RuntimeError:
+                on_loop.append(False)
+
+        def create(self, *args, **kwargs):
+            self._record()
+            return super().create(*args, **kwargs)
+
+        def get(self, *args, **kwargs):
+            self._record()
+            return super().get(*args, **kwargs)
+
+        def append(self, *args, **kwargs):
+            self._record()
+            return super().append(*args, **kwargs)
+
+        def delete(self, *args, **kwargs):
+            self._record()
+            return super().delete(*args, **kwargs)
+
+    async def fake_generate(**kwargs):
+        return "תשובה", {}
+
+    monkeypatch.setattr(routes, "session_store", RecordingStore(backend=SQLiteSessionBackend(str(tmp_path / "s.db"))))
+    monkeypatch.setattr(routes.bedrock_service, "generate_response_with_metadata", fake_generate)
+
+    conversation_id = client.post("/api/v1/sessions").json()["conversation_id"]
+    client.post(f"/api/v1/sessions/{conversation_id}/messages", json={"messages": [{"role": "user", "content": "א"}]})
+    client.post("/api/v1/chat", json={"message": "שאלה", "conversation_id": conversation_id})
+    client.get(f"/api/v1/sessions/{conversation_id}")
+    client.delete(f"/api/v1/sessions/{conversation_id}")
+
+    assert len(on_loop) >= 7
+    assert not any(on_loop)
@@ -0,0 +1,23 @@
+"""Tests for the application settings"""
+
+import sys
+import subprocess
+from pathlib import Path
+
+
+def test_settings_define_without_warnings():
+    """Field names such as model_fallback_ids do not clash with pydantic's protected namespaces"""
+    result = subprocess.run(
+        [sys.executable, "-W", "error::UserWarning", "-c", "import config.settings"],
+        capture_output=True,
+        text=True
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_env_example_is_a_valid_env_file():
+    """Copying .env.example to .env gives settings the app can start with"""
+    from config.settings import Settings
+
+    settings = Settings(_env_file=Path(__file__).parent.parent / ".env.example")
+    assert settings.aws_region
@@ -0,0 +1,84 @@
+"""Tests for the background Langfuse telemetry exporter"""
+
+import asyncio
+import time
+from app.utils.telemetry import TelemetryExporter
+from tests.test_bedrock_service import FakeBedrockClient, make_service
+
+
+class FakeGeneration:
+    def __init__(self):
+        self.updates = []
+        self.end_time = None
+
+    def update(self, **kwargs):
+        self.updates.append(kwargs)
+
+    def end(self, end_time=None):
+        self.end_time = end_time
+
+
+class SlowLangfuse:
+    """Langfuse stand-in whose flush blocks like a network round-trip"""
+
+    def __init__(self, flush_delay=0.0):
+        self.flush_delay = flush_delay
+        self.flushes = 0
+        self.generations = []
+
+    def start_generation(self, **kwargs):
+        generation = FakeGeneration()
+        self.generations.append(generation)
+        return generation
+
+    def flush(self):
+        time.sleep(self.flush_delay)
+        self.flushes += 1
+
+
+def test_generations_are_exported_and_flushed_on_shutdown():
+    """Queued generations are updated, ended and flushed once more at shutdown"""
+    client = SlowLangfuse()
+    exporter = TelemetryExporter(client, batch_size=100, flush_interval_seconds=60)
+    generation = FakeGeneration()
+
+    assert exporter.finish_generation(generation, output="תשובה", usage_details={"input": 1})
+    exporter.shutdown()
+
+    assert generation.updates == [{"output": "תשובה", "usage_details": {"input": 1}}]
+    assert generation.end_time is not None
+    assert client.flushes == 1
+    assert exporter.stats()["exported"] == 1
+
+
+def test_full_buffer_drops_instead_of_blocking():
+    """With the exporter thread stuck in a flush, overflowing records are dropped immediately"""
+    client = SlowLangfuse(flush_delay=0.5)
+    exporter = TelemetryExporter(client, max_queue_size=2, batch_size=1)
+
+    exporter.finish_generation(FakeGeneration())
+    time.sleep(0.05)  # exporter thread is now flushing
+    start_time = time.perf_counter()
+    results = [exporter.finish_generation(FakeGeneration()) for _ in range(5)]
+    elapsed = time.perf_counter() - start_time
+
+    assert elapsed < 0.05
+    assert results == [True, True, False, False, False]
+    assert exporter.stats()["dropped"] == 3
+    exporter.shutdown()
+
+
+def test_request_latency_excludes_flush():
+    """A slow Langfuse flush does not delay the response"""
+    service = make_service(FakeBedrockClient(latency=0))
+    service.langfuse = SlowLangfuse(flush_delay=0.5)
+    service.telemetry = TelemetryExporter(service.langfuse, batch_size=1)
+
+    start_time = time.perf_counter()
+    asyncio.run(service.generate_response("שאלה", system_prompt="system"))
+    elapsed = time.perf_counter() - start_time
+    service.telemetry.shutdown()
+
+    assert elapsed < 0.3
+    assert service.langfuse.generations[0].end_time is not None
+    assert service.langfuse.flushes >= 1
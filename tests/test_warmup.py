@@ -0,0 +1,78 @@
+"""Tests for startup warm-up and readiness"""
+
+import asyncio
+from types import SimpleNamespace
+from app.services.warmup import StartupWarmup
+from benchmarks.startup import import_profile
+
+
+class FakeService:
+    """Bedrock service stand-in whose connection fails a given number of times"""
+
+    def __init__(self, connection_failures=0):
+        self.connection_failures = connection_failures
+        self.connections = 0
+        self.invocations = 0
+        self.prompt_selector = SimpleNamespace(select=lambda message: None)
+
+    def warm_up_connection(self):
+        self.connections += 1
+        if self.connections <= self.connection_failures:
+            raise ConnectionError("Could not connect to the endpoint URL")
+
+    async def warm_up_models(self):
+        self.invocations += 1
+        return ["model"]
+
+
+def make_warmup(service, langfuse_client=None, **options):
+    cache = SimpleNamespace(get=lambda: "prompt")
+    return StartupWarmup(service, cache, lambda: langfuse_client, retry_seconds=0, **options)
+
+
+def test_stages_are_timed_and_worker_becomes_ready():
+    """Every stage is timed; the worker is ready once they have run"""
+    service = FakeService()
+    warmup = make_warmup(service, warmup_invocation=True)
+    assert warmup.status()["status"] == "starting"
+
+    warmup.record_import_time()
+    asyncio.run(warmup.run())
+
+    status = warmup.status()
+    assert status["status"] == "ready"
+    assert set(status["stages_ms"]) == {"app_import", "prompt_cache", "langfuse", "bedrock_connection", "warmup_invocation"}
+    assert service.invocations == 1
+
+
+def test_failed_required_stage_is_retried():
+    """A failed Bedrock connection keeps the worker unready until a retry succeeds"""
+    service = FakeService(connection_failures=2)
+    warmup = make_warmup(service)
+
+    asyncio.run(warmup.run())
+
+    assert warmup.ready
+    assert service.connections == 3
+    assert warmup.attempts == 3
+    assert warmup.errors == {}
+
+
+def test_optional_stage_failure_does_not_block_readiness():
+    """Langfuse being unreachable is reported but doesn't keep the worker out of service"""
+    def auth_check():
+        raise TimeoutError("Langfuse timed out")
+
+    warmup = make_warmup(FakeService(), langfuse_client=SimpleNamespace(auth_check=auth_check))
+    asyncio.run(warmup.run())
+
+    assert warmup.ready
+    assert warmup.errors == {"langfuse": "Langfuse timed out"}
+
+
+def test_heavy_clients_are_imported_on_first_use():
+    """Importing the app leaves boto3, langfuse and httpx to the warm-up (or first request)"""
+    profile = import_profile("app.main")
+
+    assert profile["eager_lazy_modules"] == []
+    assert profile["total_ms"] > 0